@@ -2,9 +2,13 @@
 Модуль для работы с языковой моделью GigaChat.
 """
 
-from langchain.chat_models.gigachat import GigaChat
+import logging
+import queue
+import threading
+import time
+
+from langchain.callbacks.base import BaseCallbackHandler
 from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts.chat import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
@@ -12,7 +16,70 @@ from langchain.prompts.chat import (
     MessagesPlaceholder,
 )
 
-from school_assistant.config.config import GIGACHAT_AUTH_TOKEN, SYSTEM_PROMPT
+from school_assistant.api.resilience import (
+    GIGACHAT_BREAKER,
+    UNAVAILABLE_RESPONSE,
+    CircuitOpenError,
+)
+from school_assistant.ai.memory import TokenBudgetMemory, estimate_tokens
+from school_assistant.ai.response_cache import (
+    ResponseCache,
+    context_fingerprint,
+    depends_on_history,
+)
+from school_assistant.config.config import (
+    GIGACHAT_AUTH_TOKEN,
+    LLM_TIMEOUT,
+    SYSTEM_PROMPT,
+    LLM_CACHE_ENABLED,
+    LLM_VERBOSE,
+)
+from school_assistant.knowledge.index import KnowledgeIndex
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Сообщение, которое возвращается пользователю при ошибке LLM
+ERROR_RESPONSE = "Извините, произошла ошибка при обработке вашего запроса."
+
+
+def create_chat_model(auth_token=GIGACHAT_AUTH_TOKEN, streaming=False):
+    """
+    Создает чат-модель GigaChat.
+
+    Один экземпляр можно разделять между несколькими AssistantLLM
+    (например, в шлюзе для многих устройств): история диалога хранится
+    в AssistantLLM, а не в модели.
+
+    Args:
+        auth_token (str): Токен авторизации для GigaChat.
+        streaming (bool): Запрашивать ответ потоково (по токенам).
+
+    Returns:
+        GigaChat: Чат-модель.
+    """
+    from langchain.chat_models.gigachat import GigaChat
+
+    return GigaChat(
+        credentials=auth_token,
+        verify_ssl_certs=False,
+        streaming=streaming,
+        timeout=LLM_TIMEOUT,
+    )
+
+
+class _TokenQueueHandler(BaseCallbackHandler):
+    """
+    Обработчик обратных вызовов langchain, складывающий токены ответа в очередь.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.received = False
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.received = True
+        self.tokens.put(token)
 
 
 class AssistantLLM:
@@ -20,16 +87,47 @@ class AssistantLLM:
     Класс для работы с языковой моделью GigaChat как школьного ассистента.
     """
 
-    def __init__(self, auth_token=GIGACHAT_AUTH_TOKEN, system_prompt=SYSTEM_PROMPT):
+    def __init__(
+        self,
+        auth_token=GIGACHAT_AUTH_TOKEN,
+        system_prompt=SYSTEM_PROMPT,
+        streaming=False,
+        knowledge=None,
+        cache=None,
+        chat_model=None,
+    ):
         """
         Инициализирует экземпляр модели GigaChat с заданным системным промптом.
 
         Args:
             auth_token (str): Токен авторизации для GigaChat.
-            system_prompt (str): Системный промпт для модели.
+            system_prompt (str): Системный промпт для модели. Вместо {context}
+                подставляются фрагменты базы знаний, найденные по вопросу.
+            streaming (bool): Запрашивать ответ потоково (по токенам).
+            knowledge (KnowledgeIndex): Индекс базы знаний. Если не указан,
+                загружается индекс из KNOWLEDGE_DIR.
+            cache (ResponseCache): Кеш ответов. Если не указан, создается
+                новый при LLM_CACHE_ENABLED.
+            chat_model: Чат-модель langchain. Если не указана, создается
+                GigaChat (например, в бенчмарках передается заглушка).
         """
         self.auth_token = auth_token
         self.system_prompt = system_prompt
+        self.streaming = streaming
+        self.chat_model = chat_model
+        if knowledge is None:
+            knowledge = KnowledgeIndex()
+            knowledge.refresh()
+        self.knowledge = knowledge
+        if cache is None and LLM_CACHE_ENABLED:
+            cache = ResponseCache()
+        self.cache = cache
+        self.memory = TokenBudgetMemory(return_messages=True)
+        # Оценка размера последнего запроса к модели в токенах
+        self.last_prompt_tokens = 0
+        # Контекст текущего запроса; у каждого потока свой, поэтому
+        # одновременные запросы не подменяют контекст друг друга
+        self._request = threading.local()
         self.conversation = self._init_conversation()
 
     def _init_conversation(self):
@@ -39,39 +137,262 @@ class AssistantLLM:
         Returns:
             ConversationChain: Объект цепочки разговора.
         """
-        # Создаем шаблон чата с использованием системного сообщения, истории и сообщения пользователя
+        # Создаем шаблон чата с использованием системного сообщения, истории и сообщения пользователя.
+        # К системному сообщению добавляется сводка ходов, вытесненных из памяти
         chat_prompt = ChatPromptTemplate.from_messages(
             [
-                SystemMessagePromptTemplate.from_template(self.system_prompt),
+                SystemMessagePromptTemplate.from_template(
+                    self.system_prompt + "{summary}"
+                ),
                 MessagesPlaceholder(variable_name="history"),
                 HumanMessagePromptTemplate.from_template("{input}"),
             ]
         )
+        # Контекст из базы знаний вычисляется для каждого запроса отдельно
+        if "context" in chat_prompt.input_variables:
+            chat_prompt = chat_prompt.partial(
+                context=lambda: getattr(self._request, "context", "")
+            )
 
         # Инициализация LLM
-        llm = GigaChat(credentials=self.auth_token, verify_ssl_certs=False)
+        llm = self.chat_model
+        if llm is None:
+            llm = create_chat_model(self.auth_token, self.streaming)
 
         # Создание цепочки разговора с кастомным промптом и корректной памятью
         return ConversationChain(
             llm=llm,
             prompt=chat_prompt,
-            verbose=True,
-            memory=ConversationBufferMemory(return_messages=True),
+            verbose=LLM_VERBOSE,
+            memory=self.memory,
+        )
+
+    def _prepare_context(self, user_input):
+        """
+        Находит фрагменты базы знаний для вопроса и подставляет их
+        в промпт текущего потока.
+
+        Args:
+            user_input (str): Вопрос пользователя.
+
+        Returns:
+            str: Контекст запроса.
+        """
+        self._request.context = self.knowledge.context(user_input)
+        return self._request.context
+
+    def _cache_fingerprint(self, user_input, use_cache):
+        """
+        Определяет, можно ли использовать кеш для вопроса.
+
+        Args:
+            user_input (str): Вопрос пользователя.
+            use_cache (bool): Явное разрешение или запрет кеша. Если None,
+                кеш не используется для вопросов, зависящих от истории диалога.
+
+        Returns:
+            str: Отпечаток промпта и контекста для ключа кеша или None,
+                если кеш не используется.
+        """
+        if self.cache is None:
+            return None
+        if use_cache is None:
+            use_cache = not depends_on_history(user_input)
+        if not use_cache:
+            METRICS.inc("llm.cache.bypass")
+            return None
+        return context_fingerprint(self.system_prompt, self._request.context)
+
+    def _cached_response(self, user_input, fingerprint):
+        """
+        Возвращает ответ из кеша и добавляет ход в историю диалога.
+
+        Returns:
+            str: Ответ или None, если в кеше его нет.
+        """
+        if fingerprint is None:
+            return None
+        response = self.cache.get(user_input, fingerprint)
+        if response is not None:
+            self.remember(user_input, response)
+        return response
+
+    def _store_response(self, user_input, fingerprint, response):
+        """
+        Сохраняет успешный ответ модели в кеш.
+        """
+        if fingerprint is not None and response and response != ERROR_RESPONSE:
+            self.cache.put(user_input, fingerprint, response)
+
+    def _record_prompt(self, user_input, started):
+        """
+        Запоминает размер последнего запроса и время ответа модели.
+
+        Args:
+            user_input (str): Вопрос пользователя.
+            started (float): Время начала запроса (time.perf_counter).
+        """
+        self.last_prompt_tokens = (
+            estimate_tokens(self.system_prompt)
+            + estimate_tokens(getattr(self._request, "context", ""))
+            + self.memory.last_history_tokens
+            + estimate_tokens(user_input)
         )
+        METRICS.observe("llm.prompt_tokens", self.last_prompt_tokens)
+        METRICS.observe("llm.latency", time.perf_counter() - started)
 
-    def get_response(self, user_input):
+    def get_response(self, user_input, use_cache=None):
         """
         Получает ответ от модели на вопрос пользователя.
 
         Args:
             user_input (str): Вопрос или запрос пользователя.
+            use_cache (bool): Использовать кеш ответов. Если не указан, кеш
+                пропускается для вопросов, зависящих от истории диалога.
+
+        Returns:
+            str: Ответ модели, ERROR_RESPONSE при ошибке или
+                UNAVAILABLE_RESPONSE, пока GigaChat недоступен.
+        """
+        started = time.perf_counter()
+        try:
+            self._prepare_context(user_input)
+            fingerprint = self._cache_fingerprint(user_input, use_cache)
+            response = self._cached_response(user_input, fingerprint)
+            if response is not None:
+                return response
+
+            response = GIGACHAT_BREAKER.call(self.conversation.predict, input=user_input)
+            self._record_prompt(user_input, started)
+            self._store_response(user_input, fingerprint, response)
+            return response
+        except CircuitOpenError as e:
+            logger.warning(f"Ответ от LLM не запрошен: {str(e)}")
+            return UNAVAILABLE_RESPONSE
+        except Exception as e:
+            logger.error(f"Ошибка при получении ответа от LLM: {str(e)}")
+            return ERROR_RESPONSE
+
+    def draft_response(self, user_input, use_cache=None):
+        """
+        Получает ответ модели, не добавляя ход в историю диалога.
+
+        Используется для спекулятивного запроса по частичной гипотезе
+        распознавания: если ответ будет принят, ход добавляется в историю
+        через remember().
+
+        Args:
+            user_input (str): Вопрос или запрос пользователя.
+            use_cache (bool): Использовать кеш ответов (см. get_response).
 
         Returns:
-            str: Ответ модели.
+            str: Ответ модели или None при ошибке и недоступности GigaChat.
         """
+        started = time.perf_counter()
         try:
-            response = self.conversation.predict(input=user_input)
+            self._prepare_context(user_input)
+            fingerprint = self._cache_fingerprint(user_input, use_cache)
+            if fingerprint is not None:
+                response = self.cache.get(user_input, fingerprint)
+                if response is not None:
+                    return response
+
+            # generate, в отличие от predict, не сохраняет ход в память цепочки
+            inputs = self.conversation.prep_inputs({"input": user_input})
+            result = GIGACHAT_BREAKER.call(self.conversation.generate, [inputs])
+            response = self.conversation.create_outputs(result)[0][self.conversation.output_key]
+            self._record_prompt(user_input, started)
+            self._store_response(user_input, fingerprint, response)
             return response
+        except CircuitOpenError as e:
+            logger.warning(f"Спекулятивный запрос к LLM не выполнен: {str(e)}")
+            return None
         except Exception as e:
-            print(f"Ошибка при получении ответа от LLM: {str(e)}")
-            return "Извините, произошла ошибка при обработке вашего запроса."
+            logger.error(f"Ошибка при спекулятивном запросе к LLM: {str(e)}")
+            return None
+
+    def remember(self, user_input, response):
+        """
+        Добавляет в историю диалога ход, на который ответили без модели,
+        чтобы последующие вопросы учитывали его.
+
+        Args:
+            user_input (str): Вопрос пользователя.
+            response (str): Ответ.
+        """
+        self.memory.save_context({"input": user_input}, {"response": response})
+
+    def stream_response(self, user_input, use_cache=None, deadline=None):
+        """
+        Получает ответ модели по частям по мере генерации.
+
+        Запрос выполняется в фоновом потоке, токены передаются через очередь.
+        Если модель не поддерживает потоковую генерацию, ответ возвращается
+        одним фрагментом после завершения запроса. Ответ из кеша также
+        возвращается одним фрагментом.
+
+        Args:
+            user_input (str): Вопрос или запрос пользователя.
+            use_cache (bool): Использовать кеш ответов (см. get_response).
+            deadline (Deadline): Срок ответа: если очередной фрагмент не
+                получен вовремя, ответ обрывается.
+
+        Yields:
+            str: Очередной фрагмент ответа модели.
+        """
+        context = self._prepare_context(user_input)
+        fingerprint = self._cache_fingerprint(user_input, use_cache)
+        response = self._cached_response(user_input, fingerprint)
+        if response is not None:
+            yield response
+            return
+
+        if not GIGACHAT_BREAKER.allow():
+            logger.warning("Ответ от LLM не запрошен: GigaChat временно недоступен")
+            yield UNAVAILABLE_RESPONSE
+            return
+
+        tokens = queue.Queue()
+        handler = _TokenQueueHandler(tokens)
+        done = object()
+
+        def worker():
+            started = time.perf_counter()
+            # Контекст хранится отдельно для каждого потока
+            self._request.context = context
+            try:
+                try:
+                    response = self.conversation.predict(
+                        input=user_input, callbacks=[handler]
+                    )
+                except Exception:
+                    GIGACHAT_BREAKER.record_failure()
+                    raise
+                GIGACHAT_BREAKER.record_success()
+                self._record_prompt(user_input, started)
+                self._store_response(user_input, fingerprint, response)
+                if not handler.received:
+                    tokens.put(response)
+            except Exception as e:
+                logger.error(f"Ошибка при получении ответа от LLM: {str(e)}")
+                if not handler.received:
+                    tokens.put(ERROR_RESPONSE)
+            finally:
+                tokens.put(done)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+        received = False
+        while True:
+            try:
+                token = tokens.get(timeout=deadline.remaining() if deadline else None)
+            except queue.Empty:
+                logger.error("Превышено время ожидания ответа от LLM")
+                METRICS.inc("llm.deadline_exceeded")
+                if not received:
+                    yield UNAVAILABLE_RESPONSE
+                return
+            if token is done:
+                return
+            received = True
+            yield token
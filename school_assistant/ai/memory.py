@@ -0,0 +1,178 @@
+"""
+Модуль памяти диалога с ограничением по числу токенов.
+
+Последние ходы диалога хранятся дословно, более старые сворачиваются
+в краткую сводку из вопросов пользователя, а при превышении бюджета
+сводка укорачивается. После долгого простоя (смена ученика) история
+сбрасывается, поэтому размер запроса к модели не растет в течение дня.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain.memory import ConversationBufferMemory
+
+from school_assistant.config.config import (
+    LLM_MEMORY_MAX_TOKENS,
+    LLM_MEMORY_RECENT_TURNS,
+    LLM_MEMORY_IDLE_TIMEOUT,
+)
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Среднее число символов русского текста на один токен модели
+CHARS_PER_TOKEN = 3
+# Максимальная длина вопроса в сводке (символов)
+SUMMARY_ITEM_CHARS = 80
+# Заголовок сводки, добавляемой к системному промпту
+SUMMARY_PREFIX = "\n\nРанее в разговоре пользователь спрашивал: "
+
+
+def estimate_tokens(text):
+    """
+    Приблизительно оценивает число токенов в тексте.
+
+    Токенизатор GigaChat локально недоступен, поэтому используется оценка
+    по длине текста; для контроля бюджета ее точности достаточно.
+
+    Args:
+        text (str): Текст.
+
+    Returns:
+        int: Оценка числа токенов.
+    """
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class TokenBudgetMemory(ConversationBufferMemory):
+    """
+    Память диалога с бюджетом токенов и сбросом по простою.
+
+    Помимо истории сообщений ("history") возвращает переменную "summary" —
+    сводку вытесненных ходов, которую шаблон промпта добавляет к системному
+    сообщению.
+    """
+
+    max_tokens: int = LLM_MEMORY_MAX_TOKENS
+    recent_turns: int = LLM_MEMORY_RECENT_TURNS
+    idle_timeout: float = LLM_MEMORY_IDLE_TIMEOUT
+    summary_key: str = "summary"
+    summary_items: List[str] = []
+    last_activity: Optional[float] = None
+    # Размер истории и сводки в последнем запросе (оценка в токенах)
+    last_history_tokens: int = 0
+
+    @property
+    def memory_variables(self) -> List[str]:
+        """
+        Переменные, которые память подставляет в промпт.
+
+        :meta private:
+        """
+        return [self.memory_key, self.summary_key]
+
+    @property
+    def summary(self) -> str:
+        """
+        Текст сводки вытесненных ходов для системного промпта.
+        """
+        if not self.summary_items:
+            return ""
+        return SUMMARY_PREFIX + "; ".join(self.summary_items) + "."
+
+    def history_tokens(self) -> int:
+        """
+        Оценивает размер истории и сводки в токенах.
+
+        Returns:
+            int: Оценка числа токенов.
+        """
+        messages = self.chat_memory.messages
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(message.content) for message in messages
+        )
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Возвращает историю и сводку, предварительно сбрасывая историю
+        после простоя.
+        """
+        if self.is_idle():
+            logger.info("Память диалога сброшена после простоя")
+            METRICS.inc("llm.memory.idle_reset")
+            self.clear()
+
+        self.last_history_tokens = self.history_tokens()
+        return {self.memory_key: self.buffer, self.summary_key: self.summary}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """
+        Сохраняет ход диалога и укладывает историю в бюджет.
+        """
+        super().save_context(inputs, outputs)
+        self.last_activity = time.monotonic()
+        self.prune()
+
+    def clear(self) -> None:
+        """
+        Очищает историю и сводку.
+        """
+        super().clear()
+        self.summary_items = []
+        self.last_activity = None
+
+    def is_idle(self) -> bool:
+        """
+        Проверяет, истекло ли время простоя с последнего хода.
+
+        Returns:
+            bool: True, если историю пора сбросить.
+        """
+        return (
+            self.idle_timeout > 0
+            and self.last_activity is not None
+            and time.monotonic() - self.last_activity > self.idle_timeout
+        )
+
+    def prune(self) -> None:
+        """
+        Сворачивает старые ходы в сводку и укорачивает ее до бюджета.
+
+        Ходы старше recent_turns сворачиваются всегда; более новые — только
+        если история не помещается в бюджет. Последний ход сохраняется
+        дословно в любом случае.
+        """
+        messages = self.chat_memory.messages
+        evicted = 0
+        while len(messages) > 2 and (
+            len(messages) > 2 * self.recent_turns
+            or self.history_tokens() > self.max_tokens
+        ):
+            question = messages[0].content
+            del messages[:2]
+            self.summary_items.append(self._shorten(question))
+            evicted += 1
+
+        # Сводка занимает не больше четверти бюджета
+        while self.summary_items and (
+            estimate_tokens(self.summary) > self.max_tokens // 4
+            or self.history_tokens() > self.max_tokens
+        ):
+            self.summary_items.pop(0)
+
+        if evicted:
+            METRICS.inc("llm.memory.evicted_turns", evicted)
+
+    @staticmethod
+    def _shorten(text):
+        """
+        Укорачивает вопрос для сводки.
+        """
+        text = " ".join(text.split())
+        if len(text) <= SUMMARY_ITEM_CHARS:
+            return text
+        return text[:SUMMARY_ITEM_CHARS].rsplit(" ", 1)[0] + "…"
@@ -0,0 +1,175 @@
+"""
+Модуль кеша ответов языковой модели.
+
+Ключ кеша — нормализованная форма вопроса (регистр, пунктуация и
+стоп-слова не учитываются, слова приводятся к основе; порядок слов и
+отрицания сохраняются) и отпечаток
+системного промпта с контекстом из базы знаний. При изменении промпта
+или документов отпечаток меняется, и старые ответы больше не находятся.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import groupby
+
+from school_assistant.config.config import LLM_CACHE_SIZE, LLM_CACHE_TTL
+from school_assistant.knowledge.text import tokenize
+from school_assistant.utils.metrics import METRICS
+
+# Слова, по которым вопрос ссылается на предыдущие реплики диалога
+# («а в четверг?», «расскажи подробнее», «что это значит?»)
+_HISTORY_RE = re.compile(
+    r"^\s*(?:а|и|ну)\b"
+    r"|\b(?:еще|ещё|подробнее|дальше|тогда|это|этот|эта|эти|этого|того|"
+    r"он|она|оно|они|его|ее|её|их|там|тоже|также|почему)\b",
+    re.IGNORECASE,
+)
+
+# Отрицания меняют смысл вопроса («можно ли не делать…»), поэтому из ключа
+# не отбрасываются
+NEGATIONS = frozenset(("не", "ни", "нет", "без"))
+
+
+def normalize_question(text):
+    """
+    Приводит вопрос к нормализованной форме.
+
+    Args:
+        text (str): Вопрос пользователя.
+
+    Returns:
+        str: Основы значимых слов в исходном порядке через пробел
+            (повторы слова подряд схлопываются).
+    """
+    return " ".join(term for term, _ in groupby(tokenize(text, keep=NEGATIONS)))
+
+
+def depends_on_history(text):
+    """
+    Проверяет, ссылается ли вопрос на предыдущие реплики диалога.
+
+    Ответ на такой вопрос зависит от истории, поэтому кешировать его нельзя.
+
+    Args:
+        text (str): Вопрос пользователя.
+
+    Returns:
+        bool: True, если вопрос, вероятно, зависит от истории.
+    """
+    return bool(_HISTORY_RE.search(text))
+
+
+def context_fingerprint(*parts):
+    """
+    Вычисляет отпечаток промпта и контекста запроса.
+
+    Args:
+        *parts (str): Системный промпт, контекст из базы знаний и т.п.
+
+    Returns:
+        str: Хеш частей.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Потокобезопасный LRU-кеш ответов со временем жизни записей.
+    """
+
+    def __init__(self, max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL):
+        """
+        Инициализирует кеш.
+
+        Args:
+            max_size (int): Максимальное количество ответов.
+            ttl (float): Время жизни ответа в секундах (0 — без ограничения).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(question, fingerprint):
+        """
+        Вычисляет ключ кеша.
+
+        Args:
+            question (str): Вопрос пользователя.
+            fingerprint (str): Отпечаток промпта и контекста.
+
+        Returns:
+            tuple: Ключ кеша или None, если в вопросе нет значимых слов.
+        """
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        return fingerprint, normalized
+
+    def get(self, question, fingerprint):
+        """
+        Возвращает сохраненный ответ на вопрос.
+
+        Args:
+            question (str): Вопрос пользователя.
+            fingerprint (str): Отпечаток промпта и контекста.
+
+        Returns:
+            str: Ответ или None, если его нет или он устарел.
+        """
+        key = self.make_key(question, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                METRICS.inc("llm.cache.expired")
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                METRICS.inc("llm.cache.miss")
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            METRICS.inc("llm.cache.hit")
+            return entry[1]
+
+    def put(self, question, fingerprint, response):
+        """
+        Сохраняет ответ на вопрос.
+
+        Args:
+            question (str): Вопрос пользователя.
+            fingerprint (str): Отпечаток промпта и контекста.
+            response (str): Ответ модели.
+        """
+        key = self.make_key(question, fingerprint)
+        if key is None or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                METRICS.inc("llm.cache.evicted")
+
+    def clear(self):
+        """
+        Очищает кеш.
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,149 @@
+"""
+Модуль общего HTTP-клиента для запросов к API Сбера.
+
+Все запросы выполняются через одну сессию requests с пулом соединений
+и keep-alive, поэтому TCP- и TLS-рукопожатие выполняется один раз на хост,
+а не на каждый запрос.
+"""
+
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from school_assistant.config.config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Проверка SSL-сертификатов отключена (как и раньше), предупреждения не нужны
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(
+    pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE
+):
+    """
+    Создает сессию requests с пулом соединений.
+
+    Args:
+        pool_connections (int): Количество хостов, для которых хранится пул.
+        pool_maxsize (int): Максимальное число соединений в пуле одного хоста.
+
+    Returns:
+        requests.Session: Новая сессия.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = False
+    return session
+
+
+def get_session():
+    """
+    Возвращает общую для всего приложения сессию, создавая ее при первом вызове.
+
+    Returns:
+        requests.Session: Общая сессия.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def close_session():
+    """
+    Закрывает общую сессию и все соединения пула.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def post(url, timeout=None, **kwargs):
+    """
+    Выполняет POST-запрос через общую сессию.
+
+    Args:
+        url (str): URL запроса.
+        timeout (tuple): Таймауты (соединение, чтение) в секундах. Если не
+            указаны, используются значения из конфигурации.
+        **kwargs: Остальные параметры requests.Session.post.
+
+    Returns:
+        requests.Response: Ответ сервера.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    # verify передается явно: session.verify перекрывается REQUESTS_CA_BUNDLE
+    kwargs.setdefault("verify", False)
+    return get_session().post(url, timeout=timeout, **kwargs)
+
+
+def warm_up(urls, timeout=None):
+    """
+    Заранее устанавливает соединения с хостами, чтобы первый запрос
+    взаимодействия не тратил время на TCP- и TLS-рукопожатие.
+
+    Args:
+        urls (list): URL, хосты которых нужно прогреть.
+        timeout (tuple): Таймауты (соединение, чтение) в секундах.
+
+    Returns:
+        int: Количество хостов, соединение с которыми установлено.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+    session = get_session()
+    warmed = 0
+    seen = set()
+    for url in urls:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin in seen:
+            continue
+        seen.add(origin)
+
+        try:
+            # Ответ не важен: после чтения соединение возвращается в пул
+            session.head(origin + "/", timeout=timeout, verify=False)
+            warmed += 1
+        except requests.RequestException as e:
+            logger.error(f"Не удалось прогреть соединение с {origin}: {str(e)}")
+
+    return warmed
+
+
+def warm_up_async(urls):
+    """
+    Прогревает соединения в фоновом потоке.
+
+    Args:
+        urls (list): URL, хосты которых нужно прогреть.
+
+    Returns:
+        threading.Thread: Запущенный поток.
+    """
+    thread = threading.Thread(target=warm_up, args=(urls,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,257 @@
+"""
+Модуль для потокового распознавания речи.
+
+Позволяет отправлять аудио на распознавание по мере записи, не дожидаясь
+окончания записи и сохранения файла.
+"""
+
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from school_assistant.api import http_client
+from school_assistant.api.resilience import RETRY_STATUSES, SBER_BREAKER
+from school_assistant.api.sber_api import RECOGNIZE_URL, resolve_token
+from school_assistant.config.config import AUDIO_RATE, LOCAL_STT_TEXT
+from school_assistant.utils.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+# Признак отмены сессии в очереди фрагментов
+_CANCEL = object()
+
+
+class SessionCancelled(Exception):
+    """
+    Передача аудио прервана отменой сессии.
+    """
+
+
+class RecognitionSession(ABC):
+    """
+    Базовый класс сессии распознавания речи.
+
+    Сессия принимает фрагменты PCM-аудио через feed() по мере записи
+    и возвращает результат распознавания через finish().
+    """
+
+    def __init__(self):
+        """
+        Инициализирует сессию распознавания.
+        """
+        self.bytes_fed = 0
+        self.closed = False
+
+    @abstractmethod
+    def feed(self, chunk):
+        """
+        Передает очередной фрагмент аудио на распознавание.
+
+        Args:
+            chunk (bytes): Фрагмент PCM-аудио.
+        """
+
+    @abstractmethod
+    def finish(self, timeout=30):
+        """
+        Завершает передачу аудио и ожидает результат распознавания.
+
+        Args:
+            timeout (float): Максимальное время ожидания результата в секундах.
+
+        Returns:
+            list: Список распознанных фраз или None в случае ошибки.
+        """
+
+    def cancel(self):
+        """
+        Отменяет сессию без ожидания результата.
+        """
+        self.closed = True
+
+
+class SberStreamingSession(RecognitionSession):
+    """
+    Сессия распознавания, передающая аудио в API Сбера чанками
+    (Transfer-Encoding: chunked) по мере записи.
+    """
+
+    def __init__(self, token, rate=AUDIO_RATE, url=RECOGNIZE_URL):
+        """
+        Открывает соединение с API распознавания в фоновом потоке.
+
+        Args:
+            token: Токен доступа или менеджер токенов.
+            rate (int): Частота дискретизации аудио.
+            url (str): URL эндпоинта распознавания.
+        """
+        super().__init__()
+        self.token = token
+        self.rate = rate
+        self.url = url
+        self._chunks = queue.Queue()
+        self._result = None
+        self._cancelled = False
+        self._thread = threading.Thread(target=self._upload, daemon=True)
+        self._thread.start()
+
+    def _body(self):
+        """
+        Генератор тела запроса: отдает фрагменты аудио до признака конца.
+        При отмене сессии прерывает передачу исключением, чтобы запрос
+        с неполным аудио не дошел до API.
+        """
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _CANCEL:
+                raise SessionCancelled()
+            if chunk is None:
+                return
+            yield chunk
+
+    def _upload(self):
+        """
+        Выполняет потоковый POST-запрос и сохраняет результат распознавания.
+        """
+        headers = {
+            "Authorization": f"Bearer {resolve_token(self.token)}",
+            "Content-Type": f"audio/x-pcm;bit=16;rate={self.rate}",
+        }
+
+        # Поток аудио нельзя отправить повторно, поэтому запрос не повторяется,
+        # но его результат учитывается автоматом защиты API Сбера
+        if not SBER_BREAKER.allow():
+            logger.warning("API Сбера временно недоступен, потоковое распознавание пропущено")
+            return
+
+        body = self._body()
+        try:
+            # Спан охватывает всю запись: запрос идет, пока пользователь говорит
+            with TRACER.span("sber.recognize_stream") as span:
+                response = http_client.post(self.url, headers=headers, data=body)
+                span.add_bytes(sent=self.bytes_fed, received=len(response.content))
+                span.set(status=response.status_code)
+
+            if self._cancelled:
+                # Аудио уже передано целиком: результат не нужен
+                response.close()
+                SBER_BREAKER.release()
+                return
+
+            if response.status_code in RETRY_STATUSES:
+                SBER_BREAKER.record_failure()
+            else:
+                SBER_BREAKER.record_success()
+
+            if response.status_code == 200:
+                result = response.json()
+                logger.debug("Ответ API потокового распознавания речи: %s", result)
+                self._result = result["result"]
+            else:
+                logger.error(
+                    f"Ошибка потокового распознавания речи: {response.status_code} - {response.text}"
+                )
+        except Exception as e:
+            if self._cancelled:
+                # Отмена — не ошибка сервиса
+                SBER_BREAKER.release()
+                logger.info("Потоковое распознавание отменено")
+                return
+            SBER_BREAKER.record_failure()
+            logger.error(f"Ошибка при потоковом распознавании речи: {str(e)}")
+        finally:
+            body.close()
+
+    def feed(self, chunk):
+        # Передача уже завершилась (автомат защиты, ошибка HTTP): очередь
+        # больше никто не читает
+        if self.closed or self._result is not None or not self._thread.is_alive():
+            return
+        self.bytes_fed += len(chunk)
+        self._chunks.put(bytes(chunk))
+
+    def finish(self, timeout=30):
+        if not self.closed:
+            self.closed = True
+            self._chunks.put(None)
+
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Превышено время ожидания результата распознавания")
+            return None
+        return self._result
+
+    def cancel(self):
+        # Передача прерывается, а не завершается: неполное аудио не
+        # распознается и не расходует квоту
+        self._cancelled = True
+        self.closed = True
+        self._chunks.put(_CANCEL)
+
+
+class LocalRecognitionSession(RecognitionSession):
+    """
+    Локальный заменитель распознавателя для тестирования без доступа к API.
+
+    Возвращает заданный текст (или результат функции transcriber)
+    с искусственной задержкой после окончания записи.
+    """
+
+    def __init__(self, transcript=LOCAL_STT_TEXT, transcriber=None, latency=0.0):
+        """
+        Инициализирует локальную сессию распознавания.
+
+        Args:
+            transcript (str): Текст, возвращаемый в качестве результата.
+            transcriber (callable): Функция, получающая PCM-аудио и
+                возвращающая текст. Если указана, используется вместо transcript.
+            latency (float): Имитируемая задержка распознавания в секундах.
+        """
+        super().__init__()
+        self.transcript = transcript
+        self.transcriber = transcriber
+        self.latency = latency
+        self._audio = bytearray()
+
+    def feed(self, chunk):
+        if self.closed:
+            return
+        self.bytes_fed += len(chunk)
+        if self.transcriber:
+            self._audio.extend(chunk)
+
+    def finish(self, timeout=30):
+        self.closed = True
+        if self.bytes_fed == 0:
+            return None
+
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+
+        if self.transcriber:
+            text = self.transcriber(bytes(self._audio))
+        else:
+            text = self.transcript
+
+        return [text] if text else None
+
+
+def create_recognition_session(mode, token=None, rate=AUDIO_RATE):
+    """
+    Создает сессию распознавания речи для указанного режима.
+
+    Args:
+        mode (str): Режим распознавания: "streaming" (API Сбера) или "local".
+        token: Токен доступа или менеджер токенов (для режима "streaming").
+        rate (int): Частота дискретизации аудио.
+
+    Returns:
+        RecognitionSession: Сессия распознавания.
+    """
+    if mode == "streaming":
+        return SberStreamingSession(token, rate=rate)
+    if mode == "local":
+        return LocalRecognitionSession()
+    raise ValueError(f"Неизвестный режим распознавания: {mode}")
@@ -0,0 +1,410 @@
+"""
+Модуль устойчивости к сбоям сети: сроки выполнения, повторы запросов
+и автоматы защиты (circuit breaker).
+
+Срок (Deadline) задается на весь ход диалога и делится между этапами:
+таймауты HTTP-запросов не выходят за оставшееся время. Идемпотентные
+запросы повторяются при сетевых ошибках и ответах 429/5xx с экспоненциальной
+задержкой со случайным разбросом. Автомат защиты после серии неудачных
+обращений к сервису на время перестает к нему обращаться, и вызывающий код
+сразу отвечает пользователю, что сервис недоступен.
+"""
+
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from school_assistant.config.config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    RETRY_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+)
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Ответ пользователю, пока внешний сервис недоступен
+UNAVAILABLE_RESPONSE = "Извини, сейчас нет связи с сервером. Попробуй спросить чуть позже."
+# Коды ответа, при которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Сетевые ошибки, при которых запрос имеет смысл повторить
+RETRY_EXCEPTIONS = (requests.ConnectionError, requests.Timeout)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Срок выполнения истек.
+    """
+
+
+class CircuitOpenError(Exception):
+    """
+    Автомат защиты разомкнут: сервис считается недоступным.
+    """
+
+
+class Deadline:
+    """
+    Момент, к которому операция должна завершиться.
+    """
+
+    def __init__(self, seconds=None):
+        """
+        Args:
+            seconds (float): Время на операцию в секундах (None — без ограничения).
+        """
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        """
+        Возвращает оставшееся время в секундах (None — без ограничения).
+        """
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """
+        Проверяет, истек ли срок.
+        """
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def raise_if_expired(self, stage=""):
+        """
+        Прерывает операцию, если срок истек.
+
+        Raises:
+            DeadlineExceeded: Если срок истек.
+        """
+        if self.expired():
+            raise DeadlineExceeded(f"Истек срок выполнения {stage}".strip())
+
+    def stage(self, seconds):
+        """
+        Выделяет срок для этапа: не больше seconds и не позже общего срока.
+
+        Args:
+            seconds (float): Максимальная длительность этапа.
+
+        Returns:
+            Deadline: Срок этапа.
+        """
+        child = Deadline(seconds)
+        if self.expires_at is not None:
+            child.expires_at = min(child.expires_at, self.expires_at)
+        return child
+
+    def timeout(self, connect=HTTP_CONNECT_TIMEOUT, read=HTTP_READ_TIMEOUT):
+        """
+        Вычисляет таймауты HTTP-запроса, не выходящие за срок.
+
+        Returns:
+            tuple: Таймауты (соединение, чтение) в секундах.
+
+        Raises:
+            DeadlineExceeded: Если срок уже истек.
+        """
+        self.raise_if_expired()
+        remaining = self.remaining()
+        if remaining is None:
+            return connect, read
+        return min(connect, remaining), min(read, remaining)
+
+
+class CircuitBreaker:
+    """
+    Автомат защиты сервиса.
+
+    В замкнутом состоянии обращения разрешены. После failure_threshold
+    неудач подряд автомат размыкается и reset_timeout секунд отклоняет
+    обращения, затем пропускает одно пробное: при успехе замыкается,
+    при неудаче снова размыкается.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    # Числовые значения состояний для метрик
+    STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+    ):
+        """
+        Args:
+            name (str): Имя сервиса для журнала и метрик.
+            failure_threshold (int): Число неудач подряд до размыкания.
+            reset_timeout (float): Время в разомкнутом состоянии (секунды).
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        Текущее состояние автомата.
+        """
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def is_open(self):
+        """
+        Проверяет, отклоняет ли автомат обращения.
+        """
+        return self.state == self.OPEN
+
+    def allow(self):
+        """
+        Проверяет, можно ли обратиться к сервису.
+
+        В полуразомкнутом состоянии разрешается только одно пробное обращение.
+
+        Returns:
+            bool: True, если обращение разрешено.
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+        METRICS.inc(f"breaker.{self.name}.rejected")
+        return False
+
+    def record_success(self):
+        """
+        Отмечает успешное обращение к сервису.
+        """
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        """
+        Отмечает неудачное обращение к сервису.
+        """
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            METRICS.inc(f"breaker.{self.name}.failures")
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def release(self):
+        """
+        Завершает разрешенное обращение, результат которого не говорит
+        о состоянии сервиса (например, запрос отменен пользователем):
+        пробное обращение освобождается, состояние не меняется.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def call(self, func, *args, **kwargs):
+        """
+        Вызывает функцию через автомат защиты.
+
+        Любое исключение функции считается неудачей.
+
+        Returns:
+            Результат функции.
+
+        Raises:
+            CircuitOpenError: Если автомат разомкнут.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Сервис {self.name} временно недоступен")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def _update_state(self):
+        """
+        Переводит автомат в полуразомкнутое состояние по истечении reset_timeout.
+        Вызывается под блокировкой.
+        """
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+
+    def _set_state(self, state):
+        """
+        Меняет состояние автомата и сообщает об этом в журнал и метрики.
+        Вызывается под блокировкой.
+        """
+        logger.warning(f"Автомат защиты {self.name}: {self._state} -> {state} (неудач подряд: {self.failures})")
+        self._state = state
+        METRICS.inc(f"breaker.{self.name}.{state}")
+        METRICS.observe(f"breaker.{self.name}.state", self.STATE_CODES[state])
+
+
+class ThrottleTracker:
+    """
+    Счетчик ответов 429 в вызовах call_with_retries одной операции.
+
+    Вызовы через run() выполняются в текущем потоке с этим счетчиком,
+    поэтому одновременные операции в других потоках на него не влияют.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.throttled = 0
+
+    def run(self, func, *args, **kwargs):
+        """
+        Вызывает функцию, учитывая ответы 429 в ее запросах.
+
+        Returns:
+            Результат функции.
+        """
+        previous = getattr(self._local, "tracker", None)
+        self._local.tracker = self
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.tracker = previous
+
+    @classmethod
+    def record(cls):
+        """
+        Отмечает ответ 429 в счетчике операции текущего потока.
+        """
+        tracker = getattr(cls._local, "tracker", None)
+        if tracker is not None:
+            tracker.throttled += 1
+
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """
+    Вычисляет паузу перед повтором: экспоненциальный рост со случайным
+    разбросом от нуля (full jitter), чтобы клиенты не повторяли запросы
+    одновременно.
+
+    Args:
+        attempt (int): Номер неудачной попытки, начиная с 0.
+
+    Returns:
+        float: Пауза в секундах.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retries(
+    send,
+    name,
+    deadline=None,
+    breaker=None,
+    attempts=RETRY_ATTEMPTS,
+    base_delay=RETRY_BASE_DELAY,
+    max_delay=RETRY_MAX_DELAY,
+):
+    """
+    Выполняет идемпотентный HTTP-запрос с повторами.
+
+    Запрос повторяется при сетевых ошибках и ответах с кодами RETRY_STATUSES,
+    пока не закончатся попытки или срок. Для автомата защиты весь вызов
+    с повторами считается одним обращением.
+
+    Args:
+        send (callable): Функция, выполняющая запрос: принимает таймауты
+            (соединение, чтение) и возвращает requests.Response.
+        name (str): Имя запроса для журнала и метрик.
+        deadline (Deadline): Срок выполнения (None — без ограничения).
+        breaker (CircuitBreaker): Автомат защиты сервиса.
+        attempts (int): Максимальное число попыток.
+        base_delay (float): Начальная пауза между попытками (секунды).
+        max_delay (float): Максимальная пауза между попытками (секунды).
+
+    Returns:
+        requests.Response: Ответ последней попытки.
+
+    Raises:
+        CircuitOpenError: Если автомат защиты разомкнут.
+        DeadlineExceeded: Если срок истек до первой попытки.
+        requests.RequestException: Если последняя попытка завершилась ошибкой.
+    """
+    deadline = deadline or Deadline()
+    deadline.raise_if_expired(name)
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(f"Сервис {breaker.name} временно недоступен")
+
+    attempt = 0
+    while True:
+        try:
+            response = send(deadline.timeout())
+            error = None
+            reason = f"код {response.status_code}"
+            retryable = response.status_code in RETRY_STATUSES
+            if response.status_code == 429:
+                # Сервис ограничивает частоту: по этому сигналу шлюз снижает нагрузку
+                METRICS.inc("upstream.throttled")
+                ThrottleTracker.record()
+        except RETRY_EXCEPTIONS as e:
+            error = e
+            reason = type(e).__name__
+            retryable = True
+        except DeadlineExceeded:
+            # Срок вызывающего кода истек до запроса: о состоянии сервиса
+            # это не говорит, но разрешенное пробное обращение освобождается
+            if breaker is not None:
+                breaker.release()
+            raise
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+
+        attempt += 1
+        delay = backoff_delay(attempt - 1, base_delay, max_delay)
+        remaining = deadline.remaining()
+        if not retryable or attempt >= attempts or (remaining is not None and remaining <= delay):
+            break
+
+        METRICS.inc(f"retry.{name}")
+        if error is None:
+            # Ответ с телом, читаемым потоком, занимает соединение пула
+            response.close()
+        logger.warning(f"Повтор запроса {name} ({attempt + 1}/{attempts}) через {delay:.2f} с: {reason}")
+        time.sleep(delay)
+
+    if breaker is not None:
+        if retryable:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    if retryable:
+        METRICS.inc(f"retry.{name}.exhausted")
+    if error is not None:
+        raise error
+    return response
+
+
+# Автоматы защиты внешних сервисов
+SBER_BREAKER = CircuitBreaker("sber")
+GIGACHAT_BREAKER = CircuitBreaker("gigachat")
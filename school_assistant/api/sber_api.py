@@ -2,31 +2,49 @@
 Модуль для работы с API Сбера для синтеза и распознавания речи.
 """
 
+import logging
 import uuid
 import requests
+from school_assistant.api import http_client
+from school_assistant.api.resilience import SBER_BREAKER, call_with_retries
 from school_assistant.config.config import (
     SBER_AUTH_TOKEN,
     SBER_API_SCOPE,
+    SBER_OAUTH_URL,
+    SBER_RECOGNIZE_URL,
+    SBER_SYNTHESIZE_URL,
     OUTPUT_AUDIO_PATH,
+    AUDIO_RATE,
+    TTS_STREAM_CHUNK_BYTES,
 )
+from school_assistant.utils.tracing import TRACER
 
+logger = logging.getLogger(__name__)
 
-def get_token(auth_token=SBER_AUTH_TOKEN, scope=SBER_API_SCOPE):
+# Эндпоинты API Сбера
+OAUTH_URL = SBER_OAUTH_URL
+RECOGNIZE_URL = SBER_RECOGNIZE_URL
+SYNTHESIZE_URL = SBER_SYNTHESIZE_URL
+
+
+def fetch_token(auth_token=SBER_AUTH_TOKEN, scope=SBER_API_SCOPE):
     """
-    Выполняет POST-запрос к эндпоинту для получения токена доступа.
+    Выполняет POST-запрос к эндпоинту для получения токена доступа
+    вместе со временем его истечения.
 
     Args:
         auth_token (str): Токен авторизации, необходимый для запроса.
         scope (str): Область действия запроса API.
 
     Returns:
-        str: Токен доступа или None в случае ошибки.
+        dict: Словарь с ключами "access_token" и "expires_at"
+            (время истечения в миллисекундах Unix) или None в случае ошибки.
     """
     # Создаем идентификатор UUID (36 знаков)
     rq_uid = str(uuid.uuid4())
 
     # API URL
-    url = "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
+    url = OAUTH_URL
 
     # Заголовки
     headers = {
@@ -39,95 +57,334 @@ def get_token(auth_token=SBER_AUTH_TOKEN, scope=SBER_API_SCOPE):
     payload = {"scope": scope}
 
     try:
-        # Делаем POST запрос с отключенной SSL верификацией
-        response = requests.post(url, headers=headers, data=payload, verify=False)
+        # Делаем POST запрос через общую сессию (SSL верификация отключена)
+        with TRACER.span("sber.oauth") as span:
+            response = call_with_retries(
+                lambda timeout: http_client.post(
+                    url, headers=headers, data=payload, timeout=timeout
+                ),
+                "sber.oauth",
+            )
+            span.set(status=response.status_code)
         if response.status_code == 200:
-            return response.json()["access_token"]
+            data = response.json()
+            return {
+                "access_token": data["access_token"],
+                "expires_at": data.get("expires_at"),
+            }
         else:
-            print(f"Ошибка получения токена: {response.status_code} - {response.text}")
+            logger.error(f"Ошибка получения токена: {response.status_code} - {response.text}")
             return None
     except requests.RequestException as e:
-        print(f"Ошибка запроса: {str(e)}")
+        logger.error(f"Ошибка запроса: {str(e)}")
         return None
 
 
-def speech_to_text(file_path, token):
+def get_token(auth_token=SBER_AUTH_TOKEN, scope=SBER_API_SCOPE):
+    """
+    Выполняет POST-запрос к эндпоинту для получения токена доступа.
+
+    Args:
+        auth_token (str): Токен авторизации, необходимый для запроса.
+        scope (str): Область действия запроса API.
+
+    Returns:
+        str: Токен доступа или None в случае ошибки.
+    """
+    data = fetch_token(auth_token, scope)
+    return data["access_token"] if data else None
+
+
+def resolve_token(token):
+    """
+    Возвращает строку токена доступа.
+
+    Args:
+        token: Строка токена или менеджер токенов (объект с методом get_token).
+
+    Returns:
+        str: Токен доступа.
+    """
+    if hasattr(token, "get_token"):
+        return token.get_token()
+    return token
+
+
+def _authorized_post(url, token, name, headers=None, deadline=None, **kwargs):
+    """
+    Выполняет POST-запрос с авторизацией Bearer.
+
+    Запрос повторяется при сетевых ошибках и ответах 429/5xx и проходит
+    через автомат защиты API Сбера. Если передан менеджер токенов и сервер
+    ответил 401, токен обновляется и запрос один раз повторяется.
+
+    Args:
+        url (str): URL запроса.
+        token: Строка токена или менеджер токенов.
+        name (str): Имя запроса для журнала и метрик.
+        headers (dict): Дополнительные заголовки запроса.
+        deadline (Deadline): Срок выполнения запроса с повторами.
+        **kwargs: Остальные параметры http_client.post.
+
+    Returns:
+        requests.Response: Ответ сервера.
+
+    Raises:
+        CircuitOpenError: Если API Сбера считается недоступным.
+        DeadlineExceeded: Если срок истек.
+    """
+    headers = dict(headers or {})
+    access_token = resolve_token(token)
+    headers["Authorization"] = f"Bearer {access_token}"
+
+    def send(timeout):
+        return http_client.post(url, headers=headers, timeout=timeout, **kwargs)
+
+    response = call_with_retries(send, name, deadline=deadline, breaker=SBER_BREAKER)
+
+    if response.status_code == 401 and hasattr(token, "refresh"):
+        logger.warning("Токен доступа отклонен (401), обновляю токен и повторяю запрос")
+        access_token = token.refresh(stale_token=access_token)
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+            response = call_with_retries(
+                send, name, deadline=deadline, breaker=SBER_BREAKER
+            )
+
+    return response
+
+
+def speech_to_text(audio, token, rate=AUDIO_RATE, deadline=None):
     """
     Преобразует речь в текст с помощью API Сбера.
 
     Args:
-        file_path (str): Путь к аудиофайлу.
-        token (str): Токен доступа.
+        audio: PCM-аудио (bytes, bytearray или memoryview) или путь к аудиофайлу.
+        token: Токен доступа или менеджер токенов.
+        rate (int): Частота дискретизации аудио.
+        deadline (Deadline): Срок распознавания с учетом повторов.
 
     Returns:
         list: Список распознанных фраз или None в случае ошибки.
     """
     # URL для распознавания речи
-    url = "https://smartspeech.sber.ru/rest/v1/speech:recognize"
+    url = RECOGNIZE_URL
 
     # Заголовки запроса
     headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "audio/x-pcm;bit=16;rate=16000",
+        "Content-Type": f"audio/x-pcm;bit=16;rate={rate}",
     }
 
     try:
-        # Открытие аудио файла в бинарном режиме
-        with open(file_path, "rb") as audio_file:
-            audio_data = audio_file.read()
+        if isinstance(audio, str):
+            # Открытие аудио файла в бинарном режиме
+            with open(audio, "rb") as audio_file:
+                audio_data = audio_file.read()
+        else:
+            # requests отправляет только bytes целиком; bytearray и memoryview
+            # он воспринял бы как поток
+            audio_data = bytes(audio)
 
         # Отправка POST запроса
-        response = requests.post(url, headers=headers, data=audio_data, verify=False)
+        with TRACER.span("sber.recognize") as span:
+            response = _authorized_post(
+                url,
+                token,
+                "sber.recognize",
+                headers=headers,
+                deadline=deadline,
+                data=audio_data,
+            )
+            span.add_bytes(sent=len(audio_data), received=len(response.content))
+            span.set(status=response.status_code)
 
         # Обработка ответа
         if response.status_code == 200:
             result = response.json()
-            print("Ответ API распознавания речи:", result)
+            logger.debug("Ответ API распознавания речи: %s", result)
             return result["result"]
         else:
-            print(
+            logger.error(
                 f"Ошибка распознавания речи: {response.status_code} - {response.text}"
             )
             return None
     except Exception as e:
-        print(f"Ошибка при распознавании речи: {str(e)}")
+        logger.error(f"Ошибка при распознавании речи: {str(e)}")
         return None
 
 
-def text_to_speech(
-    text, token, output_path=OUTPUT_AUDIO_PATH, format="wav16", voice="Bys_24000"
+def synthesize_speech(
+    text, token, format="wav16", voice="Bys_24000", cache=None, deadline=None
 ):
     """
-    Синтезирует речь из текста с помощью API Сбера.
+    Синтезирует речь из текста с помощью API Сбера и возвращает аудио.
 
     Args:
         text (str): Текст для синтеза.
-        token (str): Токен доступа.
-        output_path (str): Путь для сохранения аудиофайла.
+        token: Токен доступа или менеджер токенов.
         format (str): Формат аудио.
         voice (str): Голос синтеза.
+        cache (TTSCache): Кеш синтезированной речи. При попадании в кеш
+            запрос к API не выполняется.
+        deadline (Deadline): Срок синтеза с учетом повторов.
 
     Returns:
-        bool: True в случае успеха, False в случае ошибки.
+        bytes: Синтезированное аудио или None в случае ошибки.
     """
-    url = "https://smartspeech.sber.ru/rest/v1/text:synthesize"
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/text"}
+    if cache is not None:
+        audio_data = cache.get(text, voice, format)
+        if audio_data is not None:
+            return audio_data
+
+    url = SYNTHESIZE_URL
+    headers = {"Content-Type": "application/text"}
     params = {"format": format, "voice": voice}
 
     try:
-        response = requests.post(
-            url, headers=headers, params=params, data=text.encode(), verify=False
-        )
+        payload = text.encode()
+        with TRACER.span("sber.synthesize") as span:
+            response = _authorized_post(
+                url,
+                token,
+                "sber.synthesize",
+                headers=headers,
+                deadline=deadline,
+                params=params,
+                data=payload,
+            )
+            span.add_bytes(sent=len(payload), received=len(response.content))
+            span.set(status=response.status_code)
 
         if response.status_code == 200:
-            # Сохранение синтезированного аудио в файл
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-            print(f"Аудио успешно синтезировано и сохранено: {output_path}")
-            return True
+            if cache is not None:
+                cache.put(text, voice, format, response.content)
+            return response.content
         else:
-            print(f"Ошибка синтеза речи: {response.status_code} - {response.text}")
-            return False
+            logger.error(f"Ошибка синтеза речи: {response.status_code} - {response.text}")
+            return None
+    except Exception as e:
+        logger.error(f"Ошибка при синтезе речи: {str(e)}")
+        return None
+
+
+def stream_speech(
+    text,
+    token,
+    format="wav16",
+    voice="Bys_24000",
+    cache=None,
+    deadline=None,
+    chunk_size=TTS_STREAM_CHUNK_BYTES,
+):
+    """
+    Синтезирует речь с помощью API Сбера и отдает аудио частями по мере
+    загрузки, не дожидаясь конца ответа.
+
+    Запрос выполняется сразу (с повторами), а тело ответа читается при
+    переборе результата. Полностью загруженное аудио сохраняется в кеш.
+
+    Args:
+        text (str): Текст для синтеза.
+        token: Токен доступа или менеджер токенов.
+        format (str): Формат аудио.
+        voice (str): Голос синтеза.
+        cache (TTSCache): Кеш синтезированной речи. При попадании в кеш
+            аудио отдается одной частью.
+        deadline (Deadline): Срок получения ответа с учетом повторов.
+        chunk_size (int): Размер читаемых частей в байтах.
+
+    Returns:
+        iterator: Части WAV-файла (bytes), начиная с заголовка, или None
+            в случае ошибки. Если перебор прекращен досрочно, закройте
+            итератор (close()), чтобы освободить соединение.
+    """
+    if cache is not None:
+        audio_data = cache.get(text, voice, format)
+        if audio_data is not None:
+            return iter([audio_data])
+
+    url = SYNTHESIZE_URL
+    headers = {"Content-Type": "application/text"}
+    params = {"format": format, "voice": voice}
+
+    try:
+        payload = text.encode()
+        with TRACER.span("sber.synthesize", streaming=True) as span:
+            response = _authorized_post(
+                url,
+                token,
+                "sber.synthesize",
+                headers=headers,
+                deadline=deadline,
+                params=params,
+                data=payload,
+                stream=True,
+            )
+            span.add_bytes(sent=len(payload))
+            span.set(status=response.status_code)
+
+        if response.status_code != 200:
+            logger.error(f"Ошибка синтеза речи: {response.status_code} - {response.text}")
+            response.close()
+            return None
+    except Exception as e:
+        logger.error(f"Ошибка при синтезе речи: {str(e)}")
+        return None
+
+    def body():
+        # Копия для кеша собирается, только если кеш используется
+        received = bytearray() if cache is not None else None
+        complete = False
+        try:
+            for chunk in response.iter_content(chunk_size):
+                if received is not None:
+                    received.extend(chunk)
+                yield chunk
+            complete = True
+        except requests.RequestException as e:
+            logger.error(f"Ошибка при загрузке синтезированной речи: {str(e)}")
+        finally:
+            response.close()
+        if complete and received is not None:
+            cache.put(text, voice, format, bytes(received))
+
+    return body()
+
+
+def text_to_speech(
+    text,
+    token,
+    output_path=OUTPUT_AUDIO_PATH,
+    format="wav16",
+    voice="Bys_24000",
+    cache=None,
+):
+    """
+    Синтезирует речь из текста с помощью API Сбера.
+
+    Args:
+        text (str): Текст для синтеза.
+        token: Токен доступа или менеджер токенов.
+        output_path (str): Путь для сохранения аудиофайла.
+        format (str): Формат аудио.
+        voice (str): Голос синтеза.
+        cache (TTSCache): Кеш синтезированной речи.
+
+    Returns:
+        bool: True в случае успеха, False в случае ошибки.
+    """
+    audio_data = synthesize_speech(
+        text, token, format=format, voice=voice, cache=cache
+    )
+    if audio_data is None:
+        return False
+
+    try:
+        # Сохранение синтезированного аудио в файл
+        with open(output_path, "wb") as f:
+            f.write(audio_data)
+        logger.info(f"Аудио успешно синтезировано и сохранено: {output_path}")
+        return True
     except Exception as e:
-        print(f"Ошибка при синтезе речи: {str(e)}")
+        logger.error(f"Ошибка при сохранении синтезированного аудио: {str(e)}")
         return False
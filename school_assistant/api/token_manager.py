@@ -0,0 +1,174 @@
+"""
+Модуль для управления токеном доступа к API Сбера.
+
+Токен кешируется вместе со временем истечения и обновляется
+в фоновом потоке заранее, до того как сервер начнет отвечать 401.
+"""
+
+import logging
+import threading
+import time
+
+from school_assistant.api.sber_api import fetch_token
+from school_assistant.config.config import (
+    SBER_TOKEN_REFRESH_MARGIN,
+    SBER_TOKEN_RETRY_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Время жизни токена, если сервер не вернул expires_at (30 минут)
+DEFAULT_TOKEN_TTL = 30 * 60
+
+
+class SberTokenManager:
+    """
+    Потокобезопасный менеджер токена доступа к API Сбера.
+
+    Один экземпляр разделяется между распознаванием и синтезом речи:
+    функции sber_api принимают его вместо строки токена.
+    """
+
+    def __init__(
+        self,
+        fetch=fetch_token,
+        refresh_margin=SBER_TOKEN_REFRESH_MARGIN,
+        retry_interval=SBER_TOKEN_RETRY_INTERVAL,
+    ):
+        """
+        Инициализирует менеджер токена.
+
+        Args:
+            fetch (callable): Функция получения токена, возвращающая словарь
+                с ключами "access_token" и "expires_at" или None.
+            refresh_margin (float): За сколько секунд до истечения обновлять токен.
+            retry_interval (float): Пауза между попытками при ошибке обновления.
+        """
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def expires_in(self):
+        """
+        Количество секунд до истечения текущего токена.
+        """
+        return self._expires_at - time.time()
+
+    def is_valid(self):
+        """
+        Проверяет, что токен получен и не истекает в ближайшее время.
+
+        Returns:
+            bool: True, если токен можно использовать.
+        """
+        return self._token is not None and self.expires_in > self.refresh_margin / 2
+
+    def get_token(self):
+        """
+        Возвращает действующий токен, при необходимости обновляя его.
+
+        Returns:
+            str: Токен доступа или None, если получить его не удалось.
+        """
+        if self.is_valid():
+            return self._token
+
+        with self._lock:
+            # Токен мог обновить другой поток, пока мы ждали блокировку
+            if self.is_valid():
+                return self._token
+            return self._fetch_locked()
+
+    def refresh(self, stale_token=None):
+        """
+        Обновляет токен.
+
+        Если передан stale_token, а токен уже был обновлен другим потоком,
+        повторный запрос к серверу не выполняется.
+
+        Args:
+            stale_token (str): Токен, который был отклонен или истек.
+
+        Returns:
+            str: Новый токен доступа или None в случае ошибки.
+        """
+        with self._lock:
+            if stale_token is not None and self._token != stale_token and self.is_valid():
+                return self._token
+            return self._fetch_locked()
+
+    def _fetch_locked(self):
+        """
+        Запрашивает новый токен. Вызывается при захваченной блокировке.
+
+        Returns:
+            str: Новый токен доступа или None в случае ошибки.
+        """
+        data = self.fetch()
+        if not data:
+            return None
+
+        expires_at = data.get("expires_at")
+        if expires_at:
+            # API Сбера возвращает время истечения в миллисекундах
+            self._expires_at = expires_at / 1000.0
+        else:
+            self._expires_at = time.time() + DEFAULT_TOKEN_TTL
+        self._token = data["access_token"]
+        logger.info(f"Токен API Сбера обновлен, действует {int(self.expires_in)} с")
+        return self._token
+
+    def invalidate(self):
+        """
+        Помечает текущий токен как недействительный.
+        """
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def start(self):
+        """
+        Запускает фоновый поток упреждающего обновления токена.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает фоновый поток обновления токена.
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _refresh_loop(self):
+        """
+        Цикл фонового потока: обновляет токен за refresh_margin секунд до истечения.
+        """
+        while not self._stop_event.is_set():
+            wait = self.expires_in - self.refresh_margin
+            if wait > 0:
+                self._stop_event.wait(wait)
+                continue
+
+            try:
+                token = self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка при фоновом обновлении токена: {str(e)}")
+                token = None
+
+            # При ошибке (или слишком коротком сроке жизни токена) не
+            # повторяем запрос сразу, чтобы не перегружать сервер
+            if not token or self.expires_in <= self.refresh_margin:
+                self._stop_event.wait(self.retry_interval)
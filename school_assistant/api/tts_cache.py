@@ -0,0 +1,273 @@
+"""
+Модуль дискового кеша синтезированной речи.
+
+Аудио хранится в файлах, имя которых — хеш от (текст, голос, формат).
+Размер кеша ограничен, при превышении удаляются давно не использованные
+файлы (LRU по времени изменения файла, которое обновляется при попадании).
+
+Прогрев кеша списком фраз:
+    python -m school_assistant.api.tts_cache warm phrases.txt
+"""
+
+import argparse
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from school_assistant.config.config import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".audio"
+TEMP_SUFFIX = ".tmp"
+# Временные файлы старше этого (секунды) оставлены упавшим процессом записи
+STALE_TEMP_SECONDS = 600
+
+
+class TTSCache:
+    """
+    Дисковый кеш синтезированной речи с ограничением размера.
+
+    Запись выполняется через временный файл и атомарное переименование,
+    поэтому одновременная запись из нескольких потоков или процессов
+    не приводит к повреждению файлов.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        """
+        Инициализирует кеш.
+
+        Args:
+            directory (str): Директория для файлов кеша.
+            max_bytes (int): Максимальный суммарный размер кеша в байтах.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._sweep_temp_files()
+        self._size = self._scan_size()
+
+    @staticmethod
+    def make_key(text, voice, format):
+        """
+        Вычисляет ключ кеша.
+
+        Args:
+            text (str): Текст синтеза.
+            voice (str): Голос синтеза.
+            format (str): Формат аудио.
+
+        Returns:
+            str: Хеш SHA-256 в шестнадцатеричном виде.
+        """
+        raw = "\x1f".join((voice, format, text.strip()))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def _entries(self):
+        """
+        Возвращает список файлов кеша в виде (время использования, размер, путь).
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _sweep_temp_files(self):
+        """
+        Удаляет временные файлы, оставленные прерванной записью.
+
+        Returns:
+            int: Количество удаленных файлов.
+        """
+        removed = 0
+        stale_before = time.time() - STALE_TEMP_SECONDS
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(TEMP_SUFFIX):
+                    continue
+                try:
+                    # Свежий файл может принадлежать идущей записи
+                    if entry.stat().st_mtime < stale_before:
+                        os.remove(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, text, voice, format):
+        """
+        Возвращает аудио из кеша.
+
+        Args:
+            text (str): Текст синтеза.
+            voice (str): Голос синтеза.
+            format (str): Формат аудио.
+
+        Returns:
+            bytes: Аудио или None, если его нет в кеше.
+        """
+        path = self._path(self.make_key(text, voice, format))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Обновляем время использования для LRU
+            os.utime(path)
+        except FileNotFoundError:
+            data = None
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        METRICS.inc("tts_cache.miss" if data is None else "tts_cache.hit")
+        return data
+
+    def put(self, text, voice, format, data):
+        """
+        Сохраняет аудио в кеш.
+
+        Args:
+            text (str): Текст синтеза.
+            voice (str): Голос синтеза.
+            format (str): Формат аудио.
+            data (bytes): Аудио.
+        """
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(self.make_key(text, voice, format))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=TEMP_SUFFIX)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Перезаписываемый файл уже учтен в размере кеша
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Ошибка записи в кеш синтеза речи: {str(e)}")
+            return
+
+        with self._lock:
+            self._size += len(data) - replaced
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """
+        Удаляет давно не использованные файлы, пока размер кеша
+        не станет меньше ограничения.
+
+        Returns:
+            int: Количество удаленных файлов.
+        """
+        lock_path = os.path.join(self.directory, ".lock")
+        removed = 0
+        with open(lock_path, "w") as lock_file:
+            # Блокировка между процессами, чтобы вытеснение не шло параллельно
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._sweep_temp_files()
+                entries = sorted(self._entries())
+                total = sum(size for _, size, _ in entries)
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with self._lock:
+            self._size = total
+        METRICS.inc("tts_cache.evicted", removed)
+        return removed
+
+    def stats(self):
+        """
+        Возвращает статистику кеша.
+
+        Returns:
+            dict: Количество попаданий, промахов, файлов и размер в байтах.
+        """
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+
+def main():
+    """
+    Командная строка для работы с кешем: прогрев списком фраз и статистика.
+    """
+    from school_assistant.api.sber_api import synthesize_speech
+    from school_assistant.api.token_manager import SberTokenManager
+
+    parser = argparse.ArgumentParser(description="Кеш синтезированной речи")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm = subparsers.add_parser("warm", help="синтезировать фразы из файла в кеш")
+    warm.add_argument("phrases", help="файл с фразами, по одной на строку")
+    warm.add_argument("--voice", default="Bys_24000")
+    warm.add_argument("--format", default="wav16")
+
+    subparsers.add_parser("stats", help="показать статистику кеша")
+
+    args = parser.parse_args()
+    cache = TTSCache()
+
+    if args.command == "warm":
+        with open(args.phrases, encoding="utf-8") as f:
+            phrases = [line.strip() for line in f if line.strip()]
+
+        token_manager = SberTokenManager()
+        failed = 0
+        for phrase in phrases:
+            audio_data = synthesize_speech(
+                phrase, token_manager, format=args.format, voice=args.voice, cache=cache
+            )
+            if audio_data is None:
+                failed += 1
+        print(
+            f"Фраз: {len(phrases)}, уже было в кеше: {cache.hits}, "
+            f"синтезировано: {cache.misses - failed}, ошибок: {failed}"
+        )
+
+    stats = cache.stats()
+    print(f"Файлов в кеше: {stats['files']}, размер: {stats['bytes'] / 1024:.1f} КБ")
+
+
+if __name__ == "__main__":
+    main()
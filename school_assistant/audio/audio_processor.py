@@ -1,44 +1,71 @@
 """
 Модуль для работы с аудио: запись с микрофона и воспроизведение.
+
+Аудио передается между этапами в памяти: запись возвращает PCM-данные,
+воспроизведение принимает содержимое WAV-файла. Запись в файлы нужна
+только для отладки (DEBUG_AUDIO_DIR).
+
+PyAudio и evdev импортируются только при записи и воспроизведении, поэтому
+функции работы с WAV доступны и без аудиоустройств (например, в бенчмарках).
 """
 
-import pyaudio
+import logging
+import os
+import struct
+import time
 import wave
-from pydub import AudioSegment
-from pydub.playback import play
 
 from school_assistant.config.config import (
     AUDIO_DEVICE_INDEX,
     AUDIO_RATE,
     AUDIO_CHANNELS,
     OUTPUT_AUDIO_PATH,
+    DEBUG_AUDIO_DIR,
 )
-from school_assistant.hardware.input_devices import is_left_button_pressed
 
+logger = logging.getLogger(__name__)
 
-def record_audio(
-    output_path=OUTPUT_AUDIO_PATH,
+# Размер сэмпла записываемого аудио (16 бит)
+SAMPLE_WIDTH = 2
+
+
+def capture_audio(
     device_index=AUDIO_DEVICE_INDEX,
     rate=AUDIO_RATE,
     channels=AUDIO_CHANNELS,
     max_seconds=20,
+    on_chunk=None,
+    is_pressed=None,
+    end_detector=None,
 ):
     """
-    Записывает аудио с микрофона, пока нажата левая кнопка мыши.
+    Записывает аудио с микрофона в память, пока нажата левая кнопка мыши.
 
     Args:
-        output_path (str): Путь для сохранения аудиофайла.
         device_index (int): Индекс устройства записи.
         rate (int): Частота дискретизации.
         channels (int): Количество каналов.
         max_seconds (int): Максимальная длительность записи в секундах.
+        on_chunk (callable): Функция, вызываемая для каждого записанного
+            фрагмента PCM-аудио (например, для потокового распознавания).
+        is_pressed (callable): Функция, возвращающая True, пока кнопка нажата.
+            По умолчанию проверяется левая кнопка мыши.
+        end_detector (EndOfSpeechDetector): Детектор окончания речи. Если
+            указан, запись завершается после паузы, даже если кнопка нажата.
 
     Returns:
-        str: Путь к записанному аудиофайлу или None в случае ошибки.
+        bytes: Записанное PCM-аудио (16 бит) или None в случае ошибки.
     """
+    if is_pressed is None:
+        from school_assistant.hardware.input_devices import is_left_button_pressed
+
+        is_pressed = is_left_button_pressed
+
     try:
+        import pyaudio
+
         p = pyaudio.PyAudio()  # Создать интерфейс для PortAudio
-        print("Начинаю запись...")
+        logger.info("Начинаю запись...")
 
         chunk_size = 1024
         audio_format = pyaudio.paInt16
@@ -52,18 +79,23 @@ def record_audio(
             input=True,
         )
 
-        frames = []  # Инициализировать массив для хранения кадров
+        frames = bytearray()  # Буфер для хранения кадров
 
         # Хранить данные в блоках в течение заданного времени
         for i in range(0, int(rate / chunk_size * max_seconds)):
             data = stream.read(chunk_size)
-            frames.append(data)
+            frames.extend(data)
+            if on_chunk:
+                on_chunk(data)
+
+            # Состояние кнопки кешируется, поэтому проверяем его на каждом чанке
+            if not is_pressed():
+                logger.info("Запись остановлена (кнопка отпущена)")
+                break
 
-            # Проверяем каждые ~20 чанков (~0.5 секунды при rate=16000)
-            if i % 20 == 0:
-                if not is_left_button_pressed():
-                    print("Запись остановлена (кнопка отпущена)")
-                    break
+            if end_detector and end_detector.feed(data):
+                logger.info("Запись остановлена (речь закончилась)")
+                break
 
         # Остановить и закрыть поток
         stream.stop_stream()
@@ -72,19 +104,178 @@ def record_audio(
         # Завершить интерфейс PortAudio
         p.terminate()
 
-        print("Запись завершена!")
+        logger.info("Запись завершена!")
+        return bytes(frames)
+
+    except Exception as e:
+        logger.error(f"Ошибка при записи аудио: {str(e)}")
+        return None
 
-        # Сохранить записанные данные в виде файла WAV
+
+def pcm_to_wav(pcm, rate=AUDIO_RATE, channels=AUDIO_CHANNELS, sample_width=SAMPLE_WIDTH):
+    """
+    Формирует WAV-файл в памяти из PCM-данных.
+
+    Args:
+        pcm (bytes): PCM-аудио.
+        rate (int): Частота дискретизации.
+        channels (int): Количество каналов.
+        sample_width (int): Размер сэмпла в байтах.
+
+    Returns:
+        bytes: Содержимое WAV-файла.
+    """
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + len(pcm),
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        rate,
+        rate * channels * sample_width,
+        channels * sample_width,
+        sample_width * 8,
+        b"data",
+        len(pcm),
+    )
+    return header + bytes(pcm)
+
+
+def parse_wav(data):
+    """
+    Разбирает заголовок WAV-файла без копирования аудиоданных.
+
+    Args:
+        data (bytes): Содержимое WAV-файла.
+
+    Returns:
+        tuple: (частота, число каналов, размер сэмпла в байтах, memoryview PCM).
+
+    Raises:
+        ValueError: Если данные не являются WAV-файлом с PCM.
+    """
+    view = memoryview(data)
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        raise ValueError("Данные не являются WAV-файлом")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", view, body)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("В WAV-файле нет блока fmt перед данными")
+            audio_format, channels, rate, _, _, bits = fmt
+            if audio_format != 1:
+                raise ValueError(f"Неподдерживаемый формат WAV: {audio_format}")
+            # При потоковой выдаче размер блока может быть не заполнен
+            end = min(body + chunk_size, len(view))
+            return rate, channels, bits // 8, view[body:end]
+
+        offset = body + chunk_size + (chunk_size & 1)
+
+    raise ValueError("В WAV-файле нет блока данных")
+
+
+def play_pcm(pcm, rate, channels=1, sample_width=SAMPLE_WIDTH, chunk_size=4096):
+    """
+    Воспроизводит PCM-аудио, записывая его напрямую в выходной поток.
+
+    Args:
+        pcm (bytes): PCM-аудио.
+        rate (int): Частота дискретизации.
+        channels (int): Количество каналов.
+        sample_width (int): Размер сэмпла в байтах.
+        chunk_size (int): Размер блока записи в байтах.
+
+    Returns:
+        bool: True в случае успеха, False в случае ошибки.
+    """
+    try:
+        import pyaudio
+
+        p = pyaudio.PyAudio()
+        stream = p.open(
+            format=p.get_format_from_width(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+        )
+        view = memoryview(pcm)
+        for start in range(0, len(view), chunk_size):
+            stream.write(bytes(view[start:start + chunk_size]))
+        stream.stop_stream()
+        stream.close()
+        p.terminate()
+        return True
+    except Exception as e:
+        logger.error(f"Произошла ошибка при воспроизведении аудио: {e}")
+        return False
+
+
+def play_audio_data(audio_data):
+    """
+    Воспроизводит WAV-аудио из памяти.
+
+    Args:
+        audio_data (bytes): Содержимое WAV-файла.
+
+    Returns:
+        bool: True в случае успеха, False в случае ошибки.
+    """
+    try:
+        rate, channels, sample_width, pcm = parse_wav(audio_data)
+    except ValueError as e:
+        logger.error(f"Произошла ошибка при воспроизведении аудио: {e}")
+        return False
+    return play_pcm(pcm, rate, channels, sample_width)
+
+
+def record_audio(
+    output_path=OUTPUT_AUDIO_PATH,
+    device_index=AUDIO_DEVICE_INDEX,
+    rate=AUDIO_RATE,
+    channels=AUDIO_CHANNELS,
+    max_seconds=20,
+    on_chunk=None,
+    is_pressed=None,
+):
+    """
+    Записывает аудио с микрофона в WAV-файл, пока нажата левая кнопка мыши.
+
+    Args:
+        output_path (str): Путь для сохранения аудиофайла.
+        device_index (int): Индекс устройства записи.
+        rate (int): Частота дискретизации.
+        channels (int): Количество каналов.
+        max_seconds (int): Максимальная длительность записи в секундах.
+        on_chunk (callable): Функция, вызываемая для каждого записанного фрагмента.
+        is_pressed (callable): Функция, возвращающая True, пока кнопка нажата.
+
+    Returns:
+        str: Путь к записанному аудиофайлу или None в случае ошибки.
+    """
+    pcm = capture_audio(device_index, rate, channels, max_seconds, on_chunk, is_pressed)
+    if pcm is None:
+        return None
+
+    try:
         with wave.open(output_path, "wb") as wf:
             wf.setnchannels(channels)
-            wf.setsampwidth(p.get_sample_size(audio_format))
+            wf.setsampwidth(SAMPLE_WIDTH)
             wf.setframerate(rate)
-            wf.writeframes(b"".join(frames))
-
+            wf.writeframes(pcm)
         return output_path
-
     except Exception as e:
-        print(f"Ошибка при записи аудио: {str(e)}")
+        logger.error(f"Ошибка при сохранении аудио: {str(e)}")
         return None
 
 
@@ -99,10 +290,39 @@ def play_audio(file_path=OUTPUT_AUDIO_PATH):
         bool: True в случае успеха, False в случае ошибки.
     """
     try:
-        audio = AudioSegment.from_file(file_path, format="wav")
-        play(audio)
-        print(f"Файл '{file_path}' успешно воспроизведен.")
-        return True
+        with open(file_path, "rb") as f:
+            audio_data = f.read()
     except Exception as e:
-        print(f"Произошла ошибка при воспроизведении аудио: {e}")
+        logger.error(f"Произошла ошибка при воспроизведении аудио: {e}")
         return False
+
+    if play_audio_data(audio_data):
+        logger.info(f"Файл '{file_path}' успешно воспроизведен.")
+        return True
+    return False
+
+
+def save_debug_audio(name, audio_data, directory=DEBUG_AUDIO_DIR):
+    """
+    Сохраняет аудио в отладочную директорию, если она задана.
+
+    Args:
+        name (str): Имя аудио (например, "request" или "response").
+        audio_data (bytes): Содержимое WAV-файла.
+        directory (str): Отладочная директория. Если пуста, ничего не делается.
+
+    Returns:
+        str: Путь к сохраненному файлу или None.
+    """
+    if not directory or not audio_data:
+        return None
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d_%H%M%S')}_{name}.wav")
+        with open(path, "wb") as f:
+            f.write(audio_data)
+        return path
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении отладочного аудио: {str(e)}")
+        return None
@@ -0,0 +1,215 @@
+"""
+Модуль звуковых подсказок: сигнал «услышал» и фразы-заполнители.
+
+Полный ход (распознавание, GigaChat, синтез) занимает несколько секунд, и
+без обратной связи кажется, что устройство зависло. Звуки готовятся один
+раз при запуске и хранятся в памяти уже в виде PCM: сигнал генерируется
+программно, фразы синтезируются тем же голосом, что и ответы (через кеш
+синтеза речи, поэтому после первого запуска API для них не нужен).
+
+Подсказка звучит поверх очереди ответов (см. AudioEngine.play_cue): ее
+сэмплы складываются с аудио ответа, а когда начинает звучать ответ,
+подсказка плавно затихает за FADE_MS миллисекунд, без щелчка.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from school_assistant.audio.audio_processor import SAMPLE_WIDTH, parse_wav
+from school_assistant.config.config import FILLER_PHRASES
+
+logger = logging.getLogger(__name__)
+
+# Частота дискретизации подсказок: совпадает с голосом синтеза (Bys_24000),
+# поэтому выходной поток не переоткрывается
+CUE_RATE = 24000
+# Длительность затухания подсказки при отмене (мс)
+FADE_MS = 30
+
+
+def synthesize_earcon(rate=CUE_RATE, tones=(660.0, 990.0), tone_ms=70, volume=0.25):
+    """
+    Генерирует короткий сигнал «услышал»: два восходящих тона.
+
+    Args:
+        rate (int): Частота дискретизации.
+        tones (tuple): Частоты тонов в герцах.
+        tone_ms (int): Длительность каждого тона в миллисекундах.
+        volume (float): Громкость относительно полной шкалы.
+
+    Returns:
+        bytes: PCM-аудио (16 бит, моно).
+    """
+    length = int(rate * tone_ms / 1000)
+    t = np.arange(length) / rate
+    # Огибающая «приподнятый косинус» на краях тона убирает щелчки
+    edge = max(1, int(rate * 0.008))
+    envelope = np.ones(length)
+    ramp = 0.5 - 0.5 * np.cos(np.linspace(0.0, np.pi, edge))
+    envelope[:edge] = ramp
+    envelope[-edge:] = ramp[::-1]
+
+    signal = np.concatenate(
+        [np.sin(2 * np.pi * freq * t) * envelope for freq in tones]
+    )
+    return (signal * volume * 32767).astype(np.int16).tobytes()
+
+
+class Cue:
+    """
+    Одно воспроизведение подсказки поверх основного аудио.
+
+    Выходной поток вызывает mix_into() для каждого блока; cancel() плавно
+    заглушает подсказку. Методы вызываются из разных потоков.
+    """
+
+    def __init__(self, name, pcm, rate=CUE_RATE):
+        """
+        Args:
+            name (str): Имя подсказки (для журнала и метрик).
+            pcm (bytes): PCM-аудио (16 бит, моно).
+            rate (int): Частота дискретизации.
+        """
+        self.name = name
+        self.rate = rate
+        self.format = (rate, 1, SAMPLE_WIDTH)
+        self._samples = np.frombuffer(pcm, dtype=np.int16)
+        self._pos = 0
+        self._fade_left = None
+        self._fade_total = 0
+        self._lock = threading.Lock()
+        # Моменты (time.perf_counter) постановки в очередь и первого звука
+        self.requested_at = time.perf_counter()
+        self.first_sound_at = None
+
+    @property
+    def finished(self):
+        """
+        Подсказка доиграна или заглушена.
+        """
+        return self._pos >= len(self._samples) or self._fade_left == 0
+
+    @property
+    def cancelled(self):
+        """
+        Подсказка отменена (затухает или уже заглушена).
+        """
+        return self._fade_left is not None
+
+    def cancel(self, fade_ms=FADE_MS):
+        """
+        Заглушает подсказку: оставшийся звук затухает за fade_ms миллисекунд.
+
+        Args:
+            fade_ms (int): Длительность затухания (0 — сразу).
+        """
+        with self._lock:
+            if self._fade_left is None:
+                self._fade_total = int(self.rate * fade_ms / 1000)
+                self._fade_left = self._fade_total
+
+    def mix_into(self, out):
+        """
+        Добавляет очередной блок подсказки к блоку выходного потока.
+
+        Args:
+            out (bytes): Блок выходного потока (16 бит, моно).
+
+        Returns:
+            bytes: Блок с подмешанной подсказкой.
+        """
+        with self._lock:
+            if self.finished:
+                return out
+            base = np.frombuffer(out, dtype=np.int16)
+            count = min(len(base), len(self._samples) - self._pos)
+            if self._fade_left is not None:
+                count = min(count, self._fade_left)
+            cue = self._samples[self._pos:self._pos + count].astype(np.float32)
+            if self._fade_left is not None:
+                # Линейное затухание до нуля за оставшиеся сэмплы
+                cue *= np.arange(self._fade_left, self._fade_left - count, -1) / (
+                    self._fade_total + 1
+                )
+                self._fade_left -= count
+            self._pos += count
+
+        if self.first_sound_at is None:
+            self.first_sound_at = time.perf_counter()
+        mixed = base.astype(np.int32)
+        mixed[:count] += cue.astype(np.int32)
+        return np.clip(mixed, -32768, 32767).astype(np.int16).tobytes()
+
+
+class EarconBank:
+    """
+    Набор заранее подготовленных подсказок в памяти.
+
+    Сигнал «услышал» генерируется при создании; фразы-заполнители
+    синтезируются в load_fillers() (обычно в фоне при запуске).
+    """
+
+    def __init__(self, rate=CUE_RATE):
+        """
+        Args:
+            rate (int): Частота дискретизации сигнала.
+        """
+        self.rate = rate
+        self.acknowledge_pcm = synthesize_earcon(rate)
+        # Фразы-заполнители: список (текст, PCM, частота дискретизации)
+        self.fillers = []
+        self._next_filler = 0
+
+    def load_fillers(self, synthesize, phrases=FILLER_PHRASES):
+        """
+        Синтезирует фразы-заполнители и разбирает их в PCM.
+
+        Args:
+            synthesize (callable): Синтез речи: текст → WAV-файл или None.
+            phrases (list): Тексты фраз.
+
+        Returns:
+            int: Число подготовленных фраз.
+        """
+        fillers = []
+        for phrase in phrases:
+            audio = synthesize(phrase)
+            if not audio:
+                logger.error(f"Не удалось синтезировать фразу-заполнитель: {phrase}")
+                continue
+            try:
+                rate, channels, sample_width, pcm = parse_wav(audio)
+            except Exception as e:
+                logger.error(f"Ошибка разбора фразы-заполнителя «{phrase}»: {str(e)}")
+                continue
+            if channels != 1 or sample_width != SAMPLE_WIDTH:
+                logger.warning(f"Фраза-заполнитель «{phrase}» в неподдерживаемом формате")
+                continue
+            fillers.append((phrase, bytes(pcm), rate))
+        self.fillers = fillers
+        return len(fillers)
+
+    def acknowledge(self):
+        """
+        Returns:
+            Cue: Сигнал «услышал».
+        """
+        return Cue("acknowledge", self.acknowledge_pcm, self.rate)
+
+    def filler(self):
+        """
+        Возвращает следующую фразу-заполнитель (по кругу, чтобы фразы
+        не повторялись подряд).
+
+        Returns:
+            Cue: Фраза-заполнитель или None, если фразы не подготовлены.
+        """
+        fillers = self.fillers
+        if not fillers:
+            return None
+        phrase, pcm, rate = fillers[self._next_filler % len(fillers)]
+        self._next_filler += 1
+        return Cue("filler", pcm, rate)
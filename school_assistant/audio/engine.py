@@ -0,0 +1,501 @@
+"""
+Модуль постоянного аудиодвижка.
+
+PortAudio инициализируется один раз, входной и выходной потоки открываются
+в режиме обратного вызова и остаются открытыми, поэтому запись и
+воспроизведение начинаются без повторного перечисления устройств ALSA.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+import pyaudio
+
+from school_assistant.audio.audio_processor import SAMPLE_WIDTH, parse_wav
+from school_assistant.audio.jitter_buffer import JitterBuffer
+from school_assistant.audio.ring_buffer import RingBuffer
+from school_assistant.config.config import (
+    AUDIO_DEVICE_INDEX,
+    AUDIO_RATE,
+    AUDIO_CHANNELS,
+    AUDIO_OUTPUT_DEVICE_INDEX,
+    AUDIO_PRE_ROLL_MS,
+    AUDIO_MAX_SECONDS,
+)
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class AudioEngine:
+    """
+    Долгоживущий аудиодвижок с «теплыми» входным и выходным потоками.
+
+    Входной поток пишет постоянно: последние pre_roll_ms миллисекунд хранятся
+    в кольцевом буфере и попадают в начало записи, поэтому первый слог,
+    сказанный одновременно с нажатием кнопки, не теряется. Буферы выделяются
+    один раз, и память не растет со временем работы.
+
+    Запись: start_capture() / read_chunk() / stop_capture() или record().
+    Воспроизведение: play() не блокируется — аудио ставится в очередь
+    и проигрывается выходным потоком; wait_playback() ждет окончания.
+    play_stream() ставит в очередь буфер, который заполняется по мере
+    загрузки аудио по сети. play_cue() подмешивает звуковую подсказку
+    поверх очереди: она затихает, как только начинает звучать очередь.
+    """
+
+    def __init__(
+        self,
+        device_index=AUDIO_DEVICE_INDEX,
+        output_device_index=AUDIO_OUTPUT_DEVICE_INDEX,
+        rate=AUDIO_RATE,
+        channels=AUDIO_CHANNELS,
+        chunk_size=1024,
+        pre_roll_ms=AUDIO_PRE_ROLL_MS,
+        max_seconds=AUDIO_MAX_SECONDS,
+    ):
+        """
+        Инициализирует аудиодвижок (без открытия устройств).
+
+        Args:
+            device_index (int): Индекс устройства записи.
+            output_device_index (int): Индекс устройства воспроизведения
+                (None — устройство по умолчанию).
+            rate (int): Частота дискретизации записи.
+            channels (int): Количество каналов записи.
+            chunk_size (int): Размер блока записи в кадрах.
+            pre_roll_ms (int): Сколько миллисекунд до начала записи добавлять
+                в ее начало.
+            max_seconds (int): Максимальная длительность одной записи.
+        """
+        self.device_index = device_index
+        self.output_device_index = output_device_index
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+
+        self._pa = None
+        self._input = None
+        self._output = None
+        self._output_format = None
+
+        self.pre_roll_ms = pre_roll_ms
+        self.max_seconds = max_seconds
+        self.frame_bytes = channels * SAMPLE_WIDTH
+        bytes_per_ms = rate * self.frame_bytes / 1000
+
+        # Состояние записи: кольцевой буфер предзаписи и линейный буфер
+        # текущей записи, оба выделены заранее
+        self._ring = RingBuffer(int(bytes_per_ms * pre_roll_ms))
+        self._capture = bytearray(int(bytes_per_ms * 1000 * max_seconds))
+        self._capture_len = 0
+        self._read_pos = 0
+        self._capture_cond = threading.Condition()
+        self._capturing = False
+        self._capture_started = None
+
+        # Состояние воспроизведения: очередь фрагментов PCM
+        self._play_lock = threading.Lock()
+        self._segments = collections.deque()
+        self._segment_pos = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._play_requested = None
+        # Звуковая подсказка, которая звучит поверх очереди (Cue)
+        self._cue = None
+
+    def start(self):
+        """
+        Инициализирует PortAudio и открывает входной поток.
+        """
+        if self._pa is not None:
+            return
+        self._pa = pyaudio.PyAudio()
+        self._input = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.rate,
+            frames_per_buffer=self.chunk_size,
+            input_device_index=self.device_index,
+            input=True,
+            stream_callback=self._on_input,
+        )
+        self._input.start_stream()
+
+    def close(self):
+        """
+        Останавливает потоки и освобождает PortAudio.
+        """
+        self.stop_playback()
+        for stream in (self._input, self._output):
+            if stream is not None:
+                try:
+                    stream.stop_stream()
+                    stream.close()
+                except Exception as e:
+                    logger.error(f"Ошибка при закрытии аудиопотока: {e}")
+        self._input = self._output = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    # --- Запись ---
+
+    def _on_input(self, in_data, frame_count, time_info, status):
+        """
+        Обратный вызов входного потока (выполняется в потоке PortAudio).
+        """
+        # Запись в кольцевой буфер и проверка _capturing выполняются под
+        # одной блокировкой с start_capture(): иначе блок, попавший в буфер
+        # до начала записи, оказался бы и в предзаписи, и в самой записи
+        with self._capture_cond:
+            self._ring.write(in_data)
+            if not self._capturing:
+                return None, pyaudio.paContinue
+
+            if self._capture_started is not None:
+                METRICS.observe(
+                    "audio.press_to_first_frame", time.perf_counter() - self._capture_started
+                )
+                self._capture_started = None
+
+            size = min(len(in_data), len(self._capture) - self._capture_len)
+            end = self._capture_len + size
+            self._capture[self._capture_len:end] = in_data[:size]
+            self._capture_len = end
+            self._capture_cond.notify_all()
+        return None, pyaudio.paContinue
+
+    def start_capture(self, pre_roll_ms=None):
+        """
+        Начинает запись, добавляя в ее начало аудио из кольцевого буфера.
+
+        Args:
+            pre_roll_ms (int): Длительность предзаписи в миллисекундах.
+                Если не указана, используется значение движка.
+        """
+        if pre_roll_ms is None:
+            pre_roll_ms = self.pre_roll_ms
+        pre_roll_bytes = int(self.rate * self.frame_bytes * pre_roll_ms / 1000)
+
+        with self._capture_cond:
+            pre_roll = self._ring.read_last(pre_roll_bytes, align=self.frame_bytes)
+            self._capture[:len(pre_roll)] = pre_roll
+            self._capture_len = len(pre_roll)
+            self._read_pos = 0
+            self._capture_started = time.perf_counter()
+            self._capturing = True
+
+    def is_capture_full(self):
+        """
+        Проверяет, заполнен ли буфер записи.
+
+        Returns:
+            bool: True, если достигнута максимальная длительность записи.
+        """
+        return self._capture_len >= len(self._capture)
+
+    def read_chunk(self, timeout=None):
+        """
+        Возвращает аудио, записанное с момента предыдущего вызова.
+
+        Args:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Returns:
+            bytes: Фрагмент PCM-аудио или None по таймауту.
+        """
+        with self._capture_cond:
+            self._capture_cond.wait_for(
+                lambda: self._capture_len > self._read_pos or not self._capturing,
+                timeout,
+            )
+            if self._capture_len <= self._read_pos:
+                return None
+            data = bytes(self._capture[self._read_pos:self._capture_len])
+            self._read_pos = self._capture_len
+            return data
+
+    def stop_capture(self):
+        """
+        Завершает запись.
+
+        Returns:
+            bytes: Записанное PCM-аудио.
+        """
+        with self._capture_cond:
+            self._capturing = False
+            self._capture_cond.notify_all()
+            return bytes(self._capture[:self._capture_len])
+
+    def record(self, is_pressed, max_seconds=None, on_chunk=None, end_detector=None):
+        """
+        Записывает аудио, пока нажата кнопка.
+
+        Args:
+            is_pressed (callable): Функция, возвращающая True, пока кнопка нажата.
+            max_seconds (int): Максимальная длительность записи в секундах.
+                Если не указана, используется значение движка (AUDIO_MAX_SECONDS).
+            on_chunk (callable): Функция, вызываемая для каждого фрагмента.
+            end_detector (EndOfSpeechDetector): Детектор окончания речи.
+
+        Returns:
+            bytes: Записанное PCM-аудио или None в случае ошибки.
+        """
+        if max_seconds is None:
+            max_seconds = self.max_seconds
+        try:
+            self.start()
+            self.start_capture()
+            chunk_seconds = self.chunk_size / self.rate
+            deadline = time.monotonic() + max_seconds
+
+            while time.monotonic() < deadline and not self.is_capture_full():
+                data = self.read_chunk(timeout=chunk_seconds * 4)
+                if data is None:
+                    if not is_pressed():
+                        break
+                    continue
+
+                if on_chunk:
+                    on_chunk(data)
+                if not is_pressed():
+                    logger.info("Запись остановлена (кнопка отпущена)")
+                    break
+                if end_detector and end_detector.feed(data):
+                    logger.info("Запись остановлена (речь закончилась)")
+                    break
+
+            return self.stop_capture()
+        except Exception as e:
+            with self._capture_cond:
+                self._capturing = False
+            logger.error(f"Ошибка при записи аудио: {str(e)}")
+            return None
+
+    # --- Воспроизведение ---
+
+    def _on_output(self, in_data, frame_count, time_info, status):
+        """
+        Обратный вызов выходного потока: отдает данные из очереди
+        фрагментов, а при ее опустошении — тишину.
+        """
+        frame_bytes = self._output_format[1] * self._output_format[2]
+        needed = frame_count * frame_bytes
+        out = bytearray()
+
+        with self._play_lock:
+            while len(out) < needed and self._segments:
+                segment = self._segments[0]
+                if isinstance(segment, JitterBuffer):
+                    out.extend(segment.read(needed - len(out)))
+                    if not segment.finished:
+                        # Аудио потока еще загружается: следующие фрагменты ждут
+                        break
+                    self._segments.popleft()
+                    continue
+                take = segment[self._segment_pos:self._segment_pos + needed - len(out)]
+                out.extend(take)
+                self._segment_pos += len(take)
+                if self._segment_pos >= len(segment):
+                    self._segments.popleft()
+                    self._segment_pos = 0
+
+            if out and self._play_requested is not None:
+                METRICS.observe(
+                    "audio.ready_to_first_sound", time.perf_counter() - self._play_requested
+                )
+                self._play_requested = None
+            if not self._segments:
+                self._idle.set()
+            cue = self._cue
+
+        if out and cue is not None:
+            # Зазвучал ответ: подсказка затихает
+            cue.cancel()
+        if len(out) < needed:
+            out.extend(b"\x00" * (needed - len(out)))
+        if cue is not None:
+            out = self._mix_cue(cue, out)
+        return bytes(out), pyaudio.paContinue
+
+    def _mix_cue(self, cue, out):
+        """
+        Подмешивает подсказку к блоку выходного потока.
+        """
+        first = cue.first_sound_at is None
+        out = cue.mix_into(bytes(out))
+        if first and cue.first_sound_at is not None:
+            METRICS.observe("audio.cue_to_first_sound", cue.first_sound_at - cue.requested_at)
+        if cue.finished:
+            with self._play_lock:
+                if self._cue is cue:
+                    self._cue = None
+        return out
+
+    def _ensure_output(self, rate, channels, sample_width):
+        """
+        Открывает выходной поток нужного формата или переиспользует открытый.
+
+        Метод вызывается под блокировкой хода (см. SchoolAssistant._play),
+        поэтому не ждет окончания воспроизведения: аудио в очереди, записанное
+        в прежнем формате, отбрасывается.
+        """
+        output_format = (rate, channels, sample_width)
+        if self._output is not None and self._output_format == output_format:
+            return
+
+        # Формат сменился: новый поток не сможет воспроизвести старую очередь
+        self.stop_playback()
+        if self._output is not None:
+            self._output.stop_stream()
+            self._output.close()
+
+        self._output_format = output_format
+        self._output = self._pa.open(
+            format=self._pa.get_format_from_width(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+            output_device_index=self.output_device_index,
+            stream_callback=self._on_output,
+        )
+        self._output.start_stream()
+
+    def prepare_output(self, rate=24000, channels=1, sample_width=SAMPLE_WIDTH):
+        """
+        Заранее открывает выходной поток, чтобы первый ответ звучал сразу.
+
+        Args:
+            rate (int): Частота дискретизации.
+            channels (int): Количество каналов.
+            sample_width (int): Размер сэмпла в байтах.
+        """
+        self.start()
+        self._ensure_output(rate, channels, sample_width)
+
+    def play(self, pcm, rate, channels=1, sample_width=SAMPLE_WIDTH):
+        """
+        Ставит PCM-аудио в очередь воспроизведения и сразу возвращается.
+
+        Args:
+            pcm (bytes): PCM-аудио.
+            rate (int): Частота дискретизации.
+            channels (int): Количество каналов.
+            sample_width (int): Размер сэмпла в байтах.
+        """
+        self.start()
+        self._ensure_output(rate, channels, sample_width)
+        with self._play_lock:
+            if self._idle.is_set():
+                self._play_requested = time.perf_counter()
+            self._segments.append(memoryview(pcm))
+            self._idle.clear()
+
+    def play_stream(self, rate, channels=1, sample_width=SAMPLE_WIDTH, prebuffer_ms=None):
+        """
+        Ставит в очередь воспроизведения аудио, которое еще загружается.
+
+        Args:
+            rate (int): Частота дискретизации.
+            channels (int): Количество каналов.
+            sample_width (int): Размер сэмпла в байтах.
+            prebuffer_ms (int): Запас аудио до начала воспроизведения
+                (по умолчанию TTS_JITTER_BUFFER_MS).
+
+        Returns:
+            JitterBuffer: Буфер, в который пишется загружаемое PCM-аудио;
+                после загрузки нужно вызвать close().
+        """
+        self.start()
+        self._ensure_output(rate, channels, sample_width)
+        stream = JitterBuffer(rate, channels, sample_width, prebuffer_ms)
+        with self._play_lock:
+            self._segments.append(stream)
+            self._idle.clear()
+        return stream
+
+    def play_cue(self, cue):
+        """
+        Подмешивает звуковую подсказку поверх очереди воспроизведения
+        и сразу возвращается. Новая подсказка заменяет предыдущую.
+
+        Подсказка не учитывается в is_playing() и wait_playback(): это
+        не ответ, и ждать ее окончания не нужно.
+
+        Args:
+            cue (Cue): Подсказка (см. audio.earcons).
+
+        Returns:
+            bool: True, если подсказка поставлена; False, если выходной
+                поток открыт в другом формате.
+        """
+        self.start()
+        if self._output is None:
+            self._ensure_output(*cue.format)
+        elif self._output_format != cue.format:
+            # Переоткрытие потока прервало бы звучащий ответ
+            return False
+        with self._play_lock:
+            self._cue = cue
+        return True
+
+    def play_wav(self, audio_data, wait=False):
+        """
+        Воспроизводит WAV-аудио из памяти.
+
+        Args:
+            audio_data (bytes): Содержимое WAV-файла.
+            wait (bool): Дождаться окончания воспроизведения.
+
+        Returns:
+            bool: True в случае успеха, False в случае ошибки.
+        """
+        try:
+            rate, channels, sample_width, pcm = parse_wav(audio_data)
+            self.play(pcm, rate, channels, sample_width)
+        except Exception as e:
+            logger.error(f"Произошла ошибка при воспроизведении аудио: {e}")
+            return False
+
+        if wait:
+            self.wait_playback()
+        return True
+
+    def is_playing(self):
+        """
+        Проверяет, идет ли воспроизведение.
+
+        Returns:
+            bool: True, если в очереди есть аудио.
+        """
+        return not self._idle.is_set()
+
+    def wait_playback(self, timeout=None):
+        """
+        Ждет окончания воспроизведения.
+
+        Args:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Returns:
+            bool: True, если воспроизведение завершено.
+        """
+        return self._idle.wait(timeout)
+
+    def stop_playback(self):
+        """
+        Немедленно прекращает воспроизведение и очищает очередь.
+        """
+        with self._play_lock:
+            for segment in self._segments:
+                if isinstance(segment, JitterBuffer):
+                    segment.abort()
+            self._segments.clear()
+            self._segment_pos = 0
+            self._play_requested = None
+            if self._cue is not None:
+                self._cue.cancel()
+            self._idle.set()
@@ -0,0 +1,173 @@
+"""
+Модуль буфера воспроизведения аудио, поступающего по сети.
+
+Аудио приходит неравномерно, а выходной поток забирает его с постоянной
+скоростью. Буфер начинает отдавать данные, когда накоплен запас
+prebuffer_ms миллисекунд (или поток уже закончился). Если данные кончились
+раньше, чем закончился поток (недогрузка), выходной поток получает тишину,
+а буфер снова копит запас, чтобы не прерываться на каждом фрагменте.
+"""
+
+import collections
+import threading
+import time
+
+from school_assistant.audio.audio_processor import SAMPLE_WIDTH
+from school_assistant.config.config import TTS_JITTER_BUFFER_MS
+from school_assistant.utils.metrics import METRICS
+
+
+class JitterBuffer:
+    """
+    Потокобезопасный буфер между загрузкой аудио и выходным потоком.
+
+    Загрузка вызывает write() и в конце close(); выходной поток вызывает
+    read(). abort() прекращает воспроизведение: последующие write()
+    возвращают False, и загрузку можно прервать.
+    """
+
+    def __init__(self, rate, channels=1, sample_width=SAMPLE_WIDTH, prebuffer_ms=None):
+        """
+        Args:
+            rate (int): Частота дискретизации.
+            channels (int): Количество каналов.
+            sample_width (int): Размер сэмпла в байтах.
+            prebuffer_ms (int): Запас аудио до начала воспроизведения
+                в миллисекундах (по умолчанию TTS_JITTER_BUFFER_MS).
+        """
+        if prebuffer_ms is None:
+            prebuffer_ms = TTS_JITTER_BUFFER_MS
+        self.format = (rate, channels, sample_width)
+        self.frame_bytes = channels * sample_width
+        self.bytes_per_second = rate * self.frame_bytes
+        self.prebuffer_bytes = int(rate * prebuffer_ms / 1000) * self.frame_bytes
+
+        self._chunks = collections.deque()
+        self._pos = 0
+        self._available = 0
+        self._buffering = True
+        self._lock = threading.Lock()
+        self._drained = threading.Event()
+
+        self.closed = False
+        self.aborted = False
+        self.bytes_written = 0
+        # Число недогрузок и длительность вставленной из-за них тишины (с)
+        self.underruns = 0
+        self.starved_seconds = 0.0
+        # Моменты (time.perf_counter), когда накоплен запас и когда
+        # выходной поток получил первые данные
+        self.created_at = time.perf_counter()
+        self.ready_at = None
+        self.first_sound_at = None
+
+    @property
+    def buffered_seconds(self):
+        """
+        Длительность аудио в буфере в секундах.
+        """
+        return self._available / self.bytes_per_second
+
+    @property
+    def finished(self):
+        """
+        Поток закончился, и все данные отданы.
+        """
+        return self.closed and self._available == 0
+
+    def write(self, pcm):
+        """
+        Добавляет загруженные PCM-данные (целое число кадров).
+
+        Args:
+            pcm (bytes): PCM-данные.
+
+        Returns:
+            bool: False, если воспроизведение прервано и загрузку можно
+                прекратить.
+        """
+        with self._lock:
+            if self.closed:
+                return not self.aborted
+            if pcm:
+                self._chunks.append(pcm)
+                self._available += len(pcm)
+                self.bytes_written += len(pcm)
+                if self.ready_at is None and self._available >= self.prebuffer_bytes:
+                    self.ready_at = time.perf_counter()
+            return True
+
+    def close(self):
+        """
+        Отмечает конец потока: оставшиеся данные доигрываются без запаса.
+        """
+        with self._lock:
+            self.closed = True
+            if self.ready_at is None:
+                self.ready_at = time.perf_counter()
+            if self._available == 0:
+                self._drained.set()
+
+    def abort(self):
+        """
+        Прерывает воспроизведение и отбрасывает данные.
+        """
+        with self._lock:
+            self._chunks.clear()
+            self._pos = 0
+            self._available = 0
+            self.closed = True
+            self.aborted = True
+            self._drained.set()
+
+    def read(self, size):
+        """
+        Забирает данные для выходного потока.
+
+        Args:
+            size (int): Сколько байт нужно выходному потоку (целое число кадров).
+
+        Returns:
+            bytes: Данные; меньше size, если запас еще копится или данные
+                кончились. Недостающую часть выходной поток заполняет тишиной.
+        """
+        with self._lock:
+            if self._buffering:
+                if not self.closed and self._available < self.prebuffer_bytes:
+                    if self.first_sound_at is not None:
+                        self.starved_seconds += size / self.bytes_per_second
+                    return b""
+                self._buffering = False
+
+            out = bytearray()
+            while len(out) < size and self._chunks:
+                chunk = self._chunks[0]
+                take = chunk[self._pos:self._pos + size - len(out)]
+                out.extend(take)
+                self._pos += len(take)
+                if self._pos >= len(chunk):
+                    self._chunks.popleft()
+                    self._pos = 0
+            self._available -= len(out)
+
+            if out and self.first_sound_at is None:
+                self.first_sound_at = time.perf_counter()
+            if len(out) < size and not self.closed:
+                # Данные не успели прийти: копим запас заново
+                self._buffering = True
+                if self.first_sound_at is not None:
+                    self.underruns += 1
+                    self.starved_seconds += (size - len(out)) / self.bytes_per_second
+                    METRICS.inc("audio.underruns")
+            if self.finished:
+                self._drained.set()
+            return bytes(out)
+
+    def wait(self, timeout=None):
+        """
+        Ждет, пока все данные не будут отданы или воспроизведение не прервут.
+
+        Returns:
+            bool: True, если дождались.
+        """
+        return self._drained.wait(timeout)
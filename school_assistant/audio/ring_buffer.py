@@ -0,0 +1,90 @@
+"""
+Модуль кольцевого буфера для постоянной записи аудио.
+
+Буфер выделяется один раз заданного размера, поэтому объем памяти
+не зависит от времени работы устройства.
+"""
+
+import threading
+
+
+class RingBuffer:
+    """
+    Потокобезопасный кольцевой буфер байтов фиксированного размера.
+
+    Хранит последние capacity байт записанных данных.
+    """
+
+    def __init__(self, capacity):
+        """
+        Выделяет буфер.
+
+        Args:
+            capacity (int): Размер буфера в байтах.
+        """
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._pos = 0
+        self._filled = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._filled
+
+    def write(self, data):
+        """
+        Дописывает данные, затирая самые старые.
+
+        Args:
+            data (bytes): Данные.
+        """
+        size = len(data)
+        if size == 0 or self.capacity == 0:
+            return
+
+        with self._lock:
+            if size >= self.capacity:
+                self._buffer[:] = data[size - self.capacity:]
+                self._pos = 0
+                self._filled = self.capacity
+                return
+
+            end = self._pos + size
+            if end <= self.capacity:
+                self._buffer[self._pos:end] = data
+            else:
+                first = self.capacity - self._pos
+                self._buffer[self._pos:] = data[:first]
+                self._buffer[:size - first] = data[first:]
+            self._pos = end % self.capacity
+            self._filled = min(self.capacity, self._filled + size)
+
+    def read_last(self, size, align=1):
+        """
+        Возвращает последние size байт.
+
+        Args:
+            size (int): Сколько байт вернуть (не больше накопленного).
+            align (int): Кратность размера результата (например, размер
+                аудиокадра), чтобы не разрезать сэмпл.
+
+        Returns:
+            bytes: Данные в порядке записи.
+        """
+        with self._lock:
+            size = min(size, self._filled)
+            size -= size % align
+            start = (self._pos - size) % self.capacity if self.capacity else 0
+            if start + size <= self.capacity:
+                return bytes(self._buffer[start:start + size])
+            return bytes(self._buffer[start:]) + bytes(
+                self._buffer[:size - (self.capacity - start)]
+            )
+
+    def clear(self):
+        """
+        Очищает буфер без освобождения памяти.
+        """
+        with self._lock:
+            self._pos = 0
+            self._filled = 0
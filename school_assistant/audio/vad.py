@@ -0,0 +1,197 @@
+"""
+Модуль определения речевой активности (VAD).
+
+Аудио делится на кадры, для каждого кадра векторно (NumPy) вычисляются
+энергия и частота переходов через ноль. По ним определяется, есть ли речь:
+это позволяет обрезать тишину перед отправкой на распознавание и
+автоматически завершать запись после паузы.
+"""
+
+import numpy as np
+
+from school_assistant.config.config import (
+    AUDIO_RATE,
+    VAD_FRAME_MS,
+    VAD_THRESHOLD_DB,
+    VAD_PAD_MS,
+)
+
+# Отступ энергии над уровнем шума, при котором кадр считается речью (дБ)
+NOISE_MARGIN_DB = 10.0
+# Доля переходов через ноль, характерная для шипящих и свистящих звуков
+FRICATIVE_ZCR = 0.25
+
+
+def frame_features(pcm, rate=AUDIO_RATE, frame_ms=VAD_FRAME_MS):
+    """
+    Вычисляет энергию и частоту переходов через ноль для кадров аудио.
+
+    Args:
+        pcm (bytes): PCM-аудио (16 бит, моно).
+        rate (int): Частота дискретизации.
+        frame_ms (int): Длительность кадра в миллисекундах.
+
+    Returns:
+        tuple: (энергия кадров в дБ относительно полной шкалы,
+            доля переходов через ноль, число сэмплов в кадре).
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frame_len = max(1, int(rate * frame_ms / 1000))
+    count = len(samples) // frame_len
+    if count == 0:
+        return np.empty(0), np.empty(0), frame_len
+
+    frames = samples[: count * frame_len].reshape(count, frame_len).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+
+    return energy_db, zcr, frame_len
+
+
+def speech_mask(energy_db, zcr, threshold_db=VAD_THRESHOLD_DB):
+    """
+    Определяет кадры с речью.
+
+    Порог энергии адаптируется к уровню шума записи, но не опускается
+    ниже threshold_db. Тихие кадры с высокой частотой переходов через
+    ноль (шипящие согласные) тоже считаются речью.
+
+    Args:
+        energy_db (numpy.ndarray): Энергия кадров в дБ.
+        zcr (numpy.ndarray): Доля переходов через ноль.
+        threshold_db (float): Минимальный порог энергии речи в дБ.
+
+    Returns:
+        numpy.ndarray: Булев массив, True для кадров с речью.
+    """
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=bool)
+
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(threshold_db, noise_floor + NOISE_MARGIN_DB)
+    voiced = energy_db > threshold
+    fricative = (energy_db > threshold - NOISE_MARGIN_DB / 2) & (zcr > FRICATIVE_ZCR)
+    return voiced | fricative
+
+
+def trim_silence(
+    pcm, rate=AUDIO_RATE, threshold_db=VAD_THRESHOLD_DB, pad_ms=VAD_PAD_MS
+):
+    """
+    Обрезает тишину в начале и конце записи.
+
+    Args:
+        pcm (bytes): PCM-аудио (16 бит, моно).
+        rate (int): Частота дискретизации.
+        threshold_db (float): Минимальный порог энергии речи в дБ.
+        pad_ms (int): Сколько миллисекунд тишины оставлять по краям речи.
+
+    Returns:
+        tuple: (обрезанное аудио (memoryview), статистика). Статистика —
+            словарь с ключами "speech_ms", "trimmed_ms", "bytes_saved".
+            Если речь не найдена, возвращается пустое аудио.
+    """
+    energy_db, zcr, frame_len = frame_features(pcm, rate)
+    mask = speech_mask(energy_db, zcr, threshold_db)
+    frame_bytes = frame_len * 2
+    frame_ms = frame_len * 1000 / rate
+    total_ms = len(pcm) / 2 * 1000 / rate
+
+    speech_frames = np.flatnonzero(mask)
+    if len(speech_frames) == 0:
+        stats = {"speech_ms": 0, "trimmed_ms": int(total_ms), "bytes_saved": len(pcm)}
+        return memoryview(b""), stats
+
+    pad = int(pad_ms / frame_ms)
+    first = max(0, speech_frames[0] - pad)
+    last = min(len(mask), speech_frames[-1] + 1 + pad)
+
+    start = first * frame_bytes
+    end = len(pcm) if last == len(mask) else last * frame_bytes
+    trimmed = memoryview(pcm)[start:end]
+
+    stats = {
+        "speech_ms": int(len(speech_frames) * frame_ms),
+        "trimmed_ms": int(total_ms - len(trimmed) / 2 * 1000 / rate),
+        "bytes_saved": len(pcm) - len(trimmed),
+    }
+    return trimmed, stats
+
+
+class EndOfSpeechDetector:
+    """
+    Потоковый детектор окончания речи.
+
+    Получает фрагменты аудио по мере записи и сообщает, что речь
+    закончилась, когда после начала речи прошло silence_ms тишины.
+    """
+
+    def __init__(
+        self,
+        silence_ms,
+        rate=AUDIO_RATE,
+        threshold_db=VAD_THRESHOLD_DB,
+        min_speech_ms=200,
+    ):
+        """
+        Инициализирует детектор.
+
+        Args:
+            silence_ms (int): Длительность паузы, завершающей речь, в мс.
+            rate (int): Частота дискретизации.
+            threshold_db (float): Минимальный порог энергии речи в дБ.
+            min_speech_ms (int): Минимальная длительность речи, после которой
+                пауза может завершить запись.
+        """
+        self.silence_ms = silence_ms
+        self.rate = rate
+        self.threshold_db = threshold_db
+        self.min_speech_ms = min_speech_ms
+
+        self.speech_ms = 0.0
+        self.silence_run_ms = 0.0
+        self._noise_floor = None
+        self._pending = b""
+
+    def feed(self, chunk):
+        """
+        Обрабатывает очередной фрагмент аудио.
+
+        Args:
+            chunk (bytes): Фрагмент PCM-аудио.
+
+        Returns:
+            bool: True, если речь закончилась.
+        """
+        data = self._pending + bytes(chunk)
+        energy_db, zcr, frame_len = frame_features(data, self.rate)
+        self._pending = data[len(energy_db) * frame_len * 2:]
+        if len(energy_db) == 0:
+            return False
+
+        # Уровень шума оценивается по самым тихим кадрам и медленно следует за ними
+        quiet = float(np.min(energy_db))
+        if self._noise_floor is None or quiet < self._noise_floor:
+            self._noise_floor = quiet
+        else:
+            self._noise_floor = 0.95 * self._noise_floor + 0.05 * quiet
+
+        threshold = max(self.threshold_db, self._noise_floor + NOISE_MARGIN_DB)
+        frame_ms = frame_len * 1000 / self.rate
+
+        for is_speech in (energy_db > threshold) | (
+            (energy_db > threshold - NOISE_MARGIN_DB / 2) & (zcr > FRICATIVE_ZCR)
+        ):
+            if is_speech:
+                self.speech_ms += frame_ms
+                self.silence_run_ms = 0.0
+            elif self.speech_ms > 0:
+                self.silence_run_ms += frame_ms
+
+        return (
+            self.speech_ms >= self.min_speech_ms
+            and self.silence_run_ms >= self.silence_ms
+        )
@@ -0,0 +1,100 @@
+"""
+Модуль потокового разбора WAV-файла.
+
+Синтезированная речь приходит по сети частями; парсер разбирает заголовок,
+как только он получен целиком, и отдает PCM-данные по мере поступления
+(целым числом кадров), не дожидаясь конца файла.
+"""
+
+import struct
+
+# Значения размера блока данных, означающие «размер неизвестен»
+# (при потоковой выдаче размер может быть не заполнен)
+UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+
+class WavStreamParser:
+    """
+    Инкрементальный парсер WAV-файла с PCM.
+    """
+
+    def __init__(self):
+        self.format = None
+        self._buffer = bytearray()
+        self._fmt = None
+        self._offset = 12
+        self._remaining = None
+
+    @property
+    def frame_bytes(self):
+        """
+        Размер кадра в байтах (None, пока заголовок не разобран).
+        """
+        if self.format is None:
+            return None
+        return self.format[1] * self.format[2]
+
+    def feed(self, chunk):
+        """
+        Принимает очередную часть файла.
+
+        Args:
+            chunk (bytes): Очередные байты WAV-файла.
+
+        Returns:
+            bytes: PCM-данные, которые можно воспроизвести (целое число
+                кадров); пустые, пока не разобран заголовок.
+
+        Raises:
+            ValueError: Если данные не являются WAV-файлом с PCM.
+        """
+        self._buffer.extend(chunk)
+        if self.format is None and not self._parse_header():
+            return b""
+
+        usable = len(self._buffer) - len(self._buffer) % self.frame_bytes
+        if self._remaining is not None:
+            usable = min(usable, self._remaining)
+            self._remaining -= usable
+        pcm = bytes(self._buffer[:usable])
+        del self._buffer[:usable]
+        return pcm
+
+    def _parse_header(self):
+        """
+        Разбирает заголовок, если он получен целиком.
+
+        Returns:
+            bool: True, если заголовок разобран и начались аудиоданные.
+        """
+        buffer = self._buffer
+        if len(buffer) < 12:
+            return False
+        if bytes(buffer[0:4]) != b"RIFF" or bytes(buffer[8:12]) != b"WAVE":
+            raise ValueError("Данные не являются WAV-файлом")
+
+        while self._offset + 8 <= len(buffer):
+            chunk_id = bytes(buffer[self._offset:self._offset + 4])
+            (chunk_size,) = struct.unpack_from("<I", buffer, self._offset + 4)
+            body = self._offset + 8
+
+            if chunk_id == b"data":
+                if self._fmt is None:
+                    raise ValueError("В WAV-файле нет блока fmt перед данными")
+                audio_format, channels, rate, _, _, bits = self._fmt
+                if audio_format != 1:
+                    raise ValueError(f"Неподдерживаемый формат WAV: {audio_format}")
+                self.format = (rate, channels, bits // 8)
+                self._remaining = None if chunk_size in UNKNOWN_SIZES else chunk_size
+                del buffer[:body]
+                return True
+
+            # Служебные блоки небольшие: ждем, пока блок придет целиком
+            end = body + chunk_size + (chunk_size & 1)
+            if end > len(buffer):
+                return False
+            if chunk_id == b"fmt ":
+                self._fmt = struct.unpack_from("<HHIIHH", buffer, body)
+            self._offset = end
+
+        return False
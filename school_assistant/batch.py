@@ -0,0 +1,315 @@
+"""
+Пакетная обработка вопросов без кнопки и микрофона.
+
+Вопросы берутся из директории с WAV-файлами (16 бит, моно) или из JSONL-файла
+с текстами ({"id": "...", "question": "..."} в каждой строке) и проходят
+распознавание, ответ языковой модели и синтез речи в пуле потоков
+с ограничением частоты запросов. Результаты и длительность этапов для
+каждого вопроса записываются в JSONL, в конце печатается пропускная
+способность. Подходит для заблаговременного расчета ответов и проверки
+квот API.
+
+Запуск:
+    python -m school_assistant.batch questions.jsonl -o results.jsonl --workers 4 --rate 2
+    python -m school_assistant.batch recordings/ -o results.jsonl --audio-dir answers/
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from school_assistant.ai.llm import ERROR_RESPONSE, AssistantLLM
+from school_assistant.ai.response_cache import ResponseCache
+from school_assistant.api import http_client
+from school_assistant.api.resilience import UNAVAILABLE_RESPONSE, Deadline
+from school_assistant.api.sber_api import speech_to_text, synthesize_speech
+from school_assistant.api.token_manager import SberTokenManager
+from school_assistant.audio.audio_processor import parse_wav
+from school_assistant.knowledge.index import KnowledgeIndex
+from school_assistant.knowledge.schedule import ScheduleStore
+from school_assistant.config.config import (
+    FASTPATH_ENABLED,
+    LLM_CACHE_ENABLED,
+    STT_TIMEOUT,
+    TTS_TIMEOUT,
+    TURN_DEADLINE,
+)
+from school_assistant.utils.helpers import setup_logging
+from school_assistant.utils.tracing import percentile
+
+STAGES = ["stt", "llm", "tts", "total"]
+
+
+class RateLimiter:
+    """
+    Потокобезопасный ограничитель частоты (token bucket).
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate (float): Разрешений в секунду (0 — без ограничения).
+            burst (int): Сколько разрешений можно выдать подряд без паузы.
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Ждет, пока не будет доступно разрешение.
+
+        Returns:
+            float: Время ожидания в секундах.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # Разрешение резервируется сразу, поэтому ожидающие потоки
+            # выстраиваются в очередь, а не просыпаются одновременно
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def load_items(source):
+    """
+    Загружает вопросы для обработки.
+
+    Args:
+        source (str): Директория с WAV-файлами или JSONL-файл с вопросами.
+
+    Returns:
+        list: Словари с ключами "id" и "audio" (путь к WAV) или "question".
+    """
+    if os.path.isdir(source):
+        return [
+            {"id": name, "audio": os.path.join(source, name)}
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(".wav")
+        ]
+
+    items = []
+    with open(source, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("question") or record.get("text")
+            if not question:
+                raise ValueError(f"{source}:{number}: нет поля question")
+            items.append({"id": str(record.get("id", number)), "question": question})
+    return items
+
+
+class BatchProcessor:
+    """
+    Обработчик вопросов: распознавание, ответ и синтез для одного вопроса.
+
+    У каждого потока пула свой экземпляр AssistantLLM; перед каждым
+    вопросом история диалога очищается, поэтому вопросы не влияют друг
+    на друга. Индекс базы знаний и кеш ответов общие.
+    """
+
+    def __init__(self, token_manager, synthesize=True, audio_dir=None, use_cache=LLM_CACHE_ENABLED):
+        """
+        Args:
+            token_manager (SberTokenManager): Менеджер токена API Сбера.
+            synthesize (bool): Синтезировать речь ответа.
+            audio_dir (str): Директория для сохранения ответов в WAV.
+            use_cache (bool): Использовать кеш ответов LLM.
+        """
+        self.token_manager = token_manager
+        self.synthesize = synthesize
+        self.audio_dir = audio_dir
+        self.knowledge = KnowledgeIndex()
+        self.knowledge.refresh()
+        self.cache = ResponseCache() if use_cache else None
+        self.schedule = ScheduleStore.load() if FASTPATH_ENABLED else None
+        self._local = threading.local()
+
+    def _llm(self):
+        """
+        Возвращает языковую модель текущего потока.
+        """
+        llm = getattr(self._local, "llm", None)
+        if llm is None:
+            llm = AssistantLLM(knowledge=self.knowledge, cache=self.cache)
+            self._local.llm = llm
+        return llm
+
+    def process(self, item):
+        """
+        Обрабатывает один вопрос.
+
+        Args:
+            item (dict): Вопрос (см. load_items).
+
+        Returns:
+            dict: Результат: вопрос, ответ, источник ответа, ошибка и
+                длительность этапов в секундах.
+        """
+        result = {"id": item["id"], "ok": False, "timings": {}}
+        timings = result["timings"]
+        deadline = Deadline(TURN_DEADLINE)
+        started = time.perf_counter()
+        try:
+            question = item.get("question")
+            if question is None:
+                with open(item["audio"], "rb") as f:
+                    rate, channels, sample_width, pcm = parse_wav(f.read())
+                if channels != 1 or sample_width != 2:
+                    raise ValueError("нужен WAV 16 бит, моно")
+                stage_started = time.perf_counter()
+                phrases = speech_to_text(
+                    pcm, self.token_manager, rate=rate, deadline=deadline.stage(STT_TIMEOUT)
+                )
+                timings["stt"] = time.perf_counter() - stage_started
+                if not phrases:
+                    raise RuntimeError("речь не распознана")
+                question = phrases[0]
+            result["question"] = question
+
+            stage_started = time.perf_counter()
+            answer = self.schedule.answer(question) if self.schedule else None
+            if answer is not None:
+                result["source"] = "fastpath"
+            else:
+                llm = self._llm()
+                llm.memory.clear()
+                answer = llm.get_response(question)
+                result["source"] = "llm"
+                result["prompt_tokens"] = llm.last_prompt_tokens
+            timings["llm"] = time.perf_counter() - stage_started
+            result["answer"] = answer
+            if answer in (ERROR_RESPONSE, UNAVAILABLE_RESPONSE):
+                raise RuntimeError("языковая модель не ответила")
+
+            if self.synthesize:
+                stage_started = time.perf_counter()
+                audio = synthesize_speech(
+                    answer, self.token_manager, deadline=deadline.stage(TTS_TIMEOUT)
+                )
+                timings["tts"] = time.perf_counter() - stage_started
+                if audio is None:
+                    raise RuntimeError("ошибка синтеза речи")
+                result["audio_bytes"] = len(audio)
+                if self.audio_dir:
+                    name = os.path.splitext(os.path.basename(item["id"]))[0] + ".wav"
+                    result["audio_path"] = os.path.join(self.audio_dir, name)
+                    with open(result["audio_path"], "wb") as f:
+                        f.write(audio)
+
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = str(e)
+        timings["total"] = time.perf_counter() - started
+        return result
+
+
+def print_summary(results, elapsed, workers):
+    """
+    Печатает пропускную способность и задержки этапов.
+    """
+    ok = sum(1 for result in results if result["ok"])
+    print(
+        f"Обработано: {len(results)}, успешно: {ok}, ошибок: {len(results) - ok}, "
+        f"время: {elapsed:.1f} с, потоков: {workers}"
+    )
+    if elapsed > 0:
+        print(f"Пропускная способность: {len(results) / elapsed:.2f} вопросов/с")
+
+    sources = {}
+    for result in results:
+        if result.get("source"):
+            sources[result["source"]] = sources.get(result["source"], 0) + 1
+    if sources:
+        print("Источник ответа: " + ", ".join(f"{name} {count}" for name, count in sorted(sources.items())))
+
+    print(f"{'этап':<8} {'кол-во':>7} {'p50, мс':>9} {'p95, мс':>9} {'макс, мс':>9}")
+    for stage in STAGES:
+        values = [result["timings"][stage] * 1000 for result in results if stage in result["timings"]]
+        if values:
+            print(
+                f"{stage:<8} {len(values):>7} {percentile(values, 50):>9.0f} "
+                f"{percentile(values, 95):>9.0f} {max(values):>9.0f}"
+            )
+
+
+def main():
+    """
+    Точка входа пакетной обработки.
+    """
+    parser = argparse.ArgumentParser(description="Пакетная обработка вопросов")
+    parser.add_argument("source", help="директория с WAV-файлами или JSONL-файл с вопросами")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="файл результатов JSONL")
+    parser.add_argument("--workers", type=int, default=4, help="число потоков")
+    parser.add_argument(
+        "--rate", type=float, default=0, help="максимум вопросов в секунду (0 — без ограничения)"
+    )
+    parser.add_argument("--burst", type=int, default=1, help="вопросов подряд без паузы")
+    parser.add_argument("--audio-dir", help="сохранять синтезированные ответы в директорию")
+    parser.add_argument("--no-tts", action="store_true", help="не синтезировать ответы")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кеш ответов LLM")
+    args = parser.parse_args()
+
+    setup_logging()
+    items = load_items(args.source)
+    if not items:
+        print(f"Нет вопросов для обработки: {args.source}")
+        return
+    if args.audio_dir:
+        os.makedirs(args.audio_dir, exist_ok=True)
+
+    token_manager = SberTokenManager()
+    needs_sber = not args.no_tts or any("audio" in item for item in items)
+    if needs_sber:
+        token_manager.refresh()
+        token_manager.start()
+
+    processor = BatchProcessor(
+        token_manager,
+        synthesize=not args.no_tts,
+        audio_dir=args.audio_dir,
+        use_cache=LLM_CACHE_ENABLED and not args.no_cache,
+    )
+    limiter = RateLimiter(args.rate, args.burst)
+
+    def run(item):
+        limiter.acquire()
+        return processor.process(item)
+
+    results = []
+    started = time.perf_counter()
+    try:
+        with open(args.output, "w", encoding="utf-8") as out, ThreadPoolExecutor(
+            max_workers=args.workers, thread_name_prefix="batch"
+        ) as executor:
+            futures = [executor.submit(run, item) for item in items]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                status = "ok" if result["ok"] else f"ошибка: {result['error']}"
+                print(f"[{len(results)}/{len(items)}] {result['id']}: {status}")
+    finally:
+        token_manager.stop()
+        http_client.close_session()
+
+    print_summary(results, time.perf_counter() - started, args.workers)
+    print(f"Результаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
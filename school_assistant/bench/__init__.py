@@ -0,0 +1,3 @@
+"""
+Пакет для бенчмарков и локальных заглушек внешних сервисов.
+"""
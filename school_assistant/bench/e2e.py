@@ -0,0 +1,520 @@
+"""
+Сквозной бенчмарк SchoolAssistant на локальных заглушках.
+
+API Сбера заменяется локальным HTTPS-сервером (bench.stubs), GigaChat —
+заглушкой чат-модели (bench.fake_llm), микрофон и динамик — воспроизведением
+WAV-файла, кнопка — заглушкой. Аппаратура, PyAudio и evdev не нужны.
+Каждая итерация проходит через handle_interaction; по спанам трассировки
+считаются распределения задержек по этапам и сквозная задержка.
+
+Запуск:
+    python -m school_assistant.bench.e2e --iterations 20 --save-baseline baseline.json
+    python -m school_assistant.bench.e2e --iterations 20 --compare baseline.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+from school_assistant.bench.stubs import SberStubServer
+
+# Вопрос по умолчанию не должен попадать в локальные ответы по расписанию
+DEFAULT_TRANSCRIPT = "Как решать квадратные уравнения?"
+# Изменения меньше этого значения (мс) считаются шумом при сравнении
+NOISE_FLOOR_MS = 5.0
+
+
+def speech_like_pcm(seconds=2.0, rate=16000):
+    """
+    Формирует PCM-аудио, похожее на фразу: слоги-тоны с паузами по краям.
+
+    Args:
+        seconds (float): Длительность в секундах.
+        rate (int): Частота дискретизации.
+
+    Returns:
+        bytes: PCM-аудио (16 бит, моно).
+    """
+    t = np.arange(int(seconds * rate)) / rate
+    voiced = (t > 0.3) & (t < seconds - 0.3) & (np.sin(2 * np.pi * 4 * t) > -0.5)
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * voiced
+    noise = np.random.default_rng(0).normal(0, 0.002, len(t))
+    return ((signal + noise) * 32767).astype(np.int16).tobytes()
+
+
+def load_fixture(path, rate):
+    """
+    Загружает WAV-файл для воспроизведения в качестве записи.
+
+    Args:
+        path (str): Путь к WAV-файлу (16 бит, моно).
+        rate (int): Ожидаемая частота дискретизации.
+
+    Returns:
+        bytes: PCM-аудио.
+
+    Raises:
+        ValueError: Если формат файла не совпадает с форматом записи.
+    """
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != rate:
+            raise ValueError(
+                f"{path}: нужен WAV 16 бит, моно, {rate} Гц "
+                f"(а не {wf.getsampwidth() * 8} бит, {wf.getnchannels()} кан., "
+                f"{wf.getframerate()} Гц)"
+            )
+        return wf.readframes(wf.getnframes())
+
+
+class ReplayAudio:
+    """
+    Заглушка аудиодвижка: запись отдает заранее заданное аудио,
+    воспроизведение только имитирует длительность звучания.
+    """
+
+    def __init__(self, pcm, rate, chunk_size=1024, realtime=False, playback_scale=0.0):
+        """
+        Args:
+            pcm (bytes): Аудио, которое «записывается» с микрофона.
+            rate (int): Частота дискретизации записи.
+            chunk_size (int): Размер фрагмента записи в кадрах.
+            realtime (bool): Отдавать фрагменты записи в реальном времени.
+            playback_scale (float): Доля реальной длительности воспроизведения
+                (0 — ответ «звучит» мгновенно).
+        """
+        self.pcm = pcm
+        self.rate = rate
+        self.chunk_bytes = chunk_size * 2
+        self.realtime = realtime
+        self.playback_scale = playback_scale
+        self._lock = threading.Lock()
+        self._busy_until = 0.0
+        self._stopped = threading.Event()
+        self._stream = None
+        # Задержки от окончания записи до сигнала «услышал» и до начала
+        # ответа (секунды), число фраз-заполнителей
+        self.released_at = None
+        self.answered = True
+        self.acknowledge_delays = []
+        self.answer_delays = []
+        self.fillers = 0
+
+    def start(self):
+        pass
+
+    def prepare_output(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        self.stop_playback()
+
+    def record(self, is_pressed, max_seconds=20, on_chunk=None, end_detector=None):
+        chunk_seconds = self.chunk_bytes / 2 / self.rate
+        sent = 0
+        for start in range(0, len(self.pcm), self.chunk_bytes):
+            chunk = self.pcm[start:start + self.chunk_bytes]
+            if self.realtime:
+                time.sleep(chunk_seconds)
+            if on_chunk:
+                on_chunk(chunk)
+            sent = start + len(chunk)
+            if not is_pressed() or (end_detector and end_detector.feed(chunk)):
+                break
+        self.released_at = time.perf_counter()
+        self.answered = False
+        return self.pcm[:sent]
+
+    def play_wav(self, audio_data, wait=False):
+        from school_assistant.audio.audio_processor import parse_wav
+
+        rate, channels, sample_width, pcm = parse_wav(audio_data)
+        self.extend_playback(len(pcm) / (rate * channels * sample_width))
+        if wait:
+            self.wait_playback()
+        return True
+
+    def play_stream(self, rate, channels=1, sample_width=2, prebuffer_ms=None):
+        with self._lock:
+            self._stream = ReplayStream(self, rate, channels, sample_width)
+            return self._stream
+
+    def play_cue(self, cue):
+        if cue.name == "filler":
+            self.fillers += 1
+        elif self.released_at is not None:
+            self.acknowledge_delays.append(time.perf_counter() - self.released_at)
+        return True
+
+    def reset_feedback(self):
+        self.acknowledge_delays.clear()
+        self.answer_delays.clear()
+        self.fillers = 0
+
+    def extend_playback(self, seconds):
+        with self._lock:
+            if not self.answered:
+                self.answer_delays.append(time.perf_counter() - self.released_at)
+                self.answered = True
+            self._stopped.clear()
+            self._busy_until = max(self._busy_until, time.monotonic()) + seconds * self.playback_scale
+
+    def is_playing(self):
+        return time.monotonic() < self._busy_until
+
+    def wait_playback(self, timeout=None):
+        remaining = self._busy_until - time.monotonic()
+        if timeout is not None:
+            remaining = min(remaining, timeout)
+        if remaining > 0:
+            self._stopped.wait(remaining)
+        return not self.is_playing()
+
+    def stop_playback(self):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.abort()
+            self._busy_until = 0.0
+            self._stopped.set()
+
+
+class ReplayStream:
+    """
+    Заглушка буфера потокового воспроизведения: записанное аудио
+    продлевает имитируемое звучание.
+    """
+
+    def __init__(self, audio, rate, channels, sample_width):
+        self.audio = audio
+        self.bytes_per_second = rate * channels * sample_width
+        self.bytes_written = 0
+        self.underruns = 0
+        self.starved_seconds = 0.0
+        self.ready_at = None
+        self.aborted = False
+
+    def write(self, pcm):
+        if self.aborted:
+            return False
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+        self.bytes_written += len(pcm)
+        self.audio.extend_playback(len(pcm) / self.bytes_per_second)
+        return True
+
+    def close(self):
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeButton:
+    """
+    Заглушка слушателя кнопки: кнопка считается нажатой всегда, запись
+    заканчивается вместе с аудио.
+    """
+
+    PRESS = "press"
+    RELEASE = "release"
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def is_pressed(self):
+        return True
+
+
+def configure_environment(server, args):
+    """
+    Направляет конфигурацию приложения на заглушки.
+
+    Должна вызываться до импорта модулей school_assistant, читающих config.
+    """
+    os.environ.update(server.urls())
+    os.environ.update(
+        {
+            "SBER_AUTH_TOKEN": "stub",
+            "GIGACHAT_AUTH_TOKEN": "stub",
+            "STT_MODE": args.stt_mode,
+            "PIPELINE_MODE": "true" if args.pipelined else "false",
+            "TTS_CACHE_ENABLED": "true" if args.tts_cache else "false",
+            "TTS_STREAMING": "false" if args.buffered_tts else "true",
+            "SPECULATIVE_ENABLED": "true" if args.speculative else "false",
+            "EARCONS_ENABLED": "false" if args.no_earcons else "true",
+            "FILLER_DELAY_MS": str(args.filler_delay),
+            "LLM_CACHE_ENABLED": "true" if args.llm_cache else "false",
+            "TRACING_ENABLED": "true",
+            "TRACE_EXPORT_DIR": "",
+            "KNOWLEDGE_INDEX_PATH": "",
+            "DEBUG_AUDIO_DIR": "",
+            "LOG_CONSOLE": "true" if args.verbose else "false",
+        }
+    )
+
+
+def distribution(values):
+    """
+    Вычисляет статистику распределения задержек (мс).
+    """
+    from school_assistant.utils.tracing import percentile
+
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def run_benchmark(args):
+    """
+    Выполняет итерации handle_interaction на заглушках.
+
+    Returns:
+        dict: Результаты: параметры, сквозная задержка и задержки этапов (мс).
+    """
+    server = SberStubServer(
+        use_https=True,
+        latency={
+            "oauth": args.oauth_latency,
+            "recognize": args.stt_latency,
+            "synthesize": args.tts_latency,
+        },
+        transcript=args.transcript,
+        tts_seconds=args.tts_seconds,
+        tts_bandwidth=args.tts_bandwidth,
+        jitter=args.jitter,
+    ).start()
+    configure_environment(server, args)
+
+    # Импорт после настройки окружения: config читает переменные при импорте
+    from school_assistant.ai.llm import AssistantLLM
+    from school_assistant.bench.fake_llm import DEFAULT_RESPONSE, FakeChatModel
+    from school_assistant.config.config import AUDIO_RATE
+    from school_assistant.main import SchoolAssistant
+    from school_assistant.utils.metrics import METRICS
+    from school_assistant.utils.tracing import TRACER
+
+    pcm = load_fixture(args.wav, AUDIO_RATE) if args.wav else speech_like_pcm(rate=AUDIO_RATE)
+    # Кнопку отпускают не сразу после конца фразы
+    pcm += b"\x00\x00" * int(args.hold * AUDIO_RATE)
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+
+    end_to_end = []
+    failures = 0
+    with quiet:
+        chat_model = FakeChatModel(
+            response=args.response or DEFAULT_RESPONSE,
+            first_token_latency=args.llm_latency,
+            token_latency=args.llm_token_latency,
+            streaming=args.pipelined,
+        )
+        audio = ReplayAudio(
+            pcm, AUDIO_RATE, realtime=args.realtime, playback_scale=args.playback_scale
+        )
+        assistant = SchoolAssistant(
+            audio=audio,
+            button=FakeButton(),
+            llm=AssistantLLM(streaming=args.pipelined, chat_model=chat_model),
+        )
+        assistant.llm.conversation.verbose = args.verbose
+        if not args.verbose:
+            assistant.logger.setLevel(logging.WARNING)
+
+        try:
+            for iteration in range(args.warmup + args.iterations):
+                if iteration == args.warmup:
+                    TRACER.reset()
+                    METRICS.reset()
+                    audio.reset_feedback()
+                start = time.perf_counter()
+                ok = assistant.handle_interaction()
+                elapsed = (time.perf_counter() - start) * 1000
+                if iteration >= args.warmup:
+                    end_to_end.append(elapsed)
+                    failures += not ok
+        finally:
+            assistant.token_manager.stop()
+            server.stop()
+
+    stages = {}
+    for name, stats in TRACER.summary().items():
+        stages[name] = {key: stats[key] * 1000 for key in ("mean", "p50", "p95", "p99")}
+        stages[name].update(
+            count=stats["count"],
+            bytes_sent=stats["bytes_sent"],
+            bytes_received=stats["bytes_received"],
+        )
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("save_baseline", "compare", "verbose")
+        },
+        "failures": failures,
+        "end_to_end": distribution(end_to_end),
+        "stages": stages,
+        "speculative": {
+            name.split(".", 1)[1]: value
+            for name, value in METRICS.snapshot()["counters"].items()
+            if name.startswith("speculative.")
+        },
+        "feedback": {
+            "acknowledge": distribution([delay * 1000 for delay in audio.acknowledge_delays]),
+            "answer": distribution([delay * 1000 for delay in audio.answer_delays]),
+            "fillers": audio.fillers,
+        },
+    }
+
+
+def print_report(results):
+    """
+    Печатает распределения задержек.
+    """
+    print(f"{'этап':<24} {'кол-во':>7} {'среднее':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = [("сквозная задержка", results["end_to_end"])]
+    rows += sorted(results["stages"].items(), key=lambda item: -item[1]["mean"] * item[1]["count"])
+    for name, stats in rows:
+        print(
+            f"{name:<24} {stats['count']:>7} {stats['mean']:>9.1f} {stats['p50']:>9.1f} "
+            f"{stats['p95']:>9.1f} {stats['p99']:>9.1f}"
+        )
+    print(f"Время в миллисекундах; неуспешных итераций: {results['failures']}")
+    speculative = results.get("speculative")
+    if speculative:
+        print(
+            "Спекулятивные запросы: "
+            + ", ".join(f"{name} {value}" for name, value in sorted(speculative.items()))
+        )
+    feedback = results.get("feedback")
+    if feedback and feedback["answer"]["count"]:
+        acknowledge = (
+            f"{feedback['acknowledge']['p50']:.1f} мс"
+            if feedback["acknowledge"]["count"]
+            else "нет"
+        )
+        print(
+            f"После отпускания кнопки (p50): сигнал «услышал» {acknowledge}, "
+            f"начало ответа {feedback['answer']['p50']:.1f} мс; "
+            f"фраз-заполнителей {feedback['fillers']}"
+        )
+
+
+def compare(results, baseline, threshold):
+    """
+    Сравнивает результаты с базовыми и печатает изменения.
+
+    Args:
+        results (dict): Текущие результаты.
+        baseline (dict): Базовые результаты.
+        threshold (float): Допустимый относительный рост p95 (0.1 — 10%).
+
+    Returns:
+        list: Имена этапов с регрессией.
+    """
+    current = dict(results["stages"], **{"сквозная задержка": results["end_to_end"]})
+    previous = dict(baseline["stages"], **{"сквозная задержка": baseline["end_to_end"]})
+
+    regressions = []
+    print(f"\nСравнение с базой от {baseline.get('created', '?')} (p95, мс):")
+    changed = sorted(
+        key
+        for key, value in results["params"].items()
+        if key != "iterations" and baseline.get("params", {}).get(key, value) != value
+    )
+    if changed:
+        print(f"Внимание: параметры прогона отличаются от базы: {', '.join(changed)}")
+    for name in sorted(set(current) & set(previous)):
+        before, after = previous[name]["p95"], current[name]["p95"]
+        change = (after - before) / before * 100 if before else 0.0
+        regressed = after > before * (1 + threshold) and after - before > NOISE_FLOOR_MS
+        mark = "  РЕГРЕССИЯ" if regressed else ""
+        print(f"{name:<24} {before:>9.1f} -> {after:>9.1f} ({change:+6.1f}%){mark}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="число итераций")
+    parser.add_argument("--warmup", type=int, default=1, help="итераций прогрева")
+    parser.add_argument("--wav", help="WAV-файл вопроса (16 бит, моно, AUDIO_RATE)")
+    parser.add_argument("--transcript", default=DEFAULT_TRANSCRIPT, help="ответ распознавания")
+    parser.add_argument("--response", help="ответ языковой модели")
+    parser.add_argument("--stt-mode", default="batch", choices=["batch", "streaming", "local"])
+    parser.add_argument("--pipelined", action="store_true", help="конвейерный режим ответа")
+    parser.add_argument("--realtime", action="store_true", help="запись в реальном времени")
+    parser.add_argument(
+        "--hold", type=float, default=0.0, help="тишина в конце записи до отпускания кнопки, с"
+    )
+    parser.add_argument(
+        "--speculative", action="store_true", help="запрос к LLM по частичной гипотезе"
+    )
+    parser.add_argument("--no-earcons", action="store_true", help="без звуковых подсказок")
+    parser.add_argument(
+        "--filler-delay", type=int, default=1500, help="задержка фразы-заполнителя, мс"
+    )
+    parser.add_argument(
+        "--playback-scale", type=float, default=0.0, help="доля реальной длительности ответа"
+    )
+    parser.add_argument("--oauth-latency", type=float, default=0.1, help="задержка OAuth, с")
+    parser.add_argument("--stt-latency", type=float, default=0.3, help="задержка распознавания, с")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="задержка синтеза, с")
+    parser.add_argument("--tts-seconds", type=float, default=3.0, help="длительность ответа, с")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="до первого токена, с")
+    parser.add_argument("--llm-token-latency", type=float, default=0.01, help="между токенами, с")
+    parser.add_argument("--jitter", type=float, default=0.2, help="разброс задержек заглушек")
+    parser.add_argument(
+        "--tts-bandwidth", type=float, default=0, help="скорость выдачи аудио синтеза, байт/с"
+    )
+    parser.add_argument(
+        "--buffered-tts", action="store_true", help="воспроизводить ответ после полной загрузки"
+    )
+    parser.add_argument("--tts-cache", action="store_true", help="включить кеш синтеза")
+    parser.add_argument("--llm-cache", action="store_true", help="включить кеш ответов LLM")
+    parser.add_argument("--save-baseline", help="сохранить результаты в файл")
+    parser.add_argument("--compare", help="сравнить с сохраненными результатами")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="допустимый рост p95 (доля)"
+    )
+    parser.add_argument("--verbose", action="store_true", help="не скрывать вывод приложения")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены: {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
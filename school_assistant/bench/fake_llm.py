@@ -0,0 +1,57 @@
+"""
+Модуль заглушки чат-модели для бенчмарков.
+
+Заглушка заменяет GigaChat в AssistantLLM: отвечает заданным текстом
+с настраиваемой задержкой до первого токена и между токенами, а в
+потоковом режиме передает токены через обратные вызовы langchain.
+"""
+
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.chat_models.base import SimpleChatModel
+from langchain.schema.messages import BaseMessage
+
+DEFAULT_RESPONSE = (
+    "Квадратное уравнение решается через дискриминант. Сначала найди "
+    "дискриминант по формуле b в квадрате минус четыре a c. Если он "
+    "положительный, у уравнения два корня. Если равен нулю, корень один. "
+    "Если отрицательный, действительных корней нет."
+)
+
+_TOKEN_RE = re.compile(r"\S+\s*")
+
+
+class FakeChatModel(SimpleChatModel):
+    """
+    Чат-модель с заранее заданным ответом и имитацией задержек.
+    """
+
+    response: str = DEFAULT_RESPONSE
+    # Задержка до первого токена и между токенами (секунды)
+    first_token_latency: float = 0.5
+    token_latency: float = 0.02
+    streaming: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _call(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        self.calls += 1
+        time.sleep(self.first_token_latency)
+        tokens = _TOKEN_RE.findall(self.response)
+        for token in tokens:
+            if self.streaming and run_manager:
+                run_manager.on_llm_new_token(token)
+            time.sleep(self.token_latency)
+        return self.response
@@ -0,0 +1,149 @@
+"""
+Нагрузочный тест шлюза для нескольких устройств.
+
+Шлюз запускается в этом же процессе: API Сбера заменяется локальным
+сервером заглушек с квотой одновременных запросов, GigaChat — заглушкой
+чат-модели. Каждое устройство — отдельный поток, который отправляет
+записанный вопрос и ждет ответа. Сессий меньше, чем устройств, поэтому
+часть историй диалога вытесняется. В отчете — пропускная способность,
+задержки, коды ответов, число ответов 429 от заглушки и итоговый предел
+одновременных запросов шлюза.
+
+Запуск:
+    python -m school_assistant.bench.gateway --devices 24 --requests 5 --quota 4
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import Counter
+
+from school_assistant.bench.e2e import speech_like_pcm
+from school_assistant.bench.stubs import SberStubServer
+
+
+def configure_environment(server, args):
+    """
+    Направляет конфигурацию шлюза на заглушки.
+
+    Должна вызываться до импорта модулей school_assistant, читающих config.
+    """
+    os.environ.update(server.urls())
+    os.environ.update(
+        {
+            "SBER_AUTH_TOKEN": "stub",
+            "GIGACHAT_AUTH_TOKEN": "stub",
+            "GATEWAY_MAX_INFLIGHT": str(args.max_inflight),
+            "GATEWAY_MAX_QUEUE": str(args.max_queue),
+            "GATEWAY_MAX_SESSIONS": str(args.sessions),
+            # Соединений в пуле не меньше, чем одновременных запросов шлюза
+            "HTTP_POOL_MAXSIZE": str(max(args.max_inflight, args.devices)),
+            "TTS_CACHE_ENABLED": "false",
+            "LLM_CACHE_ENABLED": "false",
+            "FASTPATH_ENABLED": "false",
+            "TRACE_EXPORT_DIR": "",
+            "KNOWLEDGE_INDEX_PATH": "",
+        }
+    )
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=24, help="число устройств")
+    parser.add_argument("--requests", type=int, default=5, help="вопросов с каждого устройства")
+    parser.add_argument("--sessions", type=int, default=16, help="GATEWAY_MAX_SESSIONS")
+    parser.add_argument("--max-inflight", type=int, default=8, help="GATEWAY_MAX_INFLIGHT")
+    parser.add_argument("--max-queue", type=int, default=32, help="GATEWAY_MAX_QUEUE")
+    parser.add_argument(
+        "--quota", type=int, default=4, help="одновременных запросов к речевому API (0 — без квоты)"
+    )
+    parser.add_argument("--stt-latency", type=float, default=0.15, help="задержка распознавания, с")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="задержка синтеза, с")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="задержка ответа LLM, с")
+    args = parser.parse_args()
+
+    stub = SberStubServer(
+        latency={"recognize": args.stt_latency, "synthesize": args.tts_latency},
+        jitter=0.2,
+        max_concurrent=args.quota,
+    ).start()
+    configure_environment(stub, args)
+
+    # Модули читают конфигурацию при импорте
+    from school_assistant.api import http_client
+    from school_assistant.bench.fake_llm import FakeChatModel
+    from school_assistant.gateway.client import GatewayClient
+    from school_assistant.gateway.server import GatewayServer
+    from school_assistant.utils.metrics import METRICS
+    from school_assistant.utils.tracing import percentile
+
+    chat_model = FakeChatModel(first_token_latency=args.llm_latency, token_latency=0.0)
+    gateway = GatewayServer(chat_model=chat_model)
+    gateway.prepare()
+    port = gateway.start_background()
+    url = f"http://127.0.0.1:{port}"
+    pcm = speech_like_pcm()
+
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def device(number):
+        client = GatewayClient(url, device_id=f"device-{number:03d}")
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            try:
+                status = client.ask(pcm=pcm)["status"]
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(elapsed * 1000)
+
+    threads = [threading.Thread(target=device, args=(n,)) for n in range(args.devices)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    health = gateway.health()
+    gateway.stop()
+    stub.stop()
+    http_client.close_session()
+
+    total = args.devices * args.requests
+    print(
+        f"Устройств: {args.devices}, вопросов: {total}, сессий: {args.sessions}, "
+        f"предел шлюза: {args.max_inflight}, квота API: {args.quota or 'нет'}"
+    )
+    print(f"Время: {elapsed:.1f} с, пропускная способность: {total / elapsed:.2f} вопросов/с")
+    print("Коды ответов шлюза: " + ", ".join(f"{k} {v}" for k, v in sorted(statuses.items(), key=str)))
+    if latencies:
+        print(
+            f"Задержка успешных ответов, мс: p50 {percentile(latencies, 50):.0f}, "
+            f"p95 {percentile(latencies, 95):.0f}, макс {max(latencies):.0f}"
+        )
+    print(
+        f"Ответов 429 от API: {stub.throttled}, повторов: "
+        f"{METRICS.get('retry.sber.recognize') + METRICS.get('retry.sber.synthesize')}"
+    )
+    print(
+        f"Сессий создано: {METRICS.get('gateway.sessions.created')}, "
+        f"вытеснено: {health['sessions_evicted']}, в очереди ждали: {METRICS.get('gateway.queued')}"
+    )
+    print(
+        f"Снижений предела: {METRICS.get('gateway.limit_decreased')}, "
+        f"итоговый предел: {health['limit']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
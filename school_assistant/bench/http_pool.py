@@ -0,0 +1,103 @@
+"""
+Бенчмарк задержки HTTPS-запросов с пулом соединений и без него.
+
+Запуск:
+    python -m school_assistant.bench.http_pool --requests 50
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from school_assistant.api.http_client import create_session
+from school_assistant.bench.stubs import SberStubServer
+
+
+def percentile(values, q):
+    """
+    Вычисляет перцентиль по отсортированному списку значений.
+
+    Args:
+        values (list): Значения.
+        q (float): Перцентиль от 0 до 100.
+
+    Returns:
+        float: Значение перцентиля.
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(post, url, count, payload):
+    """
+    Выполняет count запросов и измеряет время каждого.
+
+    Args:
+        post (callable): Функция выполнения POST-запроса.
+        url (str): URL запроса.
+        count (int): Количество запросов.
+        payload (bytes): Тело запроса.
+
+    Returns:
+        list: Время выполнения запросов в миллисекундах.
+    """
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = post(url, data=payload, verify=False, timeout=(5, 30))
+        response.content
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    """
+    Печатает статистику задержек.
+    """
+    print(
+        f"{name:<12} среднее {statistics.mean(timings):7.2f} мс | "
+        f"p50 {percentile(timings, 50):7.2f} мс | "
+        f"p95 {percentile(timings, 95):7.2f} мс | "
+        f"первый {timings[0]:7.2f} мс"
+    )
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50, help="число запросов")
+    parser.add_argument(
+        "--payload-kb", type=int, default=64, help="размер тела запроса в КБ"
+    )
+    args = parser.parse_args()
+
+    server = SberStubServer(use_https=True).start()
+    url = server.urls()["SBER_RECOGNIZE_URL"]
+    payload = b"\x00" * (args.payload_kb * 1024)
+
+    try:
+        print(f"Заглушка: {server.base_url}, запросов: {args.requests}")
+
+        # Без пула: каждый вызов requests.post открывает новое соединение
+        unpooled = measure(requests.post, url, args.requests, payload)
+        report("без пула", unpooled)
+
+        # С пулом: одно соединение переиспользуется между запросами
+        session = create_session()
+        pooled = measure(session.post, url, args.requests, payload)
+        session.close()
+        report("с пулом", pooled)
+
+        saved = statistics.mean(unpooled) - statistics.mean(pooled)
+        print(f"Экономия на запрос: {saved:.2f} мс")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
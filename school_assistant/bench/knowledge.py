@@ -0,0 +1,164 @@
+"""
+Бенчмарк базы знаний: размер промпта и задержка поиска в зависимости от
+размера корпуса.
+
+Для каждого размера генерируется синтетический корпус (расписания классов,
+кружки, объявления) и сравнивается промпт со всем корпусом и промпт
+с top-k найденными фрагментами.
+
+Запуск:
+    python -m school_assistant.bench.knowledge --sizes 10 100 1000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from school_assistant.ai.memory import CHARS_PER_TOKEN, estimate_tokens
+from school_assistant.bench.http_pool import percentile
+from school_assistant.config.config import KNOWLEDGE_TOP_K
+from school_assistant.knowledge.index import KnowledgeIndex
+
+DAYS = ["понедельник", "вторник", "среду", "четверг", "пятницу", "субботу"]
+SUBJECTS = [
+    "Русский", "Математика", "Литература", "Физика", "Химия", "История",
+    "Английский", "Информатика", "Биология", "География", "Инженерное дело",
+]
+QUERIES = [
+    "Какое расписание на пятницу?",
+    "Когда физика во вторник?",
+    "Во сколько начинается кружок робототехники?",
+    "Что задали по истории?",
+    "Когда родительское собрание?",
+]
+
+
+def generate_corpus(directory, documents, seed=0):
+    """
+    Создает синтетический корпус документов.
+
+    Args:
+        directory (str): Директория для документов.
+        documents (int): Количество документов.
+        seed (int): Начальное значение генератора случайных чисел.
+
+    Returns:
+        int: Суммарный размер корпуса в символах.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for number in range(documents):
+        grade = f"{number % 11 + 1}{'абвг'[number // 11 % 4]}"
+        paragraphs = [f"# Расписание {grade} класса"]
+        for day in DAYS:
+            lessons = ", ".join(
+                f"{8 + i}:{rng.choice(['00', '15', '30', '45'])} - {rng.choice(SUBJECTS)}"
+                for i in range(5)
+            )
+            paragraphs.append(f"Расписание на {day}: {lessons}.")
+        paragraphs.append(
+            f"Кружок робототехники для {grade} класса в {rng.choice(DAYS)} "
+            f"в {rng.randint(14, 17)}:00, кабинет {rng.randint(100, 400)}."
+        )
+        paragraphs.append(
+            f"Объявление: родительское собрание {grade} класса "
+            f"{rng.randint(1, 28)} числа в 18:30."
+        )
+        text = "\n\n".join(paragraphs)
+        total += len(text)
+        with open(os.path.join(directory, f"doc_{number:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+    return total
+
+
+def run_size(documents, top_k, repeats):
+    """
+    Измеряет индексацию и поиск для корпуса заданного размера.
+
+    Args:
+        documents (int): Количество документов.
+        top_k (int): Количество фрагментов в промпте.
+        repeats (int): Количество повторов каждого запроса.
+
+    Returns:
+        dict: Результаты измерений.
+    """
+    workdir = tempfile.mkdtemp(prefix="knowledge_bench_")
+    corpus_dir = os.path.join(workdir, "data")
+    os.makedirs(corpus_dir)
+    index_path = os.path.join(workdir, "index.json")
+    try:
+        corpus_chars = generate_corpus(corpus_dir, documents)
+
+        start = time.perf_counter()
+        index = KnowledgeIndex(corpus_dir, index_path)
+        index.refresh()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        KnowledgeIndex(corpus_dir, index_path).refresh()
+        load = time.perf_counter() - start
+
+        # Изменение одного документа переиндексирует только его
+        path = os.path.join(corpus_dir, "doc_00000.txt")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n\nОбъявление: экскурсия в музей в субботу.")
+        start = time.perf_counter()
+        index.refresh()
+        incremental = time.perf_counter() - start
+
+        timings = []
+        context_tokens = []
+        for _ in range(repeats):
+            for query in QUERIES:
+                start = time.perf_counter()
+                context = index.context(query, top_k)
+                timings.append((time.perf_counter() - start) * 1000)
+                context_tokens.append(estimate_tokens(context))
+
+        return {
+            "documents": documents,
+            "snippets": len(index),
+            "full_tokens": corpus_chars // CHARS_PER_TOKEN,
+            "topk_tokens": statistics.mean(context_tokens),
+            "build": build,
+            "load": load,
+            "incremental": incremental,
+            "p50": percentile(timings, 50),
+            "p95": percentile(timings, 95),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 100, 1000], help="размеры корпуса"
+    )
+    parser.add_argument("--top-k", type=int, default=KNOWLEDGE_TOP_K, help="фрагментов в промпте")
+    parser.add_argument("--repeats", type=int, default=20, help="повторов каждого запроса")
+    args = parser.parse_args()
+
+    print(
+        f"{'док.':>6} {'фрагм.':>7} | {'весь корпус':>12} {'top-k':>7} ток. | "
+        f"{'индекс':>8} {'загрузка':>8} {'1 файл':>8} с | {'p50':>6} {'p95':>6} мс"
+    )
+    for documents in args.sizes:
+        r = run_size(documents, args.top_k, args.repeats)
+        print(
+            f"{r['documents']:>6} {r['snippets']:>7} | {r['full_tokens']:>12} "
+            f"{r['topk_tokens']:>7.0f}     | {r['build']:>8.3f} {r['load']:>8.3f} "
+            f"{r['incremental']:>8.3f}   | {r['p50']:>6.2f} {r['p95']:>6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
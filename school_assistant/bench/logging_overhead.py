@@ -0,0 +1,142 @@
+"""
+Микробенчмарк затрат на логирование в одном ходе диалога.
+
+Ход пишет в лог несколько десятков записей. Сравниваются два способа:
+  sync  — обработчики файла и консоли выполняются в вызывающем потоке
+          (как было до асинхронного логирования);
+  queue — вызов только ставит запись в очередь, запись на диск выполняет
+          фоновый поток (utils.log_queue).
+Медленная карта памяти имитируется задержкой после записи каждой строки
+в файл. Вариант --prompt-dump добавляет в каждый ход вывод полного
+промпта (как ConversationChain с verbose=True).
+
+Запуск:
+    python -m school_assistant.bench.logging_overhead --turns 200 --write-latency-ms 2
+"""
+
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+# Средний размер промпта с историей и контекстом базы знаний (символов)
+PROMPT_CHARS = 4000
+
+
+class SlowFileHandler(logging.FileHandler):
+    """
+    Файловый обработчик, имитирующий медленную запись на SD-карту.
+    """
+
+    def __init__(self, filename, latency):
+        super().__init__(filename, encoding="utf-8")
+        self.latency = latency
+
+    def emit(self, record):
+        super().emit(record)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+def make_logger(name, handlers, asynchronous, queue_size):
+    """
+    Создает изолированный логгер для одного варианта.
+
+    Returns:
+        tuple: (логгер, QueueListener или None).
+    """
+    from school_assistant.utils.log_queue import DroppingQueueHandler
+
+    logger = logging.getLogger(f"bench.logging.{name}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers.clear()
+    if not asynchronous:
+        for handler in handlers:
+            logger.addHandler(handler)
+        return logger, None
+
+    log_queue = queue.Queue(queue_size)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return logger, listener
+
+
+def run_turns(logger, turns, records, prompt_dump):
+    """
+    Имитирует логирование ходов диалога.
+
+    Returns:
+        list: Время логирования в каждом ходе (секунды).
+    """
+    prompt = "Системный промпт и история диалога. " * (PROMPT_CHARS // 36)
+    timings = []
+    for turn in range(turns):
+        started = time.perf_counter()
+        for index in range(records):
+            logger.info(f"Ход {turn}: этап {index}, распознанный текст: как решать уравнения?")
+        if prompt_dump:
+            logger.info(f"Prompt after formatting:\n{prompt}")
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200, help="число ходов")
+    parser.add_argument("--records", type=int, default=30, help="записей лога в ходе")
+    parser.add_argument(
+        "--write-latency-ms", type=float, default=2.0, help="задержка записи строки в файл, мс"
+    )
+    parser.add_argument("--prompt-dump", action="store_true", help="выводить промпт в каждом ходе")
+    parser.add_argument("--queue-size", type=int, default=10000, help="размер очереди записей")
+    args = parser.parse_args()
+
+    from school_assistant.utils.log_queue import LOG_FORMAT
+    from school_assistant.utils.metrics import METRICS
+    from school_assistant.utils.tracing import percentile
+
+    print(
+        f"Ходов {args.turns}, записей в ходе {args.records}"
+        f"{' + промпт' if args.prompt_dump else ''}, "
+        f"задержка записи {args.write_latency_ms:.1f} мс; время логирования в ходе, мс"
+    )
+    print(f"{'вариант':<8} {'p50':>9} {'p95':>9} {'макс':>9} {'дозапись':>9} {'потеряно':>9}")
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as console:
+        for name, asynchronous in (("sync", False), ("queue", True)):
+            formatter = logging.Formatter(LOG_FORMAT)
+            handlers = [
+                SlowFileHandler(os.path.join(log_dir, f"{name}.log"), args.write_latency_ms / 1000),
+                logging.StreamHandler(console),
+            ]
+            for handler in handlers:
+                handler.setFormatter(formatter)
+
+            METRICS.reset()
+            logger, listener = make_logger(name, handlers, asynchronous, args.queue_size)
+            timings = run_turns(logger, args.turns, args.records, args.prompt_dump)
+            # Сколько фоновый поток дописывает очередь после последнего хода
+            drain_started = time.perf_counter()
+            if listener is not None:
+                listener.stop()
+            drain = time.perf_counter() - drain_started
+            for handler in handlers:
+                handler.close()
+
+            print(
+                f"{name:<8} {percentile(timings, 50) * 1000:>9.2f} "
+                f"{percentile(timings, 95) * 1000:>9.2f} {max(timings) * 1000:>9.2f} "
+                f"{drain * 1000:>9.0f} {METRICS.get('log.dropped'):>9}"
+            )
+    print("Дозапись — время, за которое фоновый поток дописал очередь после последнего хода")
+
+
+if __name__ == "__main__":
+    main()
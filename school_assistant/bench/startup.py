@@ -0,0 +1,174 @@
+"""
+Бенчмарк времени запуска ассистента.
+
+Каждый замер выполняется в новом процессе Python (холодный импорт модулей):
+от запуска интерпретатора до готовности SchoolAssistant к первому нажатию
+кнопки. API Сбера заменяется локальным сервером заглушек, GigaChat —
+заглушкой чат-модели (langchain при этом импортируется как обычно), а
+открытие аудиоустройств и устройства ввода имитируется задержками.
+Сравниваются последовательная и параллельная инициализация
+(STARTUP_PARALLEL).
+
+Запуск:
+    python -m school_assistant.bench.startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from school_assistant.bench.e2e import FakeButton, ReplayAudio, speech_like_pcm
+from school_assistant.bench.http_pool import percentile
+from school_assistant.bench.stubs import SberStubServer
+
+# Префиксы строк, которыми дочерний процесс сообщает о готовности
+# ассистента и о готовности языковой модели
+READY_MARKER = "READY "
+LLM_MARKER = "LLM "
+PHASES = ["import", "token", "audio", "button", "llm", "total"]
+COLUMNS = PHASES + ["ready", "llm_ready"]
+
+
+class SlowAudio(ReplayAudio):
+    """
+    Заглушка аудиодвижка с задержкой открытия устройств.
+    """
+
+    latency = 0.0
+
+    def start(self):
+        time.sleep(self.latency)
+
+
+class SlowButton(FakeButton):
+    """
+    Заглушка слушателя кнопки с задержкой открытия устройства ввода.
+    """
+
+    latency = 0.0
+
+    def start(self):
+        time.sleep(self.latency)
+
+
+def child(args):
+    """
+    Запускает ассистента в текущем процессе и сообщает длительность этапов.
+    """
+    started = time.perf_counter()
+    from school_assistant.main import SchoolAssistant
+
+    imported = time.perf_counter()
+
+    class BenchAssistant(SchoolAssistant):
+        def _init_llm(self):
+            # Как и в приложении, langchain импортируется на этапе llm
+            from school_assistant.ai.llm import AssistantLLM
+            from school_assistant.bench.fake_llm import FakeChatModel
+            from school_assistant.config.config import PIPELINE_MODE
+
+            self._llm = AssistantLLM(streaming=PIPELINE_MODE, chat_model=FakeChatModel())
+
+    SlowAudio.latency = args.audio_latency
+    SlowButton.latency = args.button_latency
+    assistant = BenchAssistant(
+        audio=SlowAudio(speech_like_pcm(), 16000), button=SlowButton()
+    )
+
+    print(READY_MARKER, flush=True)
+    # При параллельном запуске языковая модель может быть еще не готова
+    assistant.llm
+    timings = dict(assistant.startup_timings, **{"import": imported - started})
+    print(LLM_MARKER + json.dumps(timings), flush=True)
+    # Фоновые потоки не останавливаем: замер закончен
+    os._exit(0)
+
+
+def measure(env, args):
+    """
+    Запускает дочерний процесс и ждет его готовности.
+
+    Returns:
+        dict: Длительность этапов, "ready" — время от запуска процесса
+            до готовности и "llm_ready" — до готовности языковой модели (секунды).
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "school_assistant.bench.startup", "--child"]
+        + [f"--audio-latency={args.audio_latency}", f"--button-latency={args.button_latency}"],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    timings = None
+    ready = None
+    for line in process.stdout:
+        if line.startswith(READY_MARKER):
+            ready = time.perf_counter() - started
+        elif line.startswith(LLM_MARKER):
+            timings = json.loads(line[len(LLM_MARKER):])
+            timings["ready"] = ready
+            timings["llm_ready"] = time.perf_counter() - started
+    process.wait()
+    if timings is None:
+        raise RuntimeError(f"Дочерний процесс завершился с кодом {process.returncode}")
+    return timings
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="запусков в каждом режиме")
+    parser.add_argument("--oauth-latency", type=float, default=0.3, help="задержка OAuth, с")
+    parser.add_argument("--audio-latency", type=float, default=0.4, help="открытие аудио, с")
+    parser.add_argument("--button-latency", type=float, default=0.05, help="открытие кнопки, с")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    server = SberStubServer(latency={"oauth": args.oauth_latency}).start()
+    env = dict(os.environ, **server.urls())
+    env.update({"SBER_AUTH_TOKEN": "stub", "TRACE_EXPORT_DIR": ""})
+
+    # Первый запуск прогревает файловый кеш ОС и индекс базы знаний
+    measure(dict(env, STARTUP_PARALLEL="true"), args)
+
+    results = {}
+    try:
+        for mode in ("false", "true"):
+            runs = [measure(dict(env, STARTUP_PARALLEL=mode), args) for _ in range(args.runs)]
+            results[mode] = runs
+    finally:
+        server.stop()
+
+    print(f"Медианы по {args.runs} запускам, мс")
+    header = f"{'режим':<18}" + "".join(f"{name:>10}" for name in COLUMNS)
+    print(header)
+    medians = {}
+    for mode, title in (("false", "последовательно"), ("true", "параллельно")):
+        medians[mode] = {
+            name: percentile([run.get(name, 0.0) * 1000 for run in results[mode]], 50)
+            for name in COLUMNS
+        }
+        print(f"{title:<18}" + "".join(f"{medians[mode][name]:>10.0f}" for name in COLUMNS))
+
+    speedup = medians["false"]["ready"] / medians["true"]["ready"]
+    print(f"\nВремя до готовности сократилось в {speedup:.2f} раза")
+    print(
+        "import — импорт school_assistant.main; total — инициализация SchoolAssistant; "
+        "ready — от запуска процесса до готовности к нажатию кнопки; "
+        "llm_ready — до готовности языковой модели"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Модуль локальных заглушек API Сбера для бенчмарков.
+
+Заглушка реализует эндпоинты OAuth, speech:recognize и text:synthesize
+и поддерживает keep-alive, HTTPS с самоподписанным сертификатом и
+chunked-загрузку аудио. Задержки ответов (со случайным разбросом),
+размер синтезированного аудио, скорость его выдачи и квота одновременных
+запросов настраиваются.
+"""
+
+import io
+import json
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def generate_self_signed_cert(directory):
+    """
+    Создает самоподписанный сертификат для localhost с помощью openssl.
+
+    Args:
+        directory (str): Директория для файлов сертификата и ключа.
+
+    Returns:
+        tuple: Пути к файлу сертификата и файлу ключа.
+    """
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key_path, "-out", cert_path,
+            "-days", "1", "-subj", "/CN=localhost",
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return cert_path, key_path
+
+
+def make_wav(seconds, rate=24000):
+    """
+    Формирует WAV-файл с тишиной заданной длительности.
+
+    Args:
+        seconds (float): Длительность в секундах.
+        rate (int): Частота дискретизации.
+
+    Returns:
+        bytes: Содержимое WAV-файла.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class SberStubHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов заглушки API Сбера.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Не засоряем вывод бенчмарка журналом запросов
+        pass
+
+    def _read_body(self):
+        """
+        Читает тело запроса, в том числе переданное чанками.
+
+        Returns:
+            bytes: Тело запроса или None, если передача прервана.
+        """
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    # Клиент прервал передачу (отмена потокового распознавания)
+                    return None
+                size = int(line.split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                body.extend(self.rfile.read(size))
+                self.rfile.readline()
+
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body, content_type="application/json", bandwidth=0):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        # Тело выдается частями со скоростью bandwidth байт/с, как при
+        # синтезе, который идет одновременно с передачей
+        chunk_size = 4096
+        for start in range(0, len(body), chunk_size):
+            self.wfile.write(body[start:start + chunk_size])
+            self.wfile.flush()
+            time.sleep(min(chunk_size, len(body) - start) / bandwidth)
+
+    def do_HEAD(self):
+        self._send(200, b"")
+
+    def do_POST(self):
+        server = self.server
+        body = self._read_body()
+        if body is None:
+            self.close_connection = True
+            return
+        path = self.path.split("?")[0]
+
+        if path.endswith("/oauth"):
+            server.delay("oauth")
+            payload = {
+                "access_token": f"stub-token-{time.time()}",
+                "expires_at": int((time.time() + server.token_ttl) * 1000),
+            }
+            self._send(200, json.dumps(payload).encode())
+        elif path.endswith(("speech:recognize", "text:synthesize")):
+            # Квота: одновременных запросов к речевым эндпоинтам не больше max_concurrent
+            if not server.enter():
+                self._send(429, b'{"status": 429, "message": "Too Many Requests"}')
+                return
+            try:
+                if path.endswith("speech:recognize"):
+                    server.delay("recognize")
+                    server.bytes_received += len(body)
+                    payload = {"result": [server.transcript], "emotions": [], "status": 200}
+                    self._send(200, json.dumps(payload, ensure_ascii=False).encode())
+                else:
+                    server.delay("synthesize")
+                    self._send(
+                        200, server.tts_audio, content_type="audio/wav", bandwidth=server.tts_bandwidth
+                    )
+            finally:
+                server.leave()
+        else:
+            self._send(404, b"{}")
+
+
+class SberStubServer(ThreadingHTTPServer):
+    """
+    Многопоточный HTTP(S)-сервер с заглушками API Сбера.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        use_https=True,
+        latency=None,
+        transcript="Какое расписание на пятницу?",
+        tts_seconds=2.0,
+        tts_bandwidth=0,
+        token_ttl=1800,
+        jitter=0.0,
+        max_concurrent=0,
+    ):
+        """
+        Создает сервер заглушек.
+
+        Args:
+            host (str): Адрес для прослушивания.
+            port (int): Порт (0 — выбрать свободный).
+            use_https (bool): Использовать HTTPS с самоподписанным сертификатом.
+            latency (dict): Задержки ответа по эндпоинтам в секундах
+                (ключи "oauth", "recognize", "synthesize").
+            transcript (str): Текст, возвращаемый распознаванием.
+            tts_seconds (float): Длительность синтезированного аудио в секундах.
+            tts_bandwidth (float): Скорость выдачи синтезированного аудио
+                в байтах в секунду (0 — сразу целиком).
+            token_ttl (float): Время жизни выдаваемого токена в секундах.
+            jitter (float): Относительный разброс задержек (0.2 — ±20%).
+            max_concurrent (int): Квота одновременных запросов распознавания
+                и синтеза; сверх нее сервер отвечает 429 (0 — без квоты).
+        """
+        super().__init__((host, port), SberStubHandler)
+        self.latency = latency or {}
+        self.transcript = transcript
+        self.tts_audio = make_wav(tts_seconds)
+        self.tts_bandwidth = tts_bandwidth
+        self.token_ttl = token_ttl
+        self.jitter = jitter
+        self.max_concurrent = max_concurrent
+        self.active = 0
+        self.throttled = 0
+        self._active_lock = threading.Lock()
+        self.bytes_received = 0
+        self.scheme = "https" if use_https else "http"
+        self._thread = None
+
+        if use_https:
+            self._cert_dir = tempfile.TemporaryDirectory()
+            cert_path, key_path = generate_self_signed_cert(self._cert_dir.name)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert_path, key_path)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+
+    def delay(self, endpoint):
+        """
+        Выдерживает задержку ответа эндпоинта.
+
+        Args:
+            endpoint (str): "oauth", "recognize" или "synthesize".
+        """
+        latency = self.latency.get(endpoint, 0)
+        if latency and self.jitter:
+            latency *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def enter(self):
+        """
+        Учитывает начало запроса к речевому эндпоинту.
+
+        Returns:
+            bool: False, если квота одновременных запросов исчерпана.
+        """
+        with self._active_lock:
+            if self.max_concurrent and self.active >= self.max_concurrent:
+                self.throttled += 1
+                return False
+            self.active += 1
+            return True
+
+    def leave(self):
+        """
+        Учитывает окончание запроса к речевому эндпоинту.
+        """
+        with self._active_lock:
+            self.active -= 1
+
+    @property
+    def base_url(self):
+        """
+        Базовый URL сервера.
+        """
+        host, port = self.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def urls(self):
+        """
+        Возвращает URL эндпоинтов заглушки в формате переменных конфигурации.
+
+        Returns:
+            dict: Словарь {имя переменной: URL}.
+        """
+        return {
+            "SBER_OAUTH_URL": f"{self.base_url}/api/v2/oauth",
+            "SBER_RECOGNIZE_URL": f"{self.base_url}/rest/v1/speech:recognize",
+            "SBER_SYNTHESIZE_URL": f"{self.base_url}/rest/v1/text:synthesize",
+        }
+
+    def start(self):
+        """
+        Запускает сервер в фоновом потоке.
+
+        Returns:
+            SberStubServer: Этот же сервер.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Останавливает сервер.
+        """
+        self.shutdown()
+        self.server_close()
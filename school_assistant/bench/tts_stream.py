@@ -0,0 +1,157 @@
+"""
+Бенчмарк времени до первого звука при потоковом воспроизведении синтеза.
+
+Заглушка API Сбера выдает синтезированный WAV частями с заданной скоростью
+(в долях реального времени звучания). Сравниваются два способа:
+  buffered — синтез целиком (synthesize_speech), затем воспроизведение;
+  streamed — stream_speech → WavStreamParser → JitterBuffer по мере загрузки.
+Выходной поток имитируется потоком, который забирает данные из буфера
+блоками по 1024 кадра в реальном времени, как обратный вызов PortAudio;
+для streamed считаются недогрузки буфера.
+
+Запуск:
+    python -m school_assistant.bench.tts_stream --speeds 0.8 1.5 4 --runs 3
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from school_assistant.bench.stubs import SberStubServer
+
+# Блок выходного потока в кадрах (как frames_per_buffer PortAudio)
+OUTPUT_FRAMES = 1024
+RATE = 24000
+FRAME_BYTES = 2
+
+
+class SimulatedOutput(threading.Thread):
+    """
+    Имитация выходного аудиопотока: каждые OUTPUT_FRAMES / RATE секунд
+    забирает блок из буфера, пока буфер не будет исчерпан.
+    """
+
+    def __init__(self, buffer):
+        super().__init__(daemon=True)
+        self.buffer = buffer
+
+    def run(self):
+        period = OUTPUT_FRAMES / RATE
+        size = OUTPUT_FRAMES * FRAME_BYTES
+        next_tick = time.perf_counter()
+        while not self.buffer.finished:
+            self.buffer.read(size)
+            next_tick += period
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+
+def run_buffered(synthesize_speech, parse_wav, JitterBuffer, prebuffer_ms):
+    """
+    Синтез целиком, затем воспроизведение.
+
+    Returns:
+        tuple: (время до первого звука в секундах, число недогрузок).
+    """
+    started = time.perf_counter()
+    audio = synthesize_speech("Тестовый ответ", "stub")
+    rate, channels, sample_width, pcm = parse_wav(audio)
+    buffer = JitterBuffer(rate, channels, sample_width, prebuffer_ms)
+    buffer.write(bytes(pcm))
+    buffer.close()
+    output = SimulatedOutput(buffer)
+    output.start()
+    # Дальше звучит уже загруженное аудио: ждем только первого звука
+    while buffer.first_sound_at is None:
+        time.sleep(0.001)
+    buffer.abort()
+    output.join()
+    return buffer.first_sound_at - started, 0
+
+
+def run_streamed(stream_speech, WavStreamParser, JitterBuffer, prebuffer_ms):
+    """
+    Воспроизведение по мере загрузки.
+
+    Returns:
+        tuple: (время до первого звука в секундах, число недогрузок).
+    """
+    started = time.perf_counter()
+    chunks = stream_speech("Тестовый ответ", "stub")
+    parser = WavStreamParser()
+    buffer = None
+    output = None
+    for chunk in chunks:
+        pcm = parser.feed(chunk)
+        if buffer is None and parser.format is not None:
+            buffer = JitterBuffer(*parser.format, prebuffer_ms=prebuffer_ms)
+            output = SimulatedOutput(buffer)
+            output.start()
+        if pcm:
+            buffer.write(pcm)
+    buffer.close()
+    output.join()
+    return buffer.first_sound_at - started, buffer.underruns
+
+
+def main():
+    """
+    Точка входа бенчмарка.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--speeds",
+        type=float,
+        nargs="+",
+        default=[0.8, 1.5, 4.0],
+        help="скорость выдачи аудио заглушкой в долях реального времени",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="запусков каждого варианта")
+    parser.add_argument("--tts-seconds", type=float, default=3.0, help="длительность ответа, с")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="задержка до первого байта, с")
+    parser.add_argument("--prebuffer-ms", type=int, default=200, help="запас буфера, мс")
+    args = parser.parse_args()
+
+    server = SberStubServer(
+        latency={"synthesize": args.tts_latency}, tts_seconds=args.tts_seconds
+    ).start()
+    os.environ.update(server.urls())
+    os.environ.update({"TRACE_EXPORT_DIR": "", "TTS_CACHE_ENABLED": "false"})
+
+    # Модули читают конфигурацию при импорте
+    from school_assistant.api import http_client
+    from school_assistant.api.sber_api import stream_speech, synthesize_speech
+    from school_assistant.audio.audio_processor import parse_wav
+    from school_assistant.audio.jitter_buffer import JitterBuffer
+    from school_assistant.audio.wav_stream import WavStreamParser
+    from school_assistant.utils.tracing import percentile
+
+    print(
+        f"Ответ {args.tts_seconds:.1f} с, до первого байта {args.tts_latency * 1000:.0f} мс, "
+        f"запас буфера {args.prebuffer_ms} мс; время до первого звука (медиана), мс"
+    )
+    print(f"{'скорость':>9} {'buffered':>10} {'streamed':>10} {'недогрузок':>11}")
+    try:
+        for speed in args.speeds:
+            server.tts_bandwidth = speed * RATE * FRAME_BYTES
+            buffered = [
+                run_buffered(synthesize_speech, parse_wav, JitterBuffer, args.prebuffer_ms)[0]
+                for _ in range(args.runs)
+            ]
+            streamed = [
+                run_streamed(stream_speech, WavStreamParser, JitterBuffer, args.prebuffer_ms)
+                for _ in range(args.runs)
+            ]
+            underruns = sum(run[1] for run in streamed) / len(streamed)
+            print(
+                f"{speed:>8.1f}x {percentile(buffered, 50) * 1000:>10.0f} "
+                f"{percentile([run[0] for run in streamed], 50) * 1000:>10.0f} {underruns:>11.1f}"
+            )
+    finally:
+        server.stop()
+        http_client.close_session()
+    print("Скорость — во сколько раз загрузка быстрее звучания; недогрузок — в среднем за ответ")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,24 +16,193 @@ load_dotenv(os.path.join(BASE_DIR, "config", ".env"))
 # Конфигурация для API Сбера
 SBER_AUTH_TOKEN = os.getenv("SBER_AUTH_TOKEN")
 SBER_API_SCOPE = "SALUTE_SPEECH_PERS"
+# За сколько секунд до истечения токена обновлять его в фоне
+SBER_TOKEN_REFRESH_MARGIN = float(os.getenv("SBER_TOKEN_REFRESH_MARGIN", 120))
+# Пауза между повторными попытками получить токен при ошибке (секунды)
+SBER_TOKEN_RETRY_INTERVAL = float(os.getenv("SBER_TOKEN_RETRY_INTERVAL", 5))
+
+# Эндпоинты API Сбера (можно переопределить, например, для локальных заглушек)
+SBER_OAUTH_URL = os.getenv(
+    "SBER_OAUTH_URL", "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
+)
+SBER_RECOGNIZE_URL = os.getenv(
+    "SBER_RECOGNIZE_URL", "https://smartspeech.sber.ru/rest/v1/speech:recognize"
+)
+SBER_SYNTHESIZE_URL = os.getenv(
+    "SBER_SYNTHESIZE_URL", "https://smartspeech.sber.ru/rest/v1/text:synthesize"
+)
+
+# Настройки HTTP-клиента: пул соединений и таймауты (секунды)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 8))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+
+# Устойчивость к сбоям сети: общий срок обработки вопроса после записи и
+# предельная длительность этапов (секунды), повторы идемпотентных запросов
+# и автоматы защиты, которые после серии ошибок на время перестают
+# обращаться к сервису
+TURN_DEADLINE = float(os.getenv("TURN_DEADLINE", 30))
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT", 10))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 20))
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", 10))
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", 3))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.2))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 2))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 3))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))
+# Заранее записанное сообщение «сервис недоступен» (WAV). Если файла нет,
+# сообщение синтезируется при запуске и хранится в памяти
+UNAVAILABLE_AUDIO_PATH = os.getenv(
+    "UNAVAILABLE_AUDIO_PATH", os.path.join(BASE_DIR, "audio", "unavailable.wav")
+)
 
 # Конфигурация для GigaChat
 GIGACHAT_AUTH_TOKEN = os.getenv("GIGACHAT_AUTH_TOKEN")
 
 # Настройки аудио
 AUDIO_DEVICE_INDEX = int(os.getenv("AUDIO_DEVICE_INDEX", 3))
+# Устройство воспроизведения (по умолчанию — системное)
+AUDIO_OUTPUT_DEVICE_INDEX = (
+    int(os.getenv("AUDIO_OUTPUT_DEVICE_INDEX"))
+    if os.getenv("AUDIO_OUTPUT_DEVICE_INDEX")
+    else None
+)
 AUDIO_RATE = int(os.getenv("AUDIO_RATE", 16000))
 AUDIO_CHANNELS = int(os.getenv("AUDIO_CHANNELS", 1))
 AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "wav")
+# Предзапись: сколько миллисекунд до нажатия кнопки добавлять в начало записи
+AUDIO_PRE_ROLL_MS = int(os.getenv("AUDIO_PRE_ROLL_MS", 300))
+# Максимальная длительность одной записи (секунды)
+AUDIO_MAX_SECONDS = int(os.getenv("AUDIO_MAX_SECONDS", 20))
 OUTPUT_AUDIO_FILE = os.getenv("OUTPUT_AUDIO_FILE", "output.wav")
 
+# Определение речевой активности (VAD): обрезка тишины перед отправкой
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() in ("1", "true", "yes")
+# Минимальный порог энергии речи (дБ относительно полной шкалы)
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", -45))
+# Длительность кадра анализа и запас тишины по краям речи (мс)
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", 20))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", 150))
+# Автоматически завершать запись после паузы такой длительности (мс, 0 — выключено)
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", 0))
+
+# Режим распознавания речи: "batch" (файл после записи),
+# "streaming" (отправка чанками во время записи) или "local" (локальный заменитель)
+STT_MODE = os.getenv("STT_MODE", "batch")
+# Текст, который возвращает локальный заменитель распознавателя
+LOCAL_STT_TEXT = os.getenv("LOCAL_STT_TEXT", "Какое расписание на пятницу?")
+
+# Конвейерный режим ответа: LLM → синтез → воспроизведение по предложениям
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "false").lower() in ("1", "true", "yes")
+# Количество потоков синтеза речи в конвейере
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 2))
+# Минимальная длина фрагмента текста, отправляемого на синтез
+PIPELINE_MIN_SENTENCE = int(os.getenv("PIPELINE_MIN_SENTENCE", 20))
+
+# Спекулятивный запрос к LLM: на паузе в речи (не короче SPECULATIVE_PAUSE_MS)
+# записанное аудио распознается, и по гипотезе из SPECULATIVE_MIN_WORDS слов
+# и более ответ запрашивается до окончания записи
+SPECULATIVE_ENABLED = os.getenv("SPECULATIVE_ENABLED", "false").lower() in ("1", "true", "yes")
+SPECULATIVE_PAUSE_MS = int(os.getenv("SPECULATIVE_PAUSE_MS", 300))
+SPECULATIVE_MIN_WORDS = int(os.getenv("SPECULATIVE_MIN_WORDS", 2))
+
+# Дисковый кеш синтезированной речи
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, "audio", "tts_cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", 50)) * 1024 * 1024
+
+# Потоковое воспроизведение синтезированной речи: ответ начинает звучать
+# по мере загрузки; воспроизведение начинается, когда в буфере накоплено
+# TTS_JITTER_BUFFER_MS миллисекунд аудио
+TTS_STREAMING = os.getenv("TTS_STREAMING", "true").lower() in ("1", "true", "yes")
+TTS_JITTER_BUFFER_MS = int(os.getenv("TTS_JITTER_BUFFER_MS", 200))
+TTS_STREAM_CHUNK_BYTES = int(os.getenv("TTS_STREAM_CHUNK_BYTES", 4096))
+
+# Звуковые подсказки: сигнал «услышал» после отпускания кнопки и
+# фраза-заполнитель, если LLM не ответила за FILLER_DELAY_MS (0 — без фраз);
+# фразы в FILLER_PHRASES разделяются символом «|»
+EARCONS_ENABLED = os.getenv("EARCONS_ENABLED", "true").lower() in ("1", "true", "yes")
+FILLER_DELAY_MS = int(os.getenv("FILLER_DELAY_MS", 1500))
+FILLER_PHRASES = [
+    phrase.strip()
+    for phrase in os.getenv(
+        "FILLER_PHRASES", "Секундочку, думаю.|Сейчас посмотрю.|Хороший вопрос, минутку."
+    ).split("|")
+    if phrase.strip()
+]
+
+# Память диалога LLM: бюджет токенов истории, число последних ходов,
+# сохраняемых дословно, и время простоя (с), после которого история сбрасывается
+LLM_MEMORY_MAX_TOKENS = int(os.getenv("LLM_MEMORY_MAX_TOKENS", 1200))
+LLM_MEMORY_RECENT_TURNS = int(os.getenv("LLM_MEMORY_RECENT_TURNS", 4))
+LLM_MEMORY_IDLE_TIMEOUT = float(os.getenv("LLM_MEMORY_IDLE_TIMEOUT", 300))
+
+# Кеш ответов LLM на повторяющиеся вопросы: размер и время жизни ответа (с)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 256))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))
+
+# Параллельная инициализация при запуске: языковая модель, токен Сбера,
+# аудиоустройства и кнопка готовятся одновременно
+STARTUP_PARALLEL = os.getenv("STARTUP_PARALLEL", "true").lower() in ("1", "true", "yes")
+
+# Шлюз для нескольких устройств: адрес сервера, число хранимых диалогов
+# устройств, предел одновременно обрабатываемых запросов и очередь ожидания
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "0.0.0.0")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", 8765))
+GATEWAY_MAX_SESSIONS = int(os.getenv("GATEWAY_MAX_SESSIONS", 64))
+GATEWAY_MAX_INFLIGHT = int(os.getenv("GATEWAY_MAX_INFLIGHT", 8))
+GATEWAY_MAX_QUEUE = int(os.getenv("GATEWAY_MAX_QUEUE", 32))
+GATEWAY_QUEUE_TIMEOUT = float(os.getenv("GATEWAY_QUEUE_TIMEOUT", 10))
+GATEWAY_MAX_BODY_MB = int(os.getenv("GATEWAY_MAX_BODY_MB", 5))
+# Адрес шлюза для тонкого клиента (например, http://gateway.local:8765)
+GATEWAY_URL = os.getenv("GATEWAY_URL", "")
+
 # Задаем полный путь к аудиофайлу
 OUTPUT_AUDIO_PATH = os.path.join(BASE_DIR, "audio", OUTPUT_AUDIO_FILE)
 
-# Системный промпт для LLM
+# Трассировка этапов обработки: гистограммы задержек и периодический экспорт
+# метрик (файл Prometheus и спаны в JSON Lines) в TRACE_EXPORT_DIR
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_EXPORT_DIR = os.getenv("TRACE_EXPORT_DIR", os.path.join(BASE_DIR, "logs", "metrics"))
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", 15))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_MB", 10)) * 1024 * 1024
+
+# Логирование: записи передаются через очередь фоновому потоку, который
+# пишет их в консоль и в файл LOG_DIR/assistant.log. Файл ротируется по
+# размеру (LOG_MAX_MB) и времени (LOG_ROTATE_HOURS), старые файлы сжимаются
+# gzip, хранится LOG_BACKUP_COUNT архивов. LOG_LEVELS задает уровни подсистем,
+# например "api=DEBUG,pipeline.speculation=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(BASE_DIR, "logs"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", 5)) * 1024 * 1024
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", 24))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() in ("1", "true", "yes")
+# Вывод полного промпта langchain на каждый запрос (только для отладки)
+LLM_VERBOSE = os.getenv("LLM_VERBOSE", "false").lower() in ("1", "true", "yes")
+
+# Директория для отладочного сохранения записей и ответов (пусто — не сохранять)
+DEBUG_AUDIO_DIR = os.getenv("DEBUG_AUDIO_DIR", "")
+
+# База знаний: документы о школе (расписания, кружки, объявления),
+# из которых в промпт подставляются только относящиеся к вопросу фрагменты
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", os.path.join(BASE_DIR, "knowledge", "data"))
+KNOWLEDGE_INDEX_PATH = os.getenv(
+    "KNOWLEDGE_INDEX_PATH", os.path.join(BASE_DIR, "knowledge", "index.json")
+)
+# Сколько наиболее релевантных фрагментов подставлять в промпт
+KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", 3))
+# Расписание уроков (JSON) для локальных ответов без запроса к LLM
+SCHEDULE_PATH = os.getenv("SCHEDULE_PATH", os.path.join(KNOWLEDGE_DIR, "schedule.json"))
+FASTPATH_ENABLED = os.getenv("FASTPATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Системный промпт для LLM. Вместо {context} подставляются фрагменты
+# базы знаний, найденные по вопросу пользователя
 SYSTEM_PROMPT = """Ты ассистент школьника, помогаешь со школьными делами. Ниже приводится дружеский разговор между человеком и AI. AI разговорчив и предоставляет множество конкретных деталей из своего контекста. Если AI не знает ответа на вопрос, он честно говорит, что не знает.
 отвечая на вопрос используй информацию из контекста:
-контекст: "Расписание на Пятницу : 8:30 - Русский, 9:30 - Математика. Расписание на понедельник: 8:20 - Литература, 9:50 - Инженерное дело"
-"информация о школе 777: Государственное бюджетное общеобразовательное учреждение «Инженерно-технологическая школа № 777» Санкт-Петербурга – уникальное образовательное учреждение России с высокотехнологичной образовательной средой, созданное по инициативе Правительства Санкт-Петербурга и Комитета по образованию."
-"расписание дополнительных занятий : Во вторник и четверг английский в 16:15"
+контекст: {context}
 Если в контексте не достаточно информации отвечай своими словами"""
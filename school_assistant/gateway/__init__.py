@@ -0,0 +1,3 @@
+"""
+Пакет шлюза для нескольких устройств: сервер и тонкий клиент.
+"""
@@ -0,0 +1,141 @@
+"""
+Тонкий клиент шлюза.
+
+Устройство только записывает вопрос и проигрывает ответ; распознавание,
+ответ языковой модели и синтез речи выполняет шлюз (см. gateway.server).
+Токены API на устройстве не нужны.
+
+Запуск:
+    GATEWAY_URL=http://192.168.1.10:8765 python -m school_assistant.gateway.client
+"""
+
+import json
+import socket
+import time
+from urllib.parse import unquote
+
+import requests
+
+from school_assistant.api import http_client
+from school_assistant.config.config import AUDIO_RATE, GATEWAY_URL, TURN_DEADLINE
+from school_assistant.utils.helpers import setup_logging
+
+# Сколько раз повторно отправить вопрос, если шлюз перегружен (429)
+OVERLOAD_RETRIES = 3
+
+
+class GatewayClient:
+    """
+    Клиент API шлюза.
+    """
+
+    def __init__(self, url=GATEWAY_URL, device_id=None, timeout=TURN_DEADLINE):
+        """
+        Args:
+            url (str): Адрес шлюза, например http://192.168.1.10:8765.
+            device_id (str): Идентификатор устройства (по умолчанию имя хоста).
+            timeout (float): Таймаут ответа шлюза в секундах.
+        """
+        if not url:
+            raise ValueError("Не задан адрес шлюза (GATEWAY_URL)")
+        self.url = url.rstrip("/")
+        self.device_id = device_id or socket.gethostname()
+        self.timeout = timeout
+
+    def ask(self, pcm=None, question=None, rate=AUDIO_RATE):
+        """
+        Отправляет вопрос шлюзу.
+
+        Args:
+            pcm (bytes): Записанное PCM-аудио (16 бит, моно).
+            question (str): Текст вопроса (вместо аудио).
+            rate (int): Частота дискретизации аудио.
+
+        Returns:
+            dict: Код ответа ("status"), WAV-аудио ответа ("audio"), тексты
+                вопроса и ответа и "retry_after" — через сколько секунд
+                повторить запрос, если шлюз перегружен.
+        """
+        headers = {"X-Device-Id": self.device_id}
+        if question is not None:
+            headers["Content-Type"] = "application/json"
+            data = json.dumps({"question": question}, ensure_ascii=False).encode("utf-8")
+        else:
+            headers["Content-Type"] = f"audio/x-pcm;rate={rate}"
+            data = bytes(pcm)
+
+        response = http_client.post(
+            f"{self.url}/v1/ask",
+            headers=headers,
+            data=data,
+            timeout=(self.timeout, self.timeout),
+        )
+        is_audio = response.headers.get("Content-Type", "").startswith("audio/")
+        retry_after = response.headers.get("Retry-After")
+        return {
+            "status": response.status_code,
+            "audio": response.content if is_audio else None,
+            "question": unquote(response.headers.get("X-Question", "")),
+            "answer": unquote(response.headers.get("X-Answer", "")),
+            "retry_after": float(retry_after) if retry_after else None,
+        }
+
+
+def main():
+    """
+    Точка входа тонкого клиента: нажатие кнопки, запись, ответ шлюза.
+    """
+    from school_assistant.audio.engine import AudioEngine
+    from school_assistant.hardware.input_devices import ButtonListener
+
+    logger = setup_logging()
+    client = GatewayClient()
+    audio = AudioEngine()
+    button = ButtonListener()
+    audio.start()
+    audio.prepare_output()
+    button.start()
+    logger.info(f"Клиент шлюза {client.url} запущен (устройство {client.device_id})")
+
+    try:
+        while True:
+            button.wait_for_press()
+            audio.stop_playback()
+            pcm = audio.record(is_pressed=button.is_pressed)
+            if not pcm:
+                continue
+            try:
+                result = client.ask(pcm=pcm)
+                # Шлюз перегружен: через Retry-After отправляем тот же вопрос
+                for attempt in range(OVERLOAD_RETRIES):
+                    if result["status"] != 429:
+                        break
+                    delay = result["retry_after"] or 1
+                    logger.warning(
+                        f"Шлюз перегружен, повтор вопроса через {delay:g} с "
+                        f"({attempt + 1}/{OVERLOAD_RETRIES})"
+                    )
+                    time.sleep(delay)
+                    result = client.ask(pcm=pcm)
+            except requests.RequestException as e:
+                logger.error(f"Шлюз недоступен: {str(e)}")
+                continue
+            if result["status"] == 429:
+                logger.error("Шлюз перегружен, вопрос не отправлен")
+                continue
+            if result["question"]:
+                logger.info(f"Вопрос: {result['question']}")
+            if result["answer"]:
+                logger.info(f"Ответ: {result['answer']}")
+            if result["audio"]:
+                audio.play_wav(result["audio"])
+    except KeyboardInterrupt:
+        logger.info("Клиент остановлен")
+    finally:
+        button.stop()
+        audio.close()
+        http_client.close_session()
+
+
+if __name__ == "__main__":
+    main()
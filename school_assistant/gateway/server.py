@@ -0,0 +1,665 @@
+"""
+Сервер шлюза для нескольких устройств.
+
+Тонкие клиенты (см. gateway.client) отправляют записанный вопрос, а шлюз
+выполняет распознавание, ответ языковой модели и синтез речи. Токен Сбера,
+пул HTTP-соединений, чат-модель, база знаний и кеши общие для всех
+устройств; история диалога у каждого устройства своя и хранится в LRU-кеше.
+
+Протокол (HTTP/1.1 с keep-alive):
+    POST /v1/ask        вопрос: PCM-аудио (Content-Type: audio/x-pcm;rate=16000)
+                        или JSON {"question": "..."}; заголовок X-Device-Id.
+                        Ответ: WAV-аудио, текст в заголовках X-Question и
+                        X-Answer (percent-encoding).
+    GET  /v1/health     состояние шлюза в JSON.
+
+Если одновременных запросов больше допустимого, запрос ждет в очереди;
+при переполнении очереди шлюз отвечает 429 с Retry-After. Когда API Сбера
+отвечает 429 (исчерпана квота), допустимое число одновременных запросов
+уменьшается вдвое и затем постепенно восстанавливается (AIMD).
+
+Запуск:
+    python -m school_assistant.gateway.server
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from school_assistant.api import http_client
+from school_assistant.api.resilience import (
+    GIGACHAT_BREAKER,
+    SBER_BREAKER,
+    UNAVAILABLE_RESPONSE,
+    Deadline,
+    ThrottleTracker,
+)
+from school_assistant.api.sber_api import speech_to_text, synthesize_speech
+from school_assistant.api.token_manager import SberTokenManager
+from school_assistant.api.tts_cache import TTSCache
+from school_assistant.knowledge.index import KnowledgeIndex
+from school_assistant.knowledge.schedule import ScheduleStore
+from school_assistant.config.config import (
+    AUDIO_RATE,
+    BREAKER_RESET_TIMEOUT,
+    FASTPATH_ENABLED,
+    GATEWAY_HOST,
+    GATEWAY_MAX_BODY_MB,
+    GATEWAY_MAX_INFLIGHT,
+    GATEWAY_MAX_QUEUE,
+    GATEWAY_MAX_SESSIONS,
+    GATEWAY_PORT,
+    GATEWAY_QUEUE_TIMEOUT,
+    LLM_CACHE_ENABLED,
+    STT_TIMEOUT,
+    TTS_CACHE_ENABLED,
+    TTS_TIMEOUT,
+    TURN_DEADLINE,
+)
+from school_assistant.utils.helpers import setup_logging
+from school_assistant.utils.metrics import METRICS
+from school_assistant.utils.tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    """
+    Ошибка запроса, на которую шлюз отвечает кодом status.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class AdmissionRejected(Exception):
+    """
+    Запрос не принят: шлюз перегружен.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("Шлюз перегружен")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Ограничение одновременно обрабатываемых запросов с очередью ожидания.
+
+    Предел снижается вдвое, если за время запроса внешний сервис ответил 429,
+    и растет на 1/предел после каждого запроса без ограничений (AIMD).
+    Запросы, начатые до последнего снижения, предел больше не снижают:
+    один всплеск ответов 429 уменьшает его только один раз.
+    """
+
+    def __init__(
+        self,
+        max_inflight=GATEWAY_MAX_INFLIGHT,
+        max_queue=GATEWAY_MAX_QUEUE,
+        queue_timeout=GATEWAY_QUEUE_TIMEOUT,
+    ):
+        """
+        Args:
+            max_inflight (int): Наибольший предел одновременных запросов.
+            max_queue (int): Сколько запросов может ждать в очереди.
+            queue_timeout (float): Сколько секунд запрос может ждать в очереди.
+        """
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.limit = float(max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self._decreased_at = 0.0
+        self._condition = None
+
+    def _free(self):
+        return self.inflight < max(1, int(self.limit))
+
+    async def acquire(self):
+        """
+        Ждет возможности обработать запрос.
+
+        Returns:
+            float: Время допуска запроса (time.monotonic), передается в release.
+
+        Raises:
+            AdmissionRejected: Если очередь переполнена или ожидание затянулось.
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            if not self._free():
+                if self.waiting >= self.max_queue:
+                    METRICS.inc("gateway.rejected")
+                    raise AdmissionRejected(retry_after=1)
+                self.waiting += 1
+                METRICS.inc("gateway.queued")
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(self._free), self.queue_timeout
+                    )
+                except asyncio.TimeoutError:
+                    METRICS.inc("gateway.queue_timeout")
+                    raise AdmissionRejected(retry_after=int(self.queue_timeout))
+                finally:
+                    self.waiting -= 1
+            self.inflight += 1
+            return time.monotonic()
+
+    async def release(self, admitted, throttled=False):
+        """
+        Отмечает окончание запроса и пересчитывает предел.
+
+        Args:
+            admitted (float): Время допуска запроса (результат acquire).
+            throttled (bool): Внешний сервис ограничивал частоту во время запроса.
+        """
+        async with self._condition:
+            self.inflight -= 1
+            if throttled:
+                if admitted >= self._decreased_at:
+                    self._decrease()
+            else:
+                self.limit = min(float(self.max_inflight), self.limit + 1 / self.limit)
+            METRICS.observe("gateway.limit", self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self):
+        """
+        Снижает предел вдвое. Вызывается под блокировкой.
+        """
+        self._decreased_at = time.monotonic()
+        limit = max(1.0, self.limit / 2)
+        if int(limit) < int(self.limit):
+            logger.warning(f"Квота внешнего сервиса исчерпана, предел запросов: {int(limit)}")
+            METRICS.inc("gateway.limit_decreased")
+        self.limit = limit
+
+
+class DeviceSession:
+    """
+    Состояние устройства: история диалога и блокировка, сохраняющая
+    порядок вопросов одного устройства.
+    """
+
+    __slots__ = ("llm", "lock", "requests")
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.lock = asyncio.Lock()
+        self.requests = 0
+
+
+class SessionStore:
+    """
+    LRU-кеш сессий устройств.
+
+    Методы get и add вызываются в потоке цикла событий; factory создает
+    AssistantLLM долго и вызывается в пуле потоков (см. GatewayServer.ask).
+    """
+
+    def __init__(self, factory, max_sessions=GATEWAY_MAX_SESSIONS):
+        """
+        Args:
+            factory (callable): Создает AssistantLLM для нового устройства.
+            max_sessions (int): Сколько сессий хранить; при превышении
+                вытесняется сессия устройства, дольше всех не обращавшегося.
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.evicted = 0
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, device_id):
+        """
+        Возвращает сессию устройства.
+
+        Args:
+            device_id (str): Идентификатор устройства.
+
+        Returns:
+            DeviceSession: Сессия устройства или None, если ее нет.
+        """
+        session = self._sessions.get(device_id)
+        if session is not None:
+            self._sessions.move_to_end(device_id)
+        return session
+
+    def add(self, device_id, llm):
+        """
+        Создает сессию устройства.
+
+        Если сессия уже создана параллельным запросом того же устройства,
+        возвращается она, а llm не используется.
+
+        Args:
+            device_id (str): Идентификатор устройства.
+            llm (AssistantLLM): Языковая модель новой сессии (результат factory).
+
+        Returns:
+            DeviceSession: Сессия устройства.
+        """
+        session = self.get(device_id)
+        if session is not None:
+            return session
+
+        session = DeviceSession(llm)
+        self._sessions[device_id] = session
+        METRICS.inc("gateway.sessions.created")
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+            METRICS.inc("gateway.sessions.evicted")
+        return session
+
+
+class GatewayServer:
+    """
+    Асинхронный сервер шлюза.
+    """
+
+    def __init__(
+        self,
+        chat_model=None,
+        max_sessions=GATEWAY_MAX_SESSIONS,
+        admission=None,
+        token_manager=None,
+    ):
+        """
+        Args:
+            chat_model: Общая чат-модель langchain. Если не указана,
+                создается GigaChat.
+            max_sessions (int): Сколько сессий устройств хранить.
+            admission (AdmissionController): Контроль допуска запросов.
+            token_manager (SberTokenManager): Общий менеджер токена Сбера.
+        """
+        # langchain импортируется только при запуске шлюза
+        from school_assistant.ai.llm import AssistantLLM, create_chat_model
+        from school_assistant.ai.response_cache import ResponseCache
+
+        self.token_manager = token_manager or SberTokenManager()
+        self.knowledge = KnowledgeIndex()
+        self.knowledge.refresh()
+        self.schedule = ScheduleStore.load() if FASTPATH_ENABLED else None
+        self.tts_cache = TTSCache() if TTS_CACHE_ENABLED else None
+        self.llm_cache = ResponseCache() if LLM_CACHE_ENABLED else None
+        self.chat_model = chat_model or create_chat_model()
+        self.admission = admission or AdmissionController()
+        self.max_body = GATEWAY_MAX_BODY_MB * 1024 * 1024
+        # Запросы к API выполняются синхронно, в потоках
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.admission.max_inflight * 2, thread_name_prefix="gateway"
+        )
+        self._unavailable_audio = None
+
+        def create_llm():
+            llm = AssistantLLM(
+                knowledge=self.knowledge, cache=self.llm_cache, chat_model=self.chat_model
+            )
+            return llm
+
+        self.sessions = SessionStore(create_llm, max_sessions)
+        self._connections = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    def prepare(self):
+        """
+        Получает токен Сбера и готовит сообщение «сервис недоступен».
+        """
+        self.token_manager.refresh()
+        self.token_manager.start()
+        self._unavailable_audio = synthesize_speech(
+            UNAVAILABLE_RESPONSE, self.token_manager, cache=self.tts_cache
+        )
+
+    async def _call(self, func, *args, **kwargs):
+        """
+        Выполняет блокирующую функцию в пуле потоков шлюза.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def _unavailable(self, retry_after=BREAKER_RESET_TIMEOUT):
+        """
+        Формирует ответ «сервис недоступен».
+        """
+        headers = {"Retry-After": str(int(retry_after)), "X-Answer": quote(UNAVAILABLE_RESPONSE)}
+        if self._unavailable_audio:
+            return 503, headers, "audio/wav", self._unavailable_audio
+        return 503, headers, "application/json", _json({"error": UNAVAILABLE_RESPONSE})
+
+    async def ask(self, device_id, question=None, pcm=None, rate=AUDIO_RATE):
+        """
+        Отвечает на вопрос устройства.
+
+        Args:
+            device_id (str): Идентификатор устройства.
+            question (str): Текст вопроса (если вопрос передан текстом).
+            pcm (bytes): Аудио вопроса (16 бит, моно).
+            rate (int): Частота дискретизации аудио.
+
+        Returns:
+            tuple: (код, заголовки, Content-Type, тело ответа).
+        """
+        # Пока внешний сервис недоступен, запросы не занимают очередь
+        if SBER_BREAKER.is_open() or GIGACHAT_BREAKER.is_open():
+            METRICS.inc("gateway.unavailable")
+            return self._unavailable()
+
+        admitted = await self.admission.acquire()
+        # Ответы 429 именно этого запроса (глобальный счетчик учитывает
+        # и запросы других устройств)
+        throttle = ThrottleTracker()
+        try:
+            session = self.sessions.get(device_id)
+            if session is None:
+                # Создание AssistantLLM не должно блокировать цикл событий
+                llm = await self._call(self.sessions.factory)
+                session = self.sessions.add(device_id, llm)
+            async with session.lock:
+                session.requests += 1
+                return await self._answer(session, question, pcm, rate, throttle)
+        finally:
+            await self.admission.release(admitted, throttle.throttled > 0)
+
+    async def _answer(self, session, question, pcm, rate, throttle):
+        """
+        Распознает вопрос, получает ответ и синтезирует речь (см. ask).
+
+        Запросы к API выполняются через throttle.run, чтобы учесть ответы 429.
+        """
+        deadline = Deadline(TURN_DEADLINE)
+        timings = {}
+        started = time.perf_counter()
+
+        if question is None:
+            phrases = await self._call(
+                throttle.run,
+                speech_to_text,
+                pcm,
+                self.token_manager,
+                rate=rate,
+                deadline=deadline.stage(STT_TIMEOUT),
+            )
+            timings["stt"] = time.perf_counter() - started
+            if phrases is None:
+                return self._unavailable()
+            if not phrases:
+                raise HttpError(422, "Речь не распознана")
+            question = phrases[0]
+
+        stage_started = time.perf_counter()
+        answer = self.schedule.answer(question) if self.schedule else None
+        if answer is not None:
+            session.llm.remember(question, answer)
+        else:
+            answer = await self._call(throttle.run, session.llm.get_response, question)
+        timings["llm"] = time.perf_counter() - stage_started
+
+        stage_started = time.perf_counter()
+        audio = await self._call(
+            throttle.run,
+            synthesize_speech,
+            answer,
+            self.token_manager,
+            cache=self.tts_cache,
+            deadline=deadline.stage(TTS_TIMEOUT),
+        )
+        timings["tts"] = time.perf_counter() - stage_started
+        if audio is None:
+            return self._unavailable()
+
+        headers = {
+            "X-Question": quote(question),
+            "X-Answer": quote(answer),
+            "X-Timings": ",".join(f"{name}={seconds:.3f}" for name, seconds in timings.items()),
+        }
+        return 200, headers, "audio/wav", audio
+
+    def health(self):
+        """
+        Возвращает состояние шлюза.
+        """
+        return {
+            "sessions": len(self.sessions),
+            "sessions_evicted": self.sessions.evicted,
+            "inflight": self.admission.inflight,
+            "waiting": self.admission.waiting,
+            "limit": round(self.admission.limit, 2),
+            "breakers": {"sber": SBER_BREAKER.state, "gigachat": GIGACHAT_BREAKER.state},
+        }
+
+    async def _route(self, method, path, headers, body):
+        """
+        Обрабатывает HTTP-запрос.
+
+        Returns:
+            tuple: (код, заголовки, Content-Type, тело ответа).
+        """
+        if method == "GET" and path == "/v1/health":
+            return 200, {}, "application/json", _json(self.health())
+        if method != "POST" or path != "/v1/ask":
+            raise HttpError(404, "Неизвестный адрес")
+
+        device_id = headers.get("x-device-id")
+        if not device_id:
+            raise HttpError(400, "Нет заголовка X-Device-Id")
+
+        content_type = headers.get("content-type", "")
+        with TRACER.span("gateway.ask") as span:
+            span.add_bytes(received=len(body))
+            try:
+                if content_type.startswith("application/json"):
+                    try:
+                        question = json.loads(body)["question"]
+                    except (ValueError, KeyError, TypeError):
+                        raise HttpError(400, "Ожидается JSON с полем question")
+                    response = await self.ask(device_id, question=question)
+                else:
+                    rate = AUDIO_RATE
+                    for part in content_type.split(";"):
+                        key, _, value = part.strip().partition("=")
+                        if key == "rate" and value.isdigit():
+                            rate = int(value)
+                    response = await self.ask(device_id, pcm=body, rate=rate)
+            except AdmissionRejected as e:
+                response = 429, {"Retry-After": str(e.retry_after)}, "application/json", _json(
+                    {"error": str(e)}
+                )
+            span.add_bytes(sent=len(response[3]))
+            span.set(status=response[0])
+        return response
+
+    async def _read_request(self, reader):
+        """
+        Читает HTTP-запрос.
+
+        Returns:
+            tuple: (метод, путь, заголовки, тело) или None, если клиент
+                закрыл соединение.
+        """
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "Некорректная строка запроса")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HttpError(400, "Некорректный Content-Length")
+        if length > self.max_body:
+            raise HttpError(413, "Слишком большой запрос")
+        body = await reader.readexactly(length) if length else b""
+        return method, target.split("?")[0], headers, body
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Обслуживает соединение клиента (несколько запросов при keep-alive).
+        """
+        self._connections.add(writer)
+        try:
+            while True:
+                # Пока тело запроса не прочитано, соединение нельзя использовать
+                # повторно: непрочитанные данные приняли бы за следующий запрос
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, extra, content_type, payload = await self._route(
+                        method, path, headers, body
+                    )
+                except HttpError as e:
+                    status, extra, content_type, payload = (
+                        e.status, {}, "application/json", _json({"error": str(e)})
+                    )
+                    keep_alive = keep_alive and e.status != 400
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке запроса к шлюзу: {str(e)}")
+                    status, extra, content_type, payload = (
+                        500, {}, "application/json", _json({"error": str(e)})
+                    )
+
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+                head.append(f"Content-Type: {content_type}")
+                head.append(f"Content-Length: {len(payload)}")
+                head.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+                head.extend(f"{name}: {value}" for name, value in extra.items())
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def start(self, host=GATEWAY_HOST, port=GATEWAY_PORT):
+        """
+        Начинает принимать соединения.
+
+        Returns:
+            int: Порт, на котором слушает сервер.
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host=GATEWAY_HOST, port=GATEWAY_PORT):
+        """
+        Запускает сервер и обслуживает клиентов до остановки.
+        """
+        port = await self.start(host, port)
+        logger.info(f"Шлюз слушает {host}:{port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Перестает принимать соединения и закрывает открытые.
+        """
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def start_background(self, host="127.0.0.1", port=0):
+        """
+        Запускает сервер в фоновом потоке со своим циклом событий
+        (для бенчмарков).
+
+        Returns:
+            int: Порт, на котором слушает сервер.
+        """
+        started = threading.Event()
+        result = {}
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            result["port"] = self._loop.run_until_complete(self.start(host, port))
+            started.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="gateway", daemon=True)
+        self._thread.start()
+        started.wait()
+        return result["port"]
+
+    def stop(self):
+        """
+        Останавливает сервер, фоновое обновление токена и пул потоков.
+        """
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        self.token_manager.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def main():
+    """
+    Точка входа сервера шлюза.
+    """
+    setup_logging()
+    server = GatewayServer()
+    server.prepare()
+    TRACER.start_exporter()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Шлюз остановлен")
+    finally:
+        server.stop()
+        TRACER.stop_exporter()
+        http_client.close_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,20 @@
 Модуль для работы с устройствами ввода, такими как кнопки мыши.
 """
 
-from evdev import InputDevice, categorize, ecodes, list_devices
+import logging
+import os
+import queue
+import selectors
+import threading
+import time
+
+from evdev import InputDevice, ecodes, list_devices
+
+logger = logging.getLogger(__name__)
+
+# Кешированное устройство мыши, чтобы не перебирать /dev/input при каждом опросе
+_cached_device = None
+_cache_lock = threading.Lock()
 
 
 def find_mouse_device():
@@ -13,18 +26,52 @@ def find_mouse_device():
         InputDevice: Устройство мыши или None, если оно не найдено.
     """
     try:
-        devices = [InputDevice(path) for path in list_devices()]
-        for device in devices:
-            if "mouse" in device.name.lower():
-                return device
+        mouse = None
+        for path in list_devices():
+            device = InputDevice(path)
+            if mouse is None and "mouse" in device.name.lower():
+                mouse = device
+            else:
+                # Закрываем неподходящие устройства, чтобы не копить дескрипторы
+                device.close()
 
-        print("Устройство мыши не найдено.")
-        return None
+        if mouse is None:
+            logger.error("Устройство мыши не найдено.")
+        return mouse
     except Exception as e:
-        print(f"Ошибка при поиске устройства мыши: {str(e)}")
+        logger.error(f"Ошибка при поиске устройства мыши: {str(e)}")
         return None
 
 
+def get_mouse_device():
+    """
+    Возвращает кешированное устройство мыши, выполняя поиск только
+    при первом вызове или после отключения устройства.
+
+    Returns:
+        InputDevice: Устройство мыши или None, если оно не найдено.
+    """
+    global _cached_device
+    with _cache_lock:
+        if _cached_device is None:
+            _cached_device = find_mouse_device()
+        return _cached_device
+
+
+def _forget_mouse_device():
+    """
+    Сбрасывает кешированное устройство (например, после его отключения).
+    """
+    global _cached_device
+    with _cache_lock:
+        if _cached_device is not None:
+            try:
+                _cached_device.close()
+            except Exception:
+                pass
+            _cached_device = None
+
+
 def is_left_button_pressed():
     """
     Проверяет, нажата ли левая кнопка мыши.
@@ -32,7 +79,7 @@ def is_left_button_pressed():
     Returns:
         bool: True, если левая кнопка нажата, иначе False.
     """
-    mouse_device = find_mouse_device()
+    mouse_device = get_mouse_device()
 
     if not mouse_device:
         return False
@@ -44,6 +91,219 @@ def is_left_button_pressed():
             return True
         else:
             return False
+    except OSError as e:
+        # Устройство отключено: при следующем вызове выполним поиск заново
+        logger.error(f"Устройство мыши недоступно: {e}")
+        _forget_mouse_device()
+        return False
     except Exception as e:
-        print(f"Ошибка при получении состояния кнопки: {e}")
+        logger.error(f"Ошибка при получении состояния кнопки: {e}")
         return False
+
+
+class ButtonListener:
+    """
+    Слушатель событий кнопки мыши.
+
+    Фоновый поток открывает устройство один раз и ждет событий evdev через
+    selectors, поэтому в режиме ожидания процессор не нагружается, а нажатие
+    и отпускание становятся известны сразу. При отключении мыши устройство
+    ищется заново раз в rediscover_interval секунд.
+    """
+
+    PRESS = "press"
+    RELEASE = "release"
+
+    def __init__(self, button=ecodes.BTN_LEFT, rediscover_interval=1.0):
+        """
+        Инициализирует слушатель.
+
+        Args:
+            button (int): Код кнопки evdev.
+            rediscover_interval (float): Интервал повторного поиска устройства
+                в секундах, если оно не найдено или было отключено.
+        """
+        self.button = button
+        self.rediscover_interval = rediscover_interval
+
+        self._pressed = threading.Event()
+        self._released = threading.Event()
+        self._released.set()
+        self._callbacks = []
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        # Канал пробуждения потока при остановке; создается в start()
+        self._wake_r = self._wake_w = None
+        self._thread = None
+
+    def start(self):
+        """
+        Запускает фоновый поток чтения событий.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        if self._wake_r is None:
+            self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._event_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает фоновый поток.
+        """
+        self._stop_event.set()
+        if self._wake_w is None:
+            return
+        os.write(self._wake_w, b"\0")
+        if self._thread:
+            self._thread.join(timeout=1)
+            if self._thread.is_alive():
+                # Поток еще ждет на канале пробуждения: закрывать его нельзя
+                return
+            self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self._wake_r = self._wake_w = None
+
+    def add_callback(self, callback):
+        """
+        Регистрирует функцию, вызываемую при нажатии и отпускании кнопки.
+
+        Args:
+            callback (callable): Функция вида callback(event, timestamp), где
+                event — ButtonListener.PRESS или ButtonListener.RELEASE.
+                Вызывается в потоке слушателя и не должна блокироваться.
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def subscribe(self, maxsize=64):
+        """
+        Создает очередь, в которую будут попадать события кнопки.
+
+        Args:
+            maxsize (int): Размер очереди. При переполнении новые события
+                отбрасываются.
+
+        Returns:
+            queue.Queue: Очередь кортежей (event, timestamp).
+        """
+        events = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def is_pressed(self):
+        """
+        Проверяет, нажата ли кнопка сейчас.
+
+        Returns:
+            bool: True, если кнопка нажата.
+        """
+        return self._pressed.is_set()
+
+    def wait_for_press(self, timeout=None):
+        """
+        Блокируется до нажатия кнопки.
+
+        Args:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Returns:
+            bool: True, если кнопка нажата, False по таймауту.
+        """
+        return self._pressed.wait(timeout)
+
+    def wait_for_release(self, timeout=None):
+        """
+        Блокируется до отпускания кнопки.
+
+        Args:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Returns:
+            bool: True, если кнопка отпущена, False по таймауту.
+        """
+        return self._released.wait(timeout)
+
+    def _set_state(self, pressed, timestamp=None):
+        """
+        Обновляет состояние кнопки и уведомляет подписчиков при изменении.
+        """
+        if pressed == self._pressed.is_set():
+            return
+
+        if pressed:
+            self._released.clear()
+            self._pressed.set()
+        else:
+            self._pressed.clear()
+            self._released.set()
+
+        event = self.PRESS if pressed else self.RELEASE
+        timestamp = timestamp or time.time()
+        with self._lock:
+            callbacks = list(self._callbacks)
+            subscribers = list(self._subscribers)
+
+        for callback in callbacks:
+            try:
+                callback(event, timestamp)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике события кнопки: {e}")
+        for events in subscribers:
+            try:
+                events.put_nowait((event, timestamp))
+            except queue.Full:
+                pass
+
+    def _event_loop(self):
+        """
+        Цикл фонового потока: поиск устройства и чтение его событий.
+        """
+        while not self._stop_event.is_set():
+            device = get_mouse_device()
+            if device is None:
+                self._stop_event.wait(self.rediscover_interval)
+                continue
+
+            try:
+                self._read_events(device)
+            except OSError as e:
+                logger.warning(f"Устройство мыши отключено: {e}")
+            finally:
+                self._set_state(False)
+
+            if not self._stop_event.is_set():
+                _forget_mouse_device()
+
+    def _read_events(self, device):
+        """
+        Читает события устройства, пока оно доступно и слушатель не остановлен.
+
+        Args:
+            device (InputDevice): Устройство мыши.
+        """
+        # Синхронизируем состояние: кнопка могла быть нажата до подключения
+        self._set_state(self.button in device.active_keys())
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(device.fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+
+            while not self._stop_event.is_set():
+                for key, _ in selector.select():
+                    if key.fd == self._wake_r:
+                        os.read(self._wake_r, 1)
+                        continue
+
+                    for event in device.read():
+                        if event.type == ecodes.EV_KEY and event.code == self.button:
+                            # value: 1 — нажатие, 0 — отпускание, 2 — автоповтор
+                            if event.value in (0, 1):
+                                self._set_state(
+                                    event.value == 1, event.timestamp()
+                                )
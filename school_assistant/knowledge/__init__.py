@@ -0,0 +1,3 @@
+"""
+Пакет базы знаний: документы о школе и поиск по ним.
+"""
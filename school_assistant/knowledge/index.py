@@ -0,0 +1,296 @@
+"""
+Модуль поискового индекса базы знаний.
+
+Документы (.txt, .md и расписание в .json) загружаются из директории
+и делятся на фрагменты по абзацам. По фрагментам строится инвертированный индекс, поиск
+ранжирует их по BM25. Индекс сохраняется на диск и при изменении файлов
+перестраивается только для измененных документов.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from school_assistant.config.config import (
+    KNOWLEDGE_DIR,
+    KNOWLEDGE_INDEX_PATH,
+    KNOWLEDGE_TOP_K,
+)
+from school_assistant.knowledge.schedule import render_schedule
+from school_assistant.knowledge.text import tokenize
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Версия формата файла индекса; при ее изменении индекс строится заново
+INDEX_VERSION = 1
+# Расширения файлов, которые попадают в базу знаний (.json — расписание)
+DOCUMENT_EXTENSIONS = (".txt", ".md", ".json")
+# Параметры BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Абзацы длиннее этого числа символов делятся на строки
+SNIPPET_MAX_CHARS = 400
+
+
+def split_document(text):
+    """
+    Делит документ на фрагменты.
+
+    Если первая строка документа — заголовок вида "# Заголовок", он
+    добавляется к каждому фрагменту, чтобы фрагменты находились и по теме
+    документа.
+
+    Args:
+        text (str): Текст документа.
+
+    Returns:
+        list: Тексты фрагментов.
+    """
+    title = ""
+    lines = text.strip().splitlines()
+    if lines and lines[0].startswith("#"):
+        title = lines[0].lstrip("#").strip()
+        lines = lines[1:]
+
+    snippets = []
+    for paragraph in re.split(r"\n\s*\n", "\n".join(lines)):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        parts = [paragraph]
+        if len(paragraph) > SNIPPET_MAX_CHARS:
+            parts = [line.strip() for line in paragraph.splitlines() if line.strip()]
+        for part in parts:
+            snippets.append(f"{title}: {part}" if title else part)
+    return snippets
+
+
+class KnowledgeIndex:
+    """
+    Инвертированный индекс фрагментов документов с ранжированием BM25.
+
+    На диске хранятся фрагменты с частотами термов и сведения о файлах
+    (время изменения и размер); обратные списки строятся при загрузке.
+    """
+
+    def __init__(self, directory=KNOWLEDGE_DIR, index_path=KNOWLEDGE_INDEX_PATH):
+        """
+        Инициализирует пустой индекс.
+
+        Args:
+            directory (str): Директория с документами.
+            index_path (str): Путь к файлу индекса. Если пуст, индекс
+                не сохраняется на диск.
+        """
+        self.directory = directory
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._files = {}
+        self._snippets = {}
+        self._next_id = 0
+        self._postings = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._snippets)
+
+    def refresh(self):
+        """
+        Загружает индекс с диска и переиндексирует измененные документы.
+
+        Returns:
+            int: Количество добавленных, измененных и удаленных документов.
+        """
+        with self._lock:
+            if not self._files:
+                self._load()
+
+            changed = 0
+            current = self._scan()
+            for name in list(self._files):
+                if name not in current:
+                    self._remove_file(name)
+                    changed += 1
+            for name, (mtime, size) in current.items():
+                known = self._files.get(name)
+                if known and known["mtime"] == mtime and known["size"] == size:
+                    continue
+                if known:
+                    self._remove_file(name)
+                self._add_file(name, mtime, size)
+                changed += 1
+
+            if changed:
+                self._rebuild_postings()
+                self._save()
+            return changed
+
+    def search(self, query, top_k=KNOWLEDGE_TOP_K):
+        """
+        Находит фрагменты, наиболее релевантные запросу.
+
+        Args:
+            query (str): Запрос (вопрос пользователя).
+            top_k (int): Максимальное количество фрагментов.
+
+        Returns:
+            list: Пары (оценка BM25, текст фрагмента) по убыванию оценки.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            count = len(self._snippets)
+            if count == 0:
+                return []
+            average_length = self._total_length / count
+
+            scores = Counter()
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for snippet_id, tf in postings.items():
+                    length = self._snippets[snippet_id]["length"]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[snippet_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            results = [
+                (score, self._snippets[snippet_id]["text"])
+                for snippet_id, score in scores.most_common(top_k)
+            ]
+        METRICS.observe("knowledge.search_latency", time.perf_counter() - started)
+        return results
+
+    def context(self, query, top_k=KNOWLEDGE_TOP_K):
+        """
+        Формирует контекст для промпта из найденных фрагментов.
+
+        Args:
+            query (str): Вопрос пользователя.
+            top_k (int): Максимальное количество фрагментов.
+
+        Returns:
+            str: Фрагменты в кавычках через перевод строки или пустая строка.
+        """
+        return "\n".join(f'"{text}"' for _, text in self.search(query, top_k))
+
+    def _scan(self):
+        """
+        Перечисляет документы директории.
+
+        Returns:
+            dict: Относительный путь -> (время изменения, размер).
+        """
+        documents = {}
+        if not os.path.isdir(self.directory):
+            return documents
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(DOCUMENT_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                relative = os.path.relpath(path, self.directory)
+                documents[relative] = (stat.st_mtime_ns, stat.st_size)
+        return documents
+
+    def _add_file(self, name, mtime, size):
+        """
+        Индексирует документ.
+        """
+        try:
+            with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                text = f.read()
+            if name.endswith(".json"):
+                text = render_schedule(json.loads(text))
+        except (OSError, ValueError) as e:
+            logger.error(f"Ошибка при чтении документа базы знаний {name}: {str(e)}")
+            text = ""
+
+        ids = []
+        for snippet in split_document(text):
+            terms = Counter(tokenize(snippet))
+            if not terms:
+                continue
+            snippet_id = str(self._next_id)
+            self._next_id += 1
+            self._snippets[snippet_id] = {
+                "source": name,
+                "text": snippet,
+                "terms": dict(terms),
+                "length": sum(terms.values()),
+            }
+            ids.append(snippet_id)
+        self._files[name] = {"mtime": mtime, "size": size, "snippets": ids}
+
+    def _remove_file(self, name):
+        """
+        Удаляет документ из индекса.
+        """
+        for snippet_id in self._files.pop(name)["snippets"]:
+            self._snippets.pop(snippet_id, None)
+
+    def _rebuild_postings(self):
+        """
+        Строит обратные списки: терм -> {фрагмент: частота}.
+        """
+        postings = {}
+        total_length = 0
+        for snippet_id, snippet in self._snippets.items():
+            total_length += snippet["length"]
+            for term, tf in snippet["terms"].items():
+                postings.setdefault(term, {})[snippet_id] = tf
+        self._postings = postings
+        self._total_length = total_length
+
+    def _load(self):
+        """
+        Загружает индекс с диска, если он есть и совместим.
+        """
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Ошибка при загрузке индекса базы знаний: {str(e)}")
+            return
+        if data.get("version") != INDEX_VERSION or data.get("directory") != str(
+            self.directory
+        ):
+            return
+
+        self._files = data["files"]
+        self._snippets = data["snippets"]
+        self._next_id = data["next_id"]
+        self._rebuild_postings()
+
+    def _save(self):
+        """
+        Атомарно сохраняет индекс на диск.
+        """
+        if not self.index_path:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "directory": str(self.directory),
+            "files": self._files,
+            "snippets": self._snippets,
+            "next_id": self._next_id,
+        }
+        directory = os.path.dirname(self.index_path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Ошибка при сохранении индекса базы знаний: {str(e)}")
@@ -0,0 +1,209 @@
+"""
+Модуль расписания и локальных ответов на вопросы о нем.
+
+Расписание хранится в JSON (день недели -> уроки со временем). Вопросы
+вида «какие уроки в пятницу?» или «когда английский?» распознаются заранее
+скомпилированными регулярными выражениями и получают ответ локально,
+без запроса к языковой модели. Вопросы о домашнем задании и о начале
+или конце урока («что задали на пятницу?») передаются модели.
+
+Формат файла расписания:
+    {
+        "lessons": {"пятница": [{"time": "8:30", "subject": "Русский язык"}]},
+        "extra": {"вторник": [{"time": "16:15", "subject": "Английский язык"}]}
+    }
+"""
+
+import datetime
+import json
+import logging
+import re
+
+from school_assistant.config.config import SCHEDULE_PATH
+from school_assistant.knowledge.text import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Дни недели: (название в файле, регулярное выражение, форма «в какой день»)
+DAYS = [
+    ("понедельник", r"понедельн\w*", "в понедельник"),
+    ("вторник", r"вторн\w*", "во вторник"),
+    ("среда", r"сред[аеуы]\b", "в среду"),
+    ("четверг", r"четверг\w*", "в четверг"),
+    ("пятница", r"пятниц\w*", "в пятницу"),
+    ("суббота", r"суббот\w*", "в субботу"),
+    ("воскресенье", r"воскресен\w*", "в воскресенье"),
+]
+# Относительные дни: слово -> смещение от сегодняшнего дня
+RELATIVE_DAYS = {"сегодня": 0, "завтра": 1, "послезавтра": 2}
+
+_DAY_RE = re.compile(
+    "|".join(f"(?P<d{i}>\\b{pattern})" for i, (_, pattern, _) in enumerate(DAYS))
+    + "|(?P<relative>\\b(?:послезавтра|завтра|сегодня)\\b)"
+)
+# Вопрос о расписании дня: «какие уроки», «расписание», «что будет».
+# Одного слова «урок» или «что в …» мало: «что в пятницу задали?» —
+# вопрос не о расписании
+_DAY_INTENT_RE = re.compile(
+    r"\b(?:расписани\w*|(?:какие|какой|сколько)\s+(?:урок\w*|заняти\w*)"
+    r"|что\s+(?:будет|у\s+нас|у\s+меня))"
+)
+# Вопросы о домашнем задании и о начале или конце урока расписание не
+# отвечает: «что задали на пятницу?», «когда закончится урок?»
+_REJECT_RE = re.compile(
+    r"\b(?:зада\w*|домашн\w*|дз\b|законч\w*|конча\w*|начн\w*|начина\w*)"
+)
+# Вопрос о времени предмета: «когда», «во сколько», «в какой день»
+_WHEN_INTENT_RE = re.compile(
+    r"\b(?:когда|во\s+сколько|в\s+како[йем]\s+(?:день|дни|время)|в\s+какие\s+дни)\b"
+)
+
+
+def render_schedule(data):
+    """
+    Формирует текстовый документ из расписания для базы знаний.
+
+    Args:
+        data (dict): Расписание в формате файла расписания.
+
+    Returns:
+        str: Текст документа: заголовок и по абзацу на день.
+    """
+    paragraphs = ["# Расписание уроков"]
+    for section, title in (("lessons", "Расписание"), ("extra", "Дополнительные занятия")):
+        for day, lessons in data.get(section, {}).items():
+            items = ", ".join(f"{l['time']} - {l['subject']}" for l in lessons)
+            paragraphs.append(f"{title} на {day}: {items}.")
+    return "\n\n".join(paragraphs)
+
+
+class ScheduleStore:
+    """
+    Расписание уроков и дополнительных занятий с локальными ответами.
+    """
+
+    def __init__(self, data=None):
+        """
+        Инициализирует расписание.
+
+        Args:
+            data (dict): Расписание в формате файла расписания.
+        """
+        data = data or {}
+        self.lessons = {day: list(items) for day, items in data.get("lessons", {}).items()}
+        self.extra = {day: list(items) for day, items in data.get("extra", {}).items()}
+        self._subjects, self._subject_re = self._compile_subjects()
+
+    @classmethod
+    def load(cls, path=SCHEDULE_PATH):
+        """
+        Загружает расписание из JSON-файла.
+
+        Args:
+            path (str): Путь к файлу расписания.
+
+        Returns:
+            ScheduleStore: Расписание (пустое, если файл не удалось прочитать).
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error(f"Ошибка при загрузке расписания: {str(e)}")
+            return cls()
+
+    def _compile_subjects(self):
+        """
+        Компилирует выражение для поиска предметов в вопросе.
+
+        Returns:
+            tuple: (основа слова -> название предмета, регулярное выражение
+                или None, если предметов нет).
+        """
+        subjects = {}
+        for section in (self.lessons, self.extra):
+            for items in section.values():
+                for item in items:
+                    stems = tokenize(item["subject"])
+                    if stems:
+                        subjects.setdefault(stems[0], item["subject"])
+        if not subjects:
+            return subjects, None
+        alternatives = "|".join(sorted(map(re.escape, subjects), key=len, reverse=True))
+        return subjects, re.compile(f"\\b({alternatives})\\w*")
+
+    def answer(self, question, today=None):
+        """
+        Отвечает на вопрос о расписании, если он распознан.
+
+        Args:
+            question (str): Распознанный вопрос пользователя.
+            today (datetime.date): Сегодняшняя дата (для «сегодня», «завтра»).
+
+        Returns:
+            str: Ответ или None, если вопрос не о расписании и его нужно
+                передать языковой модели.
+        """
+        text = question.lower().replace("ё", "е")
+        if _REJECT_RE.search(text):
+            return None
+
+        subject = None
+        if self._subject_re is not None:
+            match = self._subject_re.search(text)
+            if match:
+                subject = self._subjects[match.group(1)]
+        if subject and _WHEN_INTENT_RE.search(text):
+            return self._describe_subject(subject)
+
+        day = self._find_day(text, today)
+        if day is not None and _DAY_INTENT_RE.search(text):
+            return self._describe_day(day)
+        return None
+
+    def _find_day(self, text, today):
+        """
+        Находит день недели в вопросе.
+
+        Returns:
+            int: Номер дня недели (0 — понедельник) или None.
+        """
+        match = _DAY_RE.search(text)
+        if not match:
+            return None
+        if match.group("relative"):
+            today = today or datetime.date.today()
+            return (today.weekday() + RELATIVE_DAYS[match.group("relative")]) % 7
+        return int(match.lastgroup[1:])
+
+    def _describe_day(self, day):
+        """
+        Формирует ответ с расписанием дня.
+        """
+        name, _, phrase = DAYS[day]
+        lessons = self.lessons.get(name, [])
+        extra = self.extra.get(name, [])
+        if not lessons and not extra:
+            return f"{phrase.capitalize()} уроков по расписанию нет."
+
+        parts = []
+        if lessons:
+            items = ", ".join(f"в {l['time']} {l['subject']}" for l in lessons)
+            parts.append(f"{phrase.capitalize()} уроки: {items}.")
+        if extra:
+            items = ", ".join(f"в {l['time']} {l['subject']}" for l in extra)
+            prefix = "Дополнительные занятия" if lessons else phrase.capitalize()
+            parts.append(f"{prefix}: {items}.")
+        return " ".join(parts)
+
+    def _describe_subject(self, subject):
+        """
+        Формирует ответ о том, когда проходит предмет.
+        """
+        times = []
+        for name, _, phrase in DAYS:
+            for section in (self.lessons, self.extra):
+                for item in section.get(name, []):
+                    if item["subject"] == subject:
+                        times.append(f"{phrase} в {item['time']}")
+        return f"{subject}: {', '.join(times)}."
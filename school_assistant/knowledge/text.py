@@ -0,0 +1,36 @@
+"""
+Модуль разбора текста на термы для поиска по базе знаний.
+"""
+
+import re
+
+# Длина основы слова: грубый стемминг для русского языка
+STEM_LENGTH = 5
+
+_WORD = re.compile(r"\w+")
+
+STOP_WORDS = frozenset(
+    """
+    а в во где да для до же за и из или к как какая какие какое какой
+    когда ко ли мне мы на не но о об от по про с со то ты у что это я
+    """.split()
+)
+
+
+def tokenize(text, keep=frozenset()):
+    """
+    Разбивает текст на термы: слова в нижнем регистре, обрезанные до основы.
+
+    Args:
+        text (str): Текст.
+        keep (frozenset): Стоп-слова, которые нужно сохранить.
+
+    Returns:
+        list: Термы текста.
+    """
+    terms = []
+    for word in _WORD.findall(text.lower().replace("ё", "е")):
+        if word in STOP_WORDS and word not in keep:
+            continue
+        terms.append(word[:STEM_LENGTH])
+    return terms
@@ -2,17 +2,59 @@
 Главный модуль приложения умного ассистента для школьника.
 """
 
-import os
 import time
-import logging
+import queue
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
-from school_assistant.api.sber_api import get_token, speech_to_text, text_to_speech
-from school_assistant.audio.audio_processor import record_audio, play_audio
-from school_assistant.hardware.input_devices import is_left_button_pressed
-from school_assistant.ai.llm import AssistantLLM
+from school_assistant.api import http_client
+from school_assistant.api.sber_api import (
+    RECOGNIZE_URL,
+    SYNTHESIZE_URL,
+    speech_to_text,
+    stream_speech,
+    synthesize_speech,
+)
+from school_assistant.api.resilience import (
+    UNAVAILABLE_RESPONSE,
+    Deadline,
+    DeadlineExceeded,
+)
+from school_assistant.api.token_manager import SberTokenManager
+from school_assistant.api.tts_cache import TTSCache
+from school_assistant.api.recognition import create_recognition_session
+from school_assistant.audio.audio_processor import pcm_to_wav, save_debug_audio
+from school_assistant.audio.earcons import EarconBank
+from school_assistant.audio.vad import EndOfSpeechDetector, trim_silence
+from school_assistant.audio.wav_stream import WavStreamParser
+from school_assistant.knowledge.schedule import ScheduleStore
+from school_assistant.pipeline.speculation import SpeculativeResponder
+from school_assistant.pipeline.speech_pipeline import SpeechPipeline
+from school_assistant.pipeline.turn import Turn, TurnCancelled
 from school_assistant.utils.helpers import setup_logging, create_directory_if_not_exists
-from school_assistant.config.config import OUTPUT_AUDIO_PATH
+from school_assistant.utils.log_queue import stop_logging
+from school_assistant.utils.metrics import METRICS
+from school_assistant.utils.tracing import TRACER
+from school_assistant.config.config import (
+    DEBUG_AUDIO_DIR,
+    EARCONS_ENABLED,
+    FASTPATH_ENABLED,
+    FILLER_DELAY_MS,
+    LLM_TIMEOUT,
+    STT_MODE,
+    PIPELINE_MODE,
+    SPECULATIVE_ENABLED,
+    STARTUP_PARALLEL,
+    STT_TIMEOUT,
+    TTS_CACHE_ENABLED,
+    TTS_STREAMING,
+    TTS_TIMEOUT,
+    TURN_DEADLINE,
+    UNAVAILABLE_AUDIO_PATH,
+    VAD_ENABLED,
+    VAD_END_SILENCE_MS,
+)
 
 
 class SchoolAssistant:
@@ -20,25 +62,212 @@ class SchoolAssistant:
     Основной класс приложения умного ассистента для школьника.
     """
 
-    def __init__(self):
+    def __init__(self, audio=None, button=None, llm=None):
         """
         Инициализирует объект ассистента.
+
+        Компоненты можно передать готовыми (например, заглушки в бенчмарках);
+        тогда PyAudio и evdev не импортируются.
+
+        Args:
+            audio: Аудиодвижок (по умолчанию AudioEngine).
+            button: Слушатель кнопки (по умолчанию ButtonListener).
+            llm (AssistantLLM): Языковая модель.
         """
         # Настраиваем логирование
-        self.logger = setup_logging(level=logging.INFO)
+        self.logger = setup_logging()
         self.logger.info("Инициализация ассистента...")
+        started = time.perf_counter()
+        # Длительность этапов запуска (секунды)
+        self.startup_timings = {}
+
+        # Аудио передается в памяти; файлы пишутся только в отладочную директорию
+        if DEBUG_AUDIO_DIR:
+            create_directory_if_not_exists(DEBUG_AUDIO_DIR)
+
+        self.audio = audio
+        self.button = button
+        self._llm = llm
+        self._llm_future = None
+        # Сообщение «сервис недоступен», которое звучит без обращения к API
+        self._unavailable_audio = None
+
+        # Кеш синтезированной речи для повторяющихся фраз
+        self.tts_cache = TTSCache() if TTS_CACHE_ENABLED else None
+
+        # Звуковые подсказки: сигнал «услышал» готов сразу, фразы-заполнители
+        # синтезируются в фоне при запуске
+        self.earcons = EarconBank() if EARCONS_ENABLED else None
+
+        # Заранее устанавливаем соединение с сервисом речи, пока
+        # инициализируются остальные компоненты
+        http_client.warm_up_async([RECOGNIZE_URL, SYNTHESIZE_URL])
+
+        # Расписание для локальных ответов без запроса к языковой модели
+        self.schedule = ScheduleStore.load() if FASTPATH_ENABLED else None
+
+        # Периодический экспорт задержек этапов и метрик
+        TRACER.start_exporter()
+
+        # Текущий ход диалога; новое нажатие кнопки отменяет его
+        self._turn = None
+        self._turn_lock = threading.Lock()
+
+        self.token_manager = SberTokenManager()
+
+        # Медленные этапы не зависят друг от друга: большая часть времени
+        # уходит на импорт langchain, открытие аудиоустройств и запрос к OAuth.
+        # Языковая модель нужна только после записи и распознавания вопроса,
+        # поэтому ее готовность не задерживает начало работы
+        background = {
+            "llm": self._init_llm,
+            "fallback": self._init_unavailable_audio,
+        }
+        if self.earcons and FILLER_DELAY_MS:
+            background["fillers"] = self._init_fillers
+        deferred = self._run_startup_phases(
+            {
+                "token": self._init_token,
+                "audio": self._init_audio,
+                "button": self._init_button,
+            },
+            background=background,
+        )
+        self._llm_future = deferred.get("llm")
+
+        self.startup_timings["total"] = time.perf_counter() - started
+        breakdown = ", ".join(
+            f"{name} {seconds * 1000:.0f} мс" for name, seconds in self.startup_timings.items()
+        )
+        self.logger.info(f"Ассистент готов к работе ({breakdown})")
+
+    @property
+    def llm(self):
+        """
+        Языковая модель. Если она еще инициализируется в фоне, ждет готовности.
+        """
+        if self._llm is None and self._llm_future is not None:
+            self._llm_future.result()
+        return self._llm
+
+    def _run_startup_phases(self, phases, background=None):
+        """
+        Выполняет этапы запуска и замеряет длительность каждого.
+
+        При STARTUP_PARALLEL этапы выполняются одновременно, а фоновые этапы
+        могут завершиться после возврата из метода; иначе все этапы
+        выполняются по очереди.
+
+        Args:
+            phases (dict): Имя этапа -> функция без аргументов.
+            background (dict): Этапы, завершения которых не нужно ждать.
+
+        Returns:
+            dict: Имя фонового этапа -> Future (пустой, если этапы уже выполнены).
+        """
+        background = background or {}
+
+        def timed(name, phase):
+            with TRACER.span(f"startup.{name}"):
+                phase_started = time.perf_counter()
+                phase()
+                self.startup_timings[name] = time.perf_counter() - phase_started
+
+        if not STARTUP_PARALLEL:
+            for name, phase in {**background, **phases}.items():
+                timed(name, phase)
+            return {}
 
-        # Создаем директорию для аудиофайлов, если она не существует
-        audio_dir = os.path.dirname(OUTPUT_AUDIO_PATH)
-        create_directory_if_not_exists(audio_dir)
+        executor = ThreadPoolExecutor(
+            max_workers=len(phases) + len(background), thread_name_prefix="startup"
+        )
+        # Фоновые этапы запускаются первыми: они самые долгие
+        deferred = {name: executor.submit(timed, name, phase) for name, phase in background.items()}
+        futures = [executor.submit(timed, name, phase) for name, phase in phases.items()]
+        executor.shutdown(wait=False)
+        # Ошибка любого обязательного этапа прерывает запуск
+        for future in futures:
+            future.result()
+        return deferred
 
-        # Инициализируем языковую модель
+    def _init_llm(self):
+        """
+        Инициализирует языковую модель.
+
+        langchain импортируется здесь, а не при импорте модуля: это самая
+        долгая часть запуска, и она идет параллельно с остальными этапами.
+        """
+        if self._llm is not None:
+            return
         self.logger.info("Инициализация языковой модели...")
-        self.llm = AssistantLLM()
+        from school_assistant.ai.llm import AssistantLLM
 
-        # Получаем токен Сбера для API речи
-        self.sber_token = None
+        self._llm = AssistantLLM(streaming=PIPELINE_MODE)
+        self.logger.info("Языковая модель готова")
+
+    def _init_token(self):
+        """
+        Получает токен Сбера для API речи и запускает его фоновое обновление.
+        """
         self.update_sber_token()
+        self.token_manager.start()
+
+    def _init_unavailable_audio(self):
+        """
+        Готовит сообщение «сервис недоступен»: читает заранее записанный
+        WAV-файл или синтезирует сообщение, пока сервис доступен.
+        """
+        try:
+            with open(UNAVAILABLE_AUDIO_PATH, "rb") as f:
+                self._unavailable_audio = f.read()
+            return
+        except OSError:
+            pass
+        self._unavailable_audio = synthesize_speech(
+            UNAVAILABLE_RESPONSE,
+            self.token_manager,
+            cache=self.tts_cache,
+            deadline=Deadline(TTS_TIMEOUT),
+        )
+
+    def _init_fillers(self):
+        """
+        Синтезирует фразы-заполнители тем же голосом, что и ответы
+        (из кеша синтеза речи, если фразы уже синтезировались).
+        """
+        count = self.earcons.load_fillers(
+            lambda text: synthesize_speech(
+                text,
+                self.token_manager,
+                cache=self.tts_cache,
+                deadline=Deadline(TTS_TIMEOUT),
+            )
+        )
+        self.logger.info(f"Фразы-заполнители готовы: {count}")
+
+    def _init_audio(self):
+        """
+        Запускает аудиодвижок: PortAudio и аудиопотоки открываются один раз.
+        """
+        if self.audio is None:
+            from school_assistant.audio.engine import AudioEngine
+
+            self.audio = AudioEngine()
+        try:
+            self.audio.start()
+            self.audio.prepare_output()
+        except Exception as e:
+            self.logger.error(f"Ошибка при инициализации аудиоустройств: {str(e)}")
+
+    def _init_button(self):
+        """
+        Запускает слушатель кнопки мыши.
+        """
+        if self.button is None:
+            from school_assistant.hardware.input_devices import ButtonListener
+
+            self.button = ButtonListener()
+        self.button.start()
 
     def update_sber_token(self):
         """
@@ -49,8 +278,7 @@ class SchoolAssistant:
         """
         self.logger.info("Получение токена для API Сбера...")
         try:
-            self.sber_token = get_token()
-            if self.sber_token:
+            if self.token_manager.refresh():
                 self.logger.info("Токен для API Сбера успешно получен")
                 return True
             else:
@@ -60,77 +288,651 @@ class SchoolAssistant:
             self.logger.error(f"Ошибка при получении токена для API Сбера: {str(e)}")
             return False
 
-    def handle_interaction(self):
+    def handle_interaction(self, stt_mode=None, pipelined=None, turn=None):
         """
         Обрабатывает один цикл взаимодействия с пользователем:
         запись голоса, распознавание, получение ответа от LLM, синтез речи, воспроизведение.
 
+        Args:
+            stt_mode (str): Режим распознавания речи: "batch" — отправка файла
+                после записи, "streaming" — отправка чанками во время записи,
+                "local" — локальный заменитель распознавателя. Если не указан,
+                используется значение STT_MODE из конфигурации.
+            pipelined (bool): Синтезировать и воспроизводить ответ по
+                предложениям по мере генерации. Если не указан, используется
+                значение PIPELINE_MODE из конфигурации.
+            turn (Turn): Ход диалога, через который взаимодействие можно
+                отменить. Если не указан, создается новый.
+
         Returns:
             bool: True, если взаимодействие успешно завершено, иначе False.
         """
+        stt_mode = stt_mode or STT_MODE
+        request = self._capture_request(stt_mode)
+        if request is None:
+            return False
+        audio, session, speculation = request
+        return self._process_request(
+            turn or Turn(), audio, session, stt_mode, pipelined, speculation
+        )
+
+    def _capture_request(self, stt_mode):
+        """
+        Записывает вопрос пользователя, пока нажата кнопка.
+
+        Args:
+            stt_mode (str): Режим распознавания речи.
+
+        Returns:
+            tuple: (PCM-аудио, сессия потокового распознавания или None,
+                спекулятивный запрос к LLM или None) или None в случае ошибки.
+        """
         try:
+            # Токен обновляется в фоне, поэтому здесь запрос к OAuth не выполняется
+            with TRACER.span("turn.token"):
+                token = self.token_manager.get_token()
+            if not token:
+                self.logger.error("Нет действующего токена для API Сбера")
+                return None
+
+            # При потоковом распознавании сессия открывается до начала записи
+            session = None
+            if stt_mode != "batch":
+                session = create_recognition_session(stt_mode, self.token_manager)
+
+            # Ответ по частичной гипотезе запрашивается на паузах в речи
+            # (в конвейерном режиме ответ и так начинает звучать рано)
+            speculation = None
+            if SPECULATIVE_ENABLED and not PIPELINE_MODE:
+                speculation = SpeculativeResponder(
+                    recognize=lambda pcm: self._recognize_partial(pcm, stt_mode),
+                    respond=self._draft_response,
+                )
+            on_chunk = self._chunk_consumer(session, speculation)
+
             # 1. Запись аудио с микрофона
             self.logger.info("Запись голоса...")
-            audio_path = record_audio()
-            if not audio_path:
+            end_detector = None
+            if VAD_END_SILENCE_MS:
+                end_detector = EndOfSpeechDetector(VAD_END_SILENCE_MS)
+            with TRACER.span("turn.record", mode=stt_mode) as span:
+                audio = self.audio.record(
+                    on_chunk=on_chunk,
+                    is_pressed=self.button.is_pressed,
+                    end_detector=end_detector,
+                )
+                span.set(audio_bytes=len(audio) if audio else 0)
+            released_at = time.perf_counter()
+            if not audio:
                 self.logger.error("Ошибка при записи аудио")
-                return False
+                if session:
+                    session.cancel()
+                if speculation:
+                    speculation.cancel()
+                return None
+            self._acknowledge(released_at)
+            if DEBUG_AUDIO_DIR:
+                # WAV-копия записи нужна только для отладки
+                save_debug_audio("request", pcm_to_wav(audio))
+            return audio, session, speculation
 
-            # 2. Преобразование речи в текст
-            self.logger.info("Распознавание речи...")
-            if not self.sber_token:
-                if not self.update_sber_token():
+        except Exception as e:
+            self.logger.error(f"Ошибка при записи вопроса: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            return None
+
+    def _acknowledge(self, released_at):
+        """
+        Сразу после записи подает сигнал «услышал», чтобы пользователь
+        не нажимал кнопку повторно, пока готовится ответ.
+
+        Args:
+            released_at (float): Окончание записи (time.perf_counter).
+        """
+        if self.earcons is None:
+            return
+        if self.audio.play_cue(self.earcons.acknowledge()):
+            METRICS.observe("earcon.acknowledge_latency", time.perf_counter() - released_at)
+
+    def _schedule_filler(self, turn):
+        """
+        Запускает таймер фразы-заполнителя: если за FILLER_DELAY_MS ответ
+        не начал звучать, звучит фраза «секундочку...».
+
+        Args:
+            turn (Turn): Ход диалога.
+
+        Returns:
+            threading.Timer: Таймер (его нужно отменить, когда ответ готов)
+                или None, если фразы отключены.
+        """
+        if self.earcons is None or not FILLER_DELAY_MS:
+            return None
+        timer = threading.Timer(FILLER_DELAY_MS / 1000, self._play_filler, args=(turn,))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _play_filler(self, turn):
+        """
+        Проигрывает фразу-заполнитель, если ход не отменен и ответ еще
+        не звучит. Проверка выполняется под блокировкой хода (см. _play).
+
+        Args:
+            turn (Turn): Ход диалога.
+        """
+        with self._turn_lock:
+            if turn.is_cancelled() or self.audio.is_playing():
+                return
+            cue = self.earcons.filler()
+            if cue is None or not self.audio.play_cue(cue):
+                return
+        METRICS.inc("earcon.filler")
+        self.logger.info(f"Ответ задерживается: фраза-заполнитель ({turn.id})")
+
+    @staticmethod
+    def _chunk_consumer(session, speculation):
+        """
+        Возвращает функцию, передающую записанные фрагменты сессии
+        распознавания и спекулятивному запросу (или None, если передавать
+        некому).
+        """
+        consumers = [c.feed for c in (session, speculation) if c is not None]
+        if not consumers:
+            return None
+        if len(consumers) == 1:
+            return consumers[0]
+
+        def feed(chunk):
+            for consumer in consumers:
+                consumer(chunk)
+
+        return feed
+
+    def _recognize_partial(self, pcm, stt_mode):
+        """
+        Распознает уже записанную часть вопроса (частичная гипотеза).
+
+        Args:
+            pcm (bytes): Записанное аудио.
+            stt_mode (str): Режим распознавания речи.
+
+        Returns:
+            str: Текст гипотезы или None.
+        """
+        if stt_mode == "local":
+            session = create_recognition_session("local")
+            session.feed(pcm)
+            phrases = session.finish()
+        else:
+            phrases = speech_to_text(pcm, self.token_manager, deadline=Deadline(STT_TIMEOUT))
+        return phrases[0] if phrases else None
+
+    def _draft_response(self, text):
+        """
+        Запрашивает ответ LLM по частичной гипотезе, не добавляя ход
+        в историю диалога. Вопросы о расписании не запрашиваются: на них
+        ответ дается локально.
+
+        Args:
+            text (str): Текст гипотезы.
+
+        Returns:
+            str: Ответ или None.
+        """
+        if self.schedule is not None and self.schedule.answer(text) is not None:
+            return None
+        return self.llm.draft_response(text)
+
+    def _process_request(
+        self, turn, audio, session, stt_mode, pipelined=None, speculation=None
+    ):
+        """
+        Распознает записанный вопрос, получает ответ и озвучивает его.
+
+        Между этапами проверяется отмена хода: если пользователь снова нажал
+        кнопку, результаты текущих запросов отбрасываются и ответ не звучит.
+
+        Args:
+            turn (Turn): Ход диалога.
+            audio (bytes): Записанное PCM-аудио.
+            session (RecognitionSession): Сессия потокового распознавания
+                или None при пакетном режиме.
+            stt_mode (str): Режим распознавания речи.
+            pipelined (bool): Озвучивать ответ по предложениям.
+            speculation (SpeculativeResponder): Спекулятивный запрос к LLM
+                по частичной гипотезе или None.
+
+        Returns:
+            bool: True, если взаимодействие успешно завершено, иначе False.
+        """
+        if pipelined is None:
+            pipelined = PIPELINE_MODE
+
+        with TRACER.span("turn.process", turn=turn.id, mode=stt_mode) as span:
+            try:
+                ok = self._run_stages(turn, audio, session, stt_mode, pipelined, speculation)
+            finally:
+                # Ответ по гипотезе не понадобился (или уже принят)
+                if speculation:
+                    speculation.cancel()
+            span.set(ok=ok, cancelled=turn.is_cancelled())
+        return ok
+
+    def _run_stages(self, turn, audio, session, stt_mode, pipelined, speculation=None):
+        """
+        Выполняет этапы обработки хода (см. _process_request).
+        """
+        # Общий срок ответа; этапы получают свою часть, но не больше остатка
+        deadline = Deadline(TURN_DEADLINE)
+        filler = None
+        try:
+            # Обрезаем тишину перед отправкой (при потоковой отправке аудио
+            # уже передано во время записи)
+            if VAD_ENABLED and not session:
+                with TRACER.span("turn.vad", turn=turn.id):
+                    audio, vad_stats = trim_silence(audio)
+                self.logger.info(
+                    f"VAD: речь {vad_stats['speech_ms']} мс, "
+                    f"обрезано {vad_stats['trimmed_ms']} мс, "
+                    f"сэкономлено {vad_stats['bytes_saved']} байт"
+                )
+                METRICS.inc("vad.bytes_saved", vad_stats["bytes_saved"])
+                METRICS.observe("vad.trimmed_ms", vad_stats["trimmed_ms"])
+                if not vad_stats["speech_ms"]:
+                    self.logger.error("Речь в записи не обнаружена")
                     return False
 
-            speech_text = speech_to_text(audio_path, self.sber_token)
-            if not speech_text or len(speech_text) == 0:
+            # 2. Преобразование речи в текст
+            self.logger.info(f"Распознавание речи (режим: {stt_mode})...")
+            with TRACER.span("turn.stt", turn=turn.id, mode=stt_mode):
+                stt_deadline = deadline.stage(STT_TIMEOUT)
+                if session:
+                    speech_text = session.finish(timeout=stt_deadline.remaining())
+                else:
+                    speech_text = speech_to_text(
+                        audio, self.token_manager, deadline=stt_deadline
+                    )
+            turn.raise_if_cancelled()
+            if speech_text is None:
+                self.logger.error("Ошибка при распознавании речи")
+                self._play_unavailable(turn)
+                return False
+            if len(speech_text) == 0:
                 self.logger.error("Речь не распознана")
                 return False
 
             recognized_text = speech_text[0]
             self.logger.info(f"Распознанный текст: {recognized_text}")
 
-            # 3. Получение ответа от языковой модели
-            self.logger.info("Получение ответа от LLM...")
-            llm_response = self.llm.get_response(recognized_text)
-            self.logger.info(f"Ответ LLM: {llm_response}")
+            # Вопросы о расписании отвечаются локально, без запроса к LLM
+            response_start = time.perf_counter()
+            llm_response = self._answer_locally(recognized_text)
+            if llm_response is None:
+                # Пока ждем LLM, через FILLER_DELAY_MS звучит фраза-заполнитель
+                filler = self._schedule_filler(turn)
+
+            if llm_response is None and pipelined:
+                return self._respond_pipelined(turn, recognized_text, deadline)
+
+            # 3. Получение ответа от языковой модели: сначала проверяем
+            # ответ, запрошенный по частичной гипотезе во время записи
+            if llm_response is None and speculation:
+                with TRACER.span("turn.speculation", turn=turn.id) as span:
+                    llm_response = speculation.resolve(
+                        recognized_text, timeout=deadline.stage(LLM_TIMEOUT).remaining()
+                    )
+                    span.set(committed=llm_response is not None)
+                if llm_response is not None:
+                    self.llm.remember(recognized_text, llm_response)
+                    self.logger.info(f"Ответ LLM (по частичной гипотезе): {llm_response}")
+
+            if llm_response is None:
+                self.logger.info("Получение ответа от LLM...")
+                deadline.raise_if_expired("запроса к LLM")
+                with TRACER.span("turn.llm", turn=turn.id) as span:
+                    llm_response = self.llm.get_response(recognized_text)
+                    span.set(prompt_tokens=self.llm.last_prompt_tokens)
+                turn.raise_if_cancelled()
+                self.logger.info(f"Ответ LLM: {llm_response}")
+                self.logger.info(
+                    f"Размер запроса к LLM: ~{self.llm.last_prompt_tokens} токенов"
+                )
+            if filler:
+                filler.cancel()
+
+            # 4-5. Синтез речи и воспроизведение по мере загрузки аудио
+            if TTS_STREAMING:
+                return self._speak_streamed(turn, llm_response, deadline, response_start)
 
             # 4. Синтез речи из текста
             self.logger.info("Синтез речи...")
-            if not text_to_speech(llm_response, self.sber_token):
+            with TRACER.span("turn.tts", turn=turn.id):
+                reply_audio = synthesize_speech(
+                    llm_response,
+                    self.token_manager,
+                    cache=self.tts_cache,
+                    deadline=deadline.stage(TTS_TIMEOUT),
+                )
+            turn.raise_if_cancelled()
+            if not reply_audio:
                 self.logger.error("Ошибка при синтезе речи")
+                self._play_unavailable(turn)
                 return False
+            save_debug_audio("response", reply_audio)
 
-            # 5. Воспроизведение аудио
-            self.logger.info("Воспроизведение ответа...")
-            play_audio()
+            # 5. Воспроизведение аудио (прерывается новым нажатием кнопки)
+            ttfa = time.perf_counter() - response_start
+            METRICS.observe("ttfa.sequential", ttfa)
+            self.logger.info(f"Воспроизведение ответа (до первого звука {ttfa:.2f} с)...")
+            with TRACER.span("turn.playback", turn=turn.id):
+                self._play(turn, reply_audio)
+                self.audio.wait_playback()
+            turn.raise_if_cancelled()
 
             self.logger.info("Цикл взаимодействия успешно завершен")
             return True
 
+        except TurnCancelled:
+            self.logger.info(f"Взаимодействие {turn.id} прервано пользователем")
+            METRICS.inc("turn.cancelled")
+            if session:
+                session.cancel()
+            return False
+        except DeadlineExceeded as e:
+            self.logger.error(f"Взаимодействие {turn.id} не уложилось в срок: {str(e)}")
+            METRICS.inc("turn.deadline_exceeded")
+            if session:
+                session.cancel()
+            self._play_unavailable(turn)
+            return False
         except Exception as e:
             self.logger.error(f"Ошибка при обработке взаимодействия: {str(e)}")
             self.logger.error(traceback.format_exc())
             return False
+        finally:
+            if filler:
+                filler.cancel()
+
+    def _speak_streamed(self, turn, text, deadline, response_start):
+        """
+        Синтезирует ответ и воспроизводит его по мере загрузки аудио,
+        не дожидаясь конца ответа API.
+
+        Args:
+            turn (Turn): Ход диалога.
+            text (str): Текст ответа.
+            deadline (Deadline): Общий срок ответа.
+            response_start (float): Начало получения ответа (time.perf_counter).
+
+        Returns:
+            bool: True, если ответ был воспроизведен, иначе False.
+
+        Raises:
+            TurnCancelled: Если ход отменен во время ответа.
+        """
+        self.logger.info("Синтез речи (воспроизведение по мере загрузки)...")
+        with TRACER.span("turn.tts", turn=turn.id, streaming=True):
+            chunks = stream_speech(
+                text,
+                self.token_manager,
+                cache=self.tts_cache,
+                deadline=deadline.stage(TTS_TIMEOUT),
+            )
+        turn.raise_if_cancelled()
+        if chunks is None:
+            self.logger.error("Ошибка при синтезе речи")
+            self._play_unavailable(turn)
+            return False
+
+        with TRACER.span("turn.playback", turn=turn.id, streaming=True) as span:
+            stream = self._play_stream(turn, chunks)
+            self.audio.wait_playback()
+            if stream is not None:
+                span.set(underruns=stream.underruns)
+        turn.raise_if_cancelled()
+        if stream is None or not stream.bytes_written:
+            self.logger.error("Ошибка при загрузке синтезированной речи")
+            self._play_unavailable(turn)
+            return False
+
+        ttfa = stream.ready_at - response_start
+        METRICS.observe("ttfa.streamed", ttfa)
+        self.logger.info(
+            f"Ответ озвучен: до первого звука {ttfa:.2f} с, "
+            f"недогрузок буфера {stream.underruns} ({stream.starved_seconds * 1000:.0f} мс тишины)"
+        )
+        self.logger.info("Цикл взаимодействия успешно завершен")
+        return True
+
+    def _play_stream(self, turn, chunks):
+        """
+        Разбирает загружаемый WAV-файл и передает PCM-данные в очередь
+        воспроизведения по мере поступления.
+
+        Поток ставится в очередь под блокировкой хода (см. _play); если ход
+        прерван, очередь очищается, запись в поток прекращается и загрузка
+        останавливается.
+
+        Args:
+            turn (Turn): Ход диалога.
+            chunks (iterator): Части WAV-файла (см. stream_speech).
+
+        Returns:
+            JitterBuffer: Буфер воспроизведения или None, если до начала
+                воспроизведения дело не дошло.
+        """
+        parser = WavStreamParser()
+        stream = None
+        try:
+            for chunk in chunks:
+                pcm = parser.feed(chunk)
+                if stream is None:
+                    if parser.format is None:
+                        continue
+                    with self._turn_lock:
+                        if turn.is_cancelled():
+                            return None
+                        stream = self.audio.play_stream(*parser.format)
+                if pcm and not stream.write(pcm):
+                    break
+        except ValueError as e:
+            self.logger.error(f"Ошибка разбора синтезированного аудио: {str(e)}")
+        finally:
+            # Прекращаем загрузку, если воспроизведение прервано
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+            if stream is not None:
+                stream.close()
+        return stream
+
+    def _answer_locally(self, recognized_text):
+        """
+        Пытается ответить на вопрос по расписанию без запроса к LLM.
+
+        Args:
+            recognized_text (str): Распознанный вопрос пользователя.
+
+        Returns:
+            str: Ответ или None, если вопрос нужно передать LLM.
+        """
+        if self.schedule is None:
+            return None
+
+        started = time.perf_counter()
+        answer = self.schedule.answer(recognized_text)
+        elapsed = time.perf_counter() - started
+        if answer is None:
+            METRICS.inc("fastpath.miss")
+            return None
+
+        METRICS.inc("fastpath.hit")
+        METRICS.observe("fastpath.latency", elapsed)
+        # Сэкономленное время оценивается по средней задержке LLM
+        llm_latency = METRICS.snapshot()["observations"].get("llm.latency")
+        if llm_latency:
+            METRICS.observe("fastpath.saved", llm_latency["mean"] - elapsed)
+        self.llm.remember(recognized_text, answer)
+        self.logger.info(f"Локальный ответ ({elapsed * 1e6:.0f} мкс): {answer}")
+        return answer
+
+    def _respond_pipelined(self, turn, recognized_text, deadline=None):
+        """
+        Получает ответ LLM потоково и озвучивает его по предложениям:
+        следующие предложения синтезируются, пока играют предыдущие.
+
+        Args:
+            turn (Turn): Ход диалога.
+            recognized_text (str): Распознанный вопрос пользователя.
+            deadline (Deadline): Общий срок ответа.
+
+        Returns:
+            bool: True, если ответ был воспроизведен, иначе False.
+
+        Raises:
+            TurnCancelled: Если ход отменен во время ответа.
+        """
+        self.logger.info("Получение и озвучивание ответа LLM по предложениям...")
+        deadline = deadline or Deadline()
+        pipeline = SpeechPipeline(
+            synthesize=lambda text: synthesize_speech(
+                text,
+                self.token_manager,
+                cache=self.tts_cache,
+                deadline=deadline.stage(TTS_TIMEOUT),
+            ),
+            # Фрагменты ставятся в очередь движка и звучат без пауз между ними
+            play=lambda audio: self._play(turn, audio),
+        )
+        with TRACER.span("turn.respond_pipelined", turn=turn.id) as span:
+            result = pipeline.run(
+                self.llm.stream_response(
+                    recognized_text, deadline=deadline.stage(LLM_TIMEOUT)
+                ),
+                cancel=turn.cancelled,
+            )
+            self.audio.wait_playback()
+            span.set(sentences=result["sentences"])
+        turn.raise_if_cancelled()
+        self.logger.info(f"Ответ LLM: {result['text']}")
+        self.logger.info(f"Размер запроса к LLM: ~{self.llm.last_prompt_tokens} токенов")
+
+        if result["time_to_first_audio"] is None:
+            self.logger.error("Ошибка при синтезе речи")
+            self._play_unavailable(turn)
+            return False
+
+        self.logger.info(
+            f"Ответ озвучен: предложений {result['sentences']}, "
+            f"до первого звука {result['time_to_first_audio']:.2f} с, "
+            f"всего {result['total_time']:.2f} с"
+        )
+        self.logger.info("Цикл взаимодействия успешно завершен")
+        return True
+
+    def _play_unavailable(self, turn):
+        """
+        Сообщает пользователю, что сервис недоступен, вместо молчания.
+
+        Используется заранее подготовленное сообщение; если его нет,
+        выполняется попытка синтеза (из кеша синтеза речи она не требует
+        доступа к API).
+
+        Args:
+            turn (Turn): Ход диалога.
+        """
+        audio_data = self._unavailable_audio or synthesize_speech(
+            UNAVAILABLE_RESPONSE,
+            self.token_manager,
+            cache=self.tts_cache,
+            deadline=Deadline(TTS_TIMEOUT),
+        )
+        if not audio_data:
+            self.logger.error("Нет аудио сообщения о недоступности сервиса")
+            return
+        METRICS.inc("turn.unavailable_reply")
+        self._play(turn, audio_data)
+        self.audio.wait_playback()
+
+    def _play(self, turn, audio_data):
+        """
+        Ставит ответ хода в очередь воспроизведения, если ход не отменен.
+
+        Проверка отмены и постановка в очередь выполняются под той же
+        блокировкой, что и прерывание хода, поэтому звук отмененного хода
+        не может попасть в очередь после ее очистки.
+
+        Args:
+            turn (Turn): Ход диалога.
+            audio_data (bytes): Содержимое WAV-файла.
+
+        Returns:
+            bool: True, если аудио поставлено в очередь.
+        """
+        with self._turn_lock:
+            if turn.is_cancelled():
+                return False
+            return self.audio.play_wav(audio_data)
+
+    def _interrupt_turn(self):
+        """
+        Отменяет текущий ход и немедленно останавливает воспроизведение.
+        """
+        with self._turn_lock:
+            turn = self._turn
+            if turn is None or not turn.is_active():
+                return
+            turn.cancel()
+            self.audio.stop_playback()
+        self.logger.info(f"Ответ {turn.id} прерван новым нажатием кнопки")
+
+    def _start_turn(self, audio, session, speculation=None):
+        """
+        Запускает обработку записанного вопроса в фоновом потоке, чтобы
+        основной цикл сразу вернулся к ожиданию кнопки.
+
+        Args:
+            audio (bytes): Записанное PCM-аудио.
+            session (RecognitionSession): Сессия потокового распознавания.
+            speculation (SpeculativeResponder): Спекулятивный запрос к LLM.
+        """
+        turn = Turn()
+        turn.thread = threading.Thread(
+            target=self._process_request,
+            args=(turn, audio, session, STT_MODE, None, speculation),
+            name=f"turn-{turn.id}",
+            daemon=True,
+        )
+        with self._turn_lock:
+            self._turn = turn
+        turn.thread.start()
 
     def run(self):
         """
         Запускает основной цикл работы ассистента.
+
+        Ответ обрабатывается и звучит в фоне; нажатие кнопки во время ответа
+        прерывает его и сразу начинает запись нового вопроса.
         """
         self.logger.info("Запуск ассистента. Ожидание нажатия левой кнопки мыши...")
+        events = self.button.subscribe()
 
         try:
             while True:
-                # Проверяем нажатие кнопки
-                if is_left_button_pressed():
-                    self.logger.info("Кнопка нажата. Начинаю взаимодействие...")
-                    self.handle_interaction()
-
-                    # Небольшая пауза после обработки взаимодействия
-                    time.sleep(1)
+                # Ждем нажатия кнопки; таймаут нужен, чтобы обрабатывать Ctrl+C
+                try:
+                    event, _ = events.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                if event != self.button.PRESS:
+                    continue
 
-                # Пауза для снижения нагрузки на CPU
-                time.sleep(0.1)
+                self.logger.info("Кнопка нажата. Начинаю взаимодействие...")
+                self._interrupt_turn()
+                request = self._capture_request(STT_MODE)
+                if request is not None:
+                    self._start_turn(*request)
 
         except KeyboardInterrupt:
             self.logger.info("Получен сигнал прерывания. Завершение работы...")
@@ -138,7 +940,14 @@ class SchoolAssistant:
             self.logger.error(f"Критическая ошибка: {str(e)}")
             self.logger.error(traceback.format_exc())
         finally:
+            self._interrupt_turn()
+            self.button.stop()
+            self.audio.close()
+            TRACER.stop_exporter()
+            self.token_manager.stop()
+            http_client.close_session()
             self.logger.info("Ассистент завершил работу")
+            stop_logging()
 
 
 def main():
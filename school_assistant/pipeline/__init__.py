@@ -0,0 +1,3 @@
+"""
+Пакет конвейерной обработки ответа: LLM, синтез речи и воспроизведение.
+"""
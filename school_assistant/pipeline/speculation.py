@@ -0,0 +1,221 @@
+"""
+Модуль спекулятивного запроса к LLM по частичной гипотезе распознавания.
+
+API распознавания Сбера возвращает только окончательный результат, поэтому
+частичная гипотеза получается так: на паузе в речи, пока пользователь еще
+держит кнопку, уже записанное аудио отправляется на распознавание, и по
+полученному тексту сразу запрашивается ответ LLM (без записи в историю
+диалога). Когда готов окончательный текст, ответ принимается, если тексты
+совпадают после нормализации, иначе отбрасывается, и вызывающий код
+запрашивает ответ заново. Уже отправленный запрос к LLM прервать нельзя,
+поэтому отброшенный ответ просто не используется.
+
+Метрики: speculative.started, speculative.commit, speculative.abort
+(окончательный текст не совпал), speculative.superseded (гипотеза
+сменилась на следующей паузе), speculative.unused (ответ не понадобился),
+speculative.stt_calls — дополнительные запросы распознавания и
+speculative.saved — выигрыш во времени ответа (секунды).
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from school_assistant.audio.vad import EndOfSpeechDetector
+from school_assistant.config.config import (
+    AUDIO_RATE,
+    SPECULATIVE_MIN_WORDS,
+    SPECULATIVE_PAUSE_MS,
+)
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_transcript(text):
+    """
+    Нормализует текст распознавания для сравнения гипотез: регистр, «ё»,
+    знаки препинания и пробелы не учитываются.
+
+    Args:
+        text (str): Текст распознавания.
+
+    Returns:
+        str: Нормализованный текст.
+    """
+    return _NON_WORD.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+class Speculation:
+    """
+    Спекулятивный запрос к LLM по одной гипотезе.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.normalized = normalize_transcript(text)
+        self.started = time.perf_counter()
+        self.finished = None
+        self.future = Future()
+
+
+class SpeculativeResponder:
+    """
+    Запускает запросы к LLM по частичным гипотезам во время записи.
+
+    Запись передает фрагменты аудио в feed(); после окончательного
+    распознавания вызывается resolve(), а при отказе от ответа — cancel().
+    Одновременно выполняется не больше одного распознавания гипотезы.
+    """
+
+    def __init__(
+        self,
+        recognize,
+        respond,
+        pause_ms=SPECULATIVE_PAUSE_MS,
+        min_words=SPECULATIVE_MIN_WORDS,
+        rate=AUDIO_RATE,
+    ):
+        """
+        Args:
+            recognize (callable): Распознавание: PCM-аудио → текст или None.
+            respond (callable): Запрос ответа: текст → ответ или None.
+                Не должен добавлять ход в историю диалога.
+            pause_ms (int): Длительность паузы в речи, после которой
+                распознается гипотеза.
+            min_words (int): Минимальное число слов в гипотезе.
+            rate (int): Частота дискретизации аудио.
+        """
+        self.recognize = recognize
+        self.respond = respond
+        self.min_words = min_words
+        self._detector = EndOfSpeechDetector(pause_ms, rate=rate)
+        self._audio = bytearray()
+        self._in_pause = False
+        self._recognizing = False
+        self._current = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def feed(self, chunk):
+        """
+        Передает очередной записанный фрагмент аудио.
+
+        Args:
+            chunk (bytes): Фрагмент PCM-аудио.
+        """
+        if self._closed:
+            return
+        self._audio.extend(chunk)
+        paused = self._detector.feed(chunk)
+        if paused and not self._in_pause:
+            self._on_pause()
+        self._in_pause = paused
+
+    def _on_pause(self):
+        """
+        Начало паузы в речи: распознает записанное аудио в фоне.
+        """
+        with self._lock:
+            if self._recognizing:
+                return
+            self._recognizing = True
+        audio = bytes(self._audio)
+        threading.Thread(target=self._hypothesize, args=(audio,), daemon=True).start()
+
+    def _hypothesize(self, audio):
+        """
+        Распознает гипотезу и запускает по ней запрос к LLM.
+        """
+        try:
+            METRICS.inc("speculative.stt_calls")
+            text = self.recognize(audio)
+        except Exception as e:
+            logger.error(f"Ошибка распознавания частичной гипотезы: {str(e)}")
+            text = None
+        finally:
+            with self._lock:
+                self._recognizing = False
+        if not text or len(text.split()) < self.min_words:
+            return
+
+        speculation = Speculation(text)
+        with self._lock:
+            if self._closed:
+                return
+            if self._current is not None:
+                if self._current.normalized == speculation.normalized:
+                    return
+                METRICS.inc("speculative.superseded")
+            self._current = speculation
+        METRICS.inc("speculative.started")
+        logger.info(f"Спекулятивный запрос к LLM по гипотезе: {text}")
+        threading.Thread(target=self._run, args=(speculation,), daemon=True).start()
+
+    def _run(self, speculation):
+        """
+        Выполняет запрос к LLM по гипотезе.
+        """
+        try:
+            response = self.respond(speculation.text)
+        except Exception as e:
+            logger.error(f"Ошибка спекулятивного запроса к LLM: {str(e)}")
+            response = None
+        speculation.finished = time.perf_counter()
+        speculation.future.set_result(response)
+
+    def resolve(self, final_text, timeout=None):
+        """
+        Сравнивает окончательный текст с гипотезой и возвращает ответ,
+        если он подходит.
+
+        Args:
+            final_text (str): Окончательный результат распознавания.
+            timeout (float): Сколько ждать ответа по гипотезе (секунды).
+
+        Returns:
+            str: Ответ по гипотезе или None, если ответ нужно запросить заново.
+        """
+        resolved_at = time.perf_counter()
+        with self._lock:
+            self._closed = True
+            speculation = self._current
+            self._current = None
+        if speculation is None:
+            return None
+        if speculation.normalized != normalize_transcript(final_text):
+            METRICS.inc("speculative.abort")
+            logger.info(f"Гипотеза «{speculation.text}» не совпала с окончательным текстом")
+            return None
+
+        try:
+            response = speculation.future.result(timeout)
+        except Exception:
+            response = None
+        if response is None:
+            METRICS.inc("speculative.unused")
+            return None
+
+        # Без спекуляции ответ был бы готов через столько же времени после resolve
+        duration = speculation.finished - speculation.started
+        saved = resolved_at + duration - max(resolved_at, speculation.finished)
+        METRICS.inc("speculative.commit")
+        METRICS.observe("speculative.saved", saved)
+        logger.info(f"Спекулятивный ответ принят, выигрыш {saved:.2f} с")
+        return response
+
+    def cancel(self):
+        """
+        Отказывается от ответа по гипотезе (например, ответ найден локально
+        или ход прерван).
+        """
+        with self._lock:
+            self._closed = True
+            speculation = self._current
+            self._current = None
+        if speculation is not None:
+            METRICS.inc("speculative.unused")
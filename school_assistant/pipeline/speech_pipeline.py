@@ -0,0 +1,149 @@
+"""
+Модуль конвейера LLM → синтез речи → воспроизведение по предложениям.
+
+Ответ модели разбивается на предложения по мере генерации, каждое предложение
+синтезируется в пуле потоков, а воспроизведение идет в исходном порядке,
+пока следующие предложения еще генерируются и синтезируются.
+"""
+
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from school_assistant.config.config import PIPELINE_MIN_SENTENCE, PIPELINE_WORKERS
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Конец предложения: знак препинания, за которым следует пробел
+SENTENCE_END = re.compile(r"[.!?…]+[»\")]*\s+")
+
+
+def split_sentences(chunks, min_chars=PIPELINE_MIN_SENTENCE):
+    """
+    Собирает фрагменты текста в предложения.
+
+    Короткие предложения объединяются со следующими, чтобы не синтезировать
+    отдельные обрывки вроде сокращений.
+
+    Args:
+        chunks (iterable): Фрагменты текста (например, токены LLM).
+        min_chars (int): Минимальная длина выдаваемого фрагмента.
+
+    Yields:
+        str: Очередное предложение (или группа предложений).
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() - start >= min_chars:
+                sentence = buffer[start:match.end()].strip()
+                if sentence:
+                    yield sentence
+                start = match.end()
+        buffer = buffer[start:]
+
+    tail = buffer.strip()
+    if tail:
+        yield tail
+
+
+class SpeechPipeline:
+    """
+    Конвейер синтеза и воспроизведения ответа по предложениям.
+    """
+
+    def __init__(self, synthesize, play, workers=PIPELINE_WORKERS):
+        """
+        Инициализирует конвейер.
+
+        Args:
+            synthesize (callable): Функция синтеза: текст → аудио (bytes) или None.
+            play (callable): Функция, ставящая аудио (bytes) в очередь
+                воспроизведения и сразу возвращающаяся. Порядок звучания
+                задает очередь: предложения передаются в play() по одному
+                в порядке текста, по мере готовности синтеза. Ожидание конца
+                воспроизведения и его прерывание (очистка очереди) — задача
+                вызывающего кода; после отмены новые предложения в play()
+                не передаются.
+            workers (int): Количество потоков синтеза.
+        """
+        self.synthesize = synthesize
+        self.play = play
+        self.workers = workers
+
+    def run(self, chunks, cancel=None):
+        """
+        Синтезирует и воспроизводит ответ, поступающий фрагментами.
+
+        Args:
+            chunks (iterable): Фрагменты текста ответа.
+            cancel (threading.Event): Признак отмены. После его установки
+                новые предложения не синтезируются и не воспроизводятся.
+
+        Returns:
+            dict: Результат: полный текст ("text"), число предложений
+                ("sentences"), время до первого звука ("time_to_first_audio"),
+                общее время ("total_time") в секундах и признак отмены
+                ("cancelled").
+        """
+        start = time.perf_counter()
+        stats = {"text": "", "sentences": 0, "time_to_first_audio": None}
+        pending = queue.Queue()
+
+        def cancelled():
+            return cancel is not None and cancel.is_set()
+
+        def player():
+            while True:
+                future = pending.get()
+                if future is None:
+                    return
+                try:
+                    audio = future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка синтеза предложения: {str(e)}")
+                    audio = None
+                if not audio or cancelled():
+                    continue
+                if stats["time_to_first_audio"] is None:
+                    stats["time_to_first_audio"] = time.perf_counter() - start
+                self.play(audio)
+
+        player_thread = threading.Thread(target=player, daemon=True)
+        player_thread.start()
+
+        parts = []
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for sentence in split_sentences(self._collect(chunks, parts)):
+                if cancelled():
+                    break
+                stats["sentences"] += 1
+                pending.put(executor.submit(self.synthesize, sentence))
+        finally:
+            # При отмене не ждем синтеза оставшихся предложений
+            executor.shutdown(wait=not cancelled(), cancel_futures=cancelled())
+            pending.put(None)
+            player_thread.join()
+
+        stats["text"] = "".join(parts)
+        stats["total_time"] = time.perf_counter() - start
+        stats["cancelled"] = cancelled()
+        if stats["time_to_first_audio"] is not None:
+            METRICS.observe("ttfa.pipelined", stats["time_to_first_audio"])
+        return stats
+
+    @staticmethod
+    def _collect(chunks, parts):
+        """
+        Пропускает фрагменты дальше, сохраняя их для полного текста ответа.
+        """
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
@@ -0,0 +1,65 @@
+"""
+Модуль хода диалога: один вопрос пользователя и ответ на него.
+
+Ход можно отменить (например, когда пользователь снова нажал кнопку
+во время ответа), и все этапы обработки проверяют отмену между шагами.
+"""
+
+import itertools
+import threading
+
+_turn_ids = itertools.count(1)
+
+
+class TurnCancelled(Exception):
+    """
+    Исключение, прерывающее обработку отмененного хода.
+    """
+
+
+class Turn:
+    """
+    Ход диалога с признаком отмены.
+    """
+
+    def __init__(self):
+        """
+        Создает новый ход с уникальным номером.
+        """
+        self.id = next(_turn_ids)
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def cancel(self):
+        """
+        Отменяет ход.
+        """
+        self.cancelled.set()
+
+    def is_cancelled(self):
+        """
+        Проверяет, отменен ли ход.
+
+        Returns:
+            bool: True, если ход отменен.
+        """
+        return self.cancelled.is_set()
+
+    def is_active(self):
+        """
+        Проверяет, идет ли еще обработка хода.
+
+        Returns:
+            bool: True, если поток обработки хода еще работает.
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def raise_if_cancelled(self):
+        """
+        Прерывает обработку, если ход отменен.
+
+        Raises:
+            TurnCancelled: Если ход отменен.
+        """
+        if self.cancelled.is_set():
+            raise TurnCancelled(f"Ход {self.id} отменен")
@@ -4,60 +4,74 @@
 
 import os
 import logging
-from pathlib import Path
-from datetime import datetime
 
-
-def setup_logging(log_dir=None, level=logging.INFO):
+from school_assistant.config.config import (
+    LOG_BACKUP_COUNT,
+    LOG_CONSOLE,
+    LOG_DIR,
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_MAX_BYTES,
+    LOG_QUEUE_SIZE,
+    LOG_ROTATE_HOURS,
+)
+from school_assistant.utils.log_queue import (
+    LOG_FORMAT,
+    CompressingRotatingFileHandler,
+    parse_levels,
+    start_logging,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(log_dir=None, level=None):
     """
-    Настраивает логирование для приложения.
+    Настраивает асинхронное логирование для приложения.
+
+    Записи передаются через очередь фоновому потоку, который пишет их в
+    консоль и в ротируемый файл assistant.log (см. utils.log_queue), поэтому
+    вызовы логгера не ждут записи на диск. Повторный вызов только обновляет
+    уровни.
 
     Args:
         log_dir (str): Директория для хранения логов. Если не указана,
-                      используется директория logs в корне проекта.
-        level (int): Уровень логирования.
+                      используется LOG_DIR из конфигурации.
+        level (int | str): Уровень логирования. Если не указан,
+                      используется LOG_LEVEL из конфигурации.
 
     Returns:
         logging.Logger: Объект логгера.
     """
-    # Определяем базовую директорию проекта и директорию для логов
-    if log_dir is None:
-        base_dir = Path(__file__).resolve().parent.parent
-        log_dir = os.path.join(base_dir, "logs")
+    log_dir = log_dir or LOG_DIR
+    level = level or LOG_LEVEL
 
     # Создаем директорию для логов, если она не существует
     os.makedirs(log_dir, exist_ok=True)
-
-    # Формируем имя файла лога с текущей датой и временем
-    log_filename = f"assistant_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    log_filepath = os.path.join(log_dir, log_filename)
-
-    # Настраиваем логгер
-    logger = logging.getLogger("school_assistant")
-    logger.setLevel(level)
-
-    # Создаем обработчик для записи в файл
-    file_handler = logging.FileHandler(log_filepath)
-    file_handler.setLevel(level)
-
-    # Создаем обработчик для вывода в консоль
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(level)
-
-    # Создаем форматтер для сообщений
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    log_filepath = os.path.join(log_dir, "assistant.log")
+
+    # Обработчики выполняются в фоновом потоке; один файл с ротацией
+    # вместо нового файла на каждый запуск
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [
+        CompressingRotatingFileHandler(
+            log_filepath,
+            max_bytes=LOG_MAX_BYTES,
+            rotate_seconds=LOG_ROTATE_HOURS * 3600,
+            backup_count=LOG_BACKUP_COUNT,
+        )
+    ]
+    if LOG_CONSOLE:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    app_logger = start_logging(
+        handlers, level=level, levels=parse_levels(LOG_LEVELS), queue_size=LOG_QUEUE_SIZE
     )
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-
-    # Добавляем обработчики к логгеру
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-
-    logger.info(f"Логирование настроено. Файл лога: {log_filepath}")
+    app_logger.info(f"Логирование настроено. Файл лога: {log_filepath}")
 
-    return logger
+    return app_logger
 
 
 def create_directory_if_not_exists(directory_path):
@@ -74,5 +88,5 @@ def create_directory_if_not_exists(directory_path):
         os.makedirs(directory_path, exist_ok=True)
         return True
     except Exception as e:
-        print(f"Ошибка при создании директории {directory_path}: {str(e)}")
+        logger.error(f"Ошибка при создании директории {directory_path}: {str(e)}")
         return False
@@ -0,0 +1,161 @@
+"""
+Модуль асинхронного логирования.
+
+Вызов logger.info() в обработке хода только ставит запись в очередь;
+запись в файл (на Raspberry Pi — на SD-карту) и вывод в консоль выполняет
+фоновый поток QueueListener. Файл лога ротируется по размеру и по времени,
+старые файлы сжимаются gzip, поэтому логи не заполняют карту.
+"""
+
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+
+from school_assistant.utils.metrics import METRICS
+
+# Корневой логгер приложения; логгеры модулей (logging.getLogger(__name__))
+# вложены в него и передают записи его обработчикам
+ROOT_LOGGER = "school_assistant"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Файловый обработчик с ротацией по размеру и по времени: старые файлы
+    сжимаются gzip (assistant.log.1.gz, assistant.log.2.gz, ...).
+    """
+
+    def __init__(self, filename, max_bytes=0, rotate_seconds=0, backup_count=5):
+        """
+        Args:
+            filename (str): Путь к файлу лога.
+            max_bytes (int): Размер файла, после которого он ротируется
+                (0 — без ограничения).
+            rotate_seconds (float): Период ротации по времени
+                (0 — без ротации по времени).
+            backup_count (int): Сколько сжатых файлов хранить.
+        """
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds if rotate_seconds else None
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source, dest):
+        """
+        Сжимает ротируемый файл и удаляет исходный.
+        """
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            # Пустой файл не ротируется
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.rotate_seconds:
+            self.rollover_at = time.time() + self.rotate_seconds
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Обработчик, передающий записи в очередь фонового потока.
+
+    Если очередь переполнена (например, карта памяти не успевает), запись
+    отбрасывается, а не блокирует вызывающий поток; число отброшенных
+    записей — метрика log.dropped.
+    """
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            METRICS.inc("log.dropped")
+
+
+def parse_levels(spec):
+    """
+    Разбирает уровни подсистем.
+
+    Args:
+        spec (str): Строка вида "api=DEBUG,pipeline.speculation=WARNING";
+            имена без префикса school_assistant дополняются им.
+
+    Returns:
+        dict: Имя логгера -> уровень.
+    """
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, level = (part.strip() for part in item.split("=", 1))
+        if not name.startswith(ROOT_LOGGER):
+            name = f"{ROOT_LOGGER}.{name}"
+        levels[name] = level.upper()
+    return levels
+
+
+def start_logging(handlers, level="INFO", levels=None, queue_size=10000):
+    """
+    Подключает к корневому логгеру приложения обработчик очереди и
+    запускает фоновый поток, передающий записи обработчикам.
+
+    Повторный вызов только обновляет уровни.
+
+    Args:
+        handlers (list): Обработчики, выполняемые в фоновом потоке.
+        level (str | int): Уровень корневого логгера приложения.
+        levels (dict): Уровни логгеров подсистем.
+        queue_size (int): Максимальное число записей в очереди.
+
+    Returns:
+        logging.Logger: Корневой логгер приложения.
+    """
+    global _listener
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    for name, subsystem_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+    if _listener is not None:
+        return logger
+
+    log_queue = queue.Queue(queue_size)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    # Записи уже отфильтрованы по уровню логгерами
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+    atexit.register(stop_logging)
+    return logger
+
+
+def stop_logging():
+    """
+    Останавливает фоновый поток, дописав оставшиеся в очереди записи.
+    """
+    global _listener
+
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        if isinstance(handler, DroppingQueueHandler):
+            logger.removeHandler(handler)
+    for handler in listener.handlers:
+        handler.close()
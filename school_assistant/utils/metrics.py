@@ -0,0 +1,91 @@
+"""
+Модуль для сбора метрик приложения: счетчики и измеряемые величины.
+"""
+
+import threading
+
+
+class Metrics:
+    """
+    Потокобезопасный реестр метрик.
+
+    Счетчики (inc) накапливают количество событий, наблюдения (observe)
+    хранят число измерений, сумму, минимум, максимум и последнее значение.
+    """
+
+    def __init__(self):
+        """
+        Инициализирует пустой реестр.
+        """
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._observations = {}
+
+    def inc(self, name, value=1):
+        """
+        Увеличивает счетчик.
+
+        Args:
+            name (str): Имя счетчика.
+            value (int): Величина увеличения.
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """
+        Добавляет измерение величины.
+
+        Args:
+            name (str): Имя величины.
+            value (float): Измеренное значение.
+        """
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                stats = {"count": 0, "sum": 0.0, "min": value, "max": value}
+                self._observations[name] = stats
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+            stats["last"] = value
+
+    def get(self, name, default=0):
+        """
+        Возвращает значение счетчика.
+
+        Args:
+            name (str): Имя счетчика.
+            default: Значение, если счетчик не найден.
+
+        Returns:
+            int: Значение счетчика.
+        """
+        with self._lock:
+            return self._counters.get(name, default)
+
+    def snapshot(self):
+        """
+        Возвращает копию всех метрик.
+
+        Returns:
+            dict: Словарь с ключами "counters" и "observations".
+        """
+        with self._lock:
+            observations = {}
+            for name, stats in self._observations.items():
+                observations[name] = dict(stats, mean=stats["sum"] / stats["count"])
+            return {"counters": dict(self._counters), "observations": observations}
+
+    def reset(self):
+        """
+        Очищает все метрики.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+
+# Общий реестр метрик приложения
+METRICS = Metrics()
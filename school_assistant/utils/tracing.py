@@ -0,0 +1,469 @@
+"""
+Модуль трассировки: замер длительности этапов обработки и экспорт метрик.
+
+Этапы оборачиваются в спаны:
+
+    with TRACER.span("turn.stt", mode="batch") as span:
+        ...
+        span.add_bytes(sent=len(audio))
+
+Длительности собираются в гистограммы (p50/p95/p99), объемы данных —
+в счетчики байт. Фоновый экспортер периодически записывает метрики
+в текстовый файл Prometheus (для node_exporter textfile collector) и
+дописывает завершенные спаны в файл JSON Lines. Если трассировка
+выключена, span() возвращает общий пустой объект и почти ничего не стоит.
+
+Сводка задержек по записанным спанам:
+    python -m school_assistant.utils.tracing summary
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+
+from school_assistant.config.config import (
+    TRACING_ENABLED,
+    TRACE_EXPORT_DIR,
+    TRACE_EXPORT_INTERVAL,
+    TRACE_MAX_BYTES,
+)
+from school_assistant.utils.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм длительности (секунды)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Сколько последних измерений хранить для вычисления перцентилей
+RESERVOIR_SIZE = 1024
+# Имена файлов экспорта
+PROMETHEUS_FILE = "school_assistant.prom"
+TRACES_FILE = "traces.jsonl"
+# Префикс имен метрик Prometheus
+METRIC_PREFIX = "school_assistant"
+
+_METRIC_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def percentile(values, q):
+    """
+    Вычисляет перцентиль значений.
+
+    Args:
+        values (list): Значения.
+        q (float): Перцентиль от 0 до 100.
+
+    Returns:
+        float: Значение перцентиля или 0.0 для пустого списка.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Histogram:
+    """
+    Гистограмма длительностей: корзины для Prometheus и окно последних
+    измерений для перцентилей.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value):
+        """
+        Добавляет измерение.
+
+        Args:
+            value (float): Длительность в секундах.
+        """
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+    def summary(self):
+        """
+        Возвращает статистику гистограммы.
+
+        Returns:
+            dict: Количество, сумма, среднее и перцентили p50/p95/p99.
+        """
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": percentile(recent, 50),
+            "p95": percentile(recent, 95),
+            "p99": percentile(recent, 99),
+        }
+
+
+class Span:
+    """
+    Замер одного этапа. Используется как контекстный менеджер.
+    """
+
+    __slots__ = ("tracer", "name", "attrs", "sent", "received", "started", "wall")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.sent = 0
+        self.received = 0
+        self.started = None
+        self.wall = None
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, duration)
+        return False
+
+    def add_bytes(self, sent=0, received=0):
+        """
+        Учитывает объем переданных данных.
+
+        Args:
+            sent (int): Отправлено байт.
+            received (int): Получено байт.
+        """
+        self.sent += sent
+        self.received += received
+
+    def set(self, **attrs):
+        """
+        Добавляет атрибуты спана (попадают в файл JSON Lines).
+        """
+        self.attrs.update(attrs)
+
+
+class _NoopSpan:
+    """
+    Пустой спан, который возвращается при выключенной трассировке.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_bytes(self, sent=0, received=0):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Реестр спанов: гистограммы длительностей, счетчики байт
+    и очередь завершенных спанов для экспорта.
+    """
+
+    def __init__(self, enabled=TRACING_ENABLED, max_events=10000):
+        """
+        Инициализирует трассировщик.
+
+        Args:
+            enabled (bool): Включена ли трассировка.
+            max_events (int): Сколько завершенных спанов хранить до экспорта.
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._bytes = {}
+        self._events = deque(maxlen=max_events)
+        self._exporter = None
+        self._stop = threading.Event()
+
+    def span(self, name, **attrs):
+        """
+        Создает спан этапа.
+
+        Args:
+            name (str): Имя этапа, например "turn.stt" или "sber.synthesize".
+            **attrs: Атрибуты спана.
+
+        Returns:
+            Span: Спан (пустой, если трассировка выключена).
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def _finish(self, span, duration):
+        """
+        Учитывает завершенный спан.
+        """
+        event = {
+            "ts": round(span.wall, 3),
+            "span": span.name,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if span.sent or span.received:
+            event["bytes_sent"] = span.sent
+            event["bytes_received"] = span.received
+        event.update(span.attrs)
+
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = Histogram()
+            histogram.observe(duration)
+            if span.sent or span.received:
+                sent, received = self._bytes.get(span.name, (0, 0))
+                self._bytes[span.name] = (sent + span.sent, received + span.received)
+            self._events.append(event)
+
+    def summary(self):
+        """
+        Возвращает статистику по всем этапам.
+
+        Returns:
+            dict: Имя этапа -> статистика гистограммы и объемы данных.
+        """
+        with self._lock:
+            result = {}
+            for name, histogram in self._histograms.items():
+                stats = histogram.summary()
+                stats["bytes_sent"], stats["bytes_received"] = self._bytes.get(name, (0, 0))
+                result[name] = stats
+            return result
+
+    def reset(self):
+        """
+        Очищает все гистограммы, счетчики и очередь спанов.
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._bytes.clear()
+            self._events.clear()
+
+    def prometheus_text(self):
+        """
+        Формирует метрики в текстовом формате Prometheus.
+
+        Кроме спанов выгружаются счетчики и измерения общего реестра METRICS.
+
+        Returns:
+            str: Текст метрик.
+        """
+        lines = [
+            f"# TYPE {METRIC_PREFIX}_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                label = f'span="{name}"'
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    lines.append(
+                        f'{METRIC_PREFIX}_span_seconds_bucket{{{label},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{METRIC_PREFIX}_span_seconds_bucket{{{label},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f"{METRIC_PREFIX}_span_seconds_sum{{{label}}} {histogram.sum}")
+                lines.append(f"{METRIC_PREFIX}_span_seconds_count{{{label}}} {histogram.count}")
+
+            lines.append(f"# TYPE {METRIC_PREFIX}_span_bytes_total counter")
+            for name, (sent, received) in sorted(self._bytes.items()):
+                lines.append(
+                    f'{METRIC_PREFIX}_span_bytes_total{{span="{name}",direction="sent"}} {sent}'
+                )
+                lines.append(
+                    f'{METRIC_PREFIX}_span_bytes_total{{span="{name}",direction="received"}} {received}'
+                )
+
+        snapshot = METRICS.snapshot()
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{METRIC_PREFIX}_{_METRIC_NAME_RE.sub('_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, stats in sorted(snapshot["observations"].items()):
+            metric = f"{METRIC_PREFIX}_{_METRIC_NAME_RE.sub('_', name)}"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_sum {stats['sum']}")
+            lines.append(f"{metric}_count {stats['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory=TRACE_EXPORT_DIR):
+        """
+        Записывает метрики Prometheus и дописывает новые спаны в JSON Lines.
+
+        Args:
+            directory (str): Директория экспорта.
+        """
+        if not directory:
+            return
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+
+            # Файл Prometheus заменяется атомарно, чтобы сборщик не прочитал его наполовину
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, os.path.join(directory, PROMETHEUS_FILE))
+
+            if events:
+                traces_path = os.path.join(directory, TRACES_FILE)
+                if os.path.exists(traces_path) and os.path.getsize(traces_path) > TRACE_MAX_BYTES:
+                    os.replace(traces_path, traces_path + ".1")
+                with open(traces_path, "a", encoding="utf-8") as f:
+                    for event in events:
+                        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"Ошибка при экспорте метрик: {str(e)}")
+
+    def start_exporter(self, directory=TRACE_EXPORT_DIR, interval=TRACE_EXPORT_INTERVAL):
+        """
+        Запускает периодический экспорт в фоновом потоке.
+
+        Args:
+            directory (str): Директория экспорта.
+            interval (float): Период экспорта в секундах.
+        """
+        if not self.enabled or not directory or self._exporter is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.export(directory)
+
+        self._exporter = threading.Thread(target=loop, name="trace-exporter", daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self, directory=TRACE_EXPORT_DIR):
+        """
+        Останавливает экспорт, предварительно выгрузив накопленные данные.
+
+        Args:
+            directory (str): Директория экспорта.
+        """
+        if self._exporter is None:
+            return
+        self._stop.set()
+        self._exporter.join()
+        self._exporter = None
+        self.export(directory)
+
+
+# Общий трассировщик приложения
+TRACER = Tracer()
+
+
+def load_events(path):
+    """
+    Читает спаны из файла JSON Lines.
+
+    Args:
+        path (str): Путь к файлу.
+
+    Returns:
+        list: Записи спанов.
+    """
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    return events
+
+
+def print_summary(events, total_span="turn.process"):
+    """
+    Печатает разбивку задержек по этапам.
+
+    Args:
+        events (list): Записи спанов.
+        total_span (str): Спан, время которого принимается за 100%.
+    """
+    durations = {}
+    transferred = {}
+    for event in events:
+        durations.setdefault(event["span"], []).append(event["duration_ms"])
+        sent, received = transferred.get(event["span"], (0, 0))
+        transferred[event["span"]] = (
+            sent + event.get("bytes_sent", 0),
+            received + event.get("bytes_received", 0),
+        )
+
+    total = sum(durations.get(total_span, [])) or None
+    print(
+        f"{'этап':<22} {'кол-во':>7} {'среднее':>9} {'p50':>9} {'p95':>9} {'p99':>9} "
+        f"{'доля':>6} {'отпр. КБ':>9} {'получ. КБ':>9}"
+    )
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        share = f"{sum(values) / total * 100:5.1f}%" if total else "     -"
+        sent, received = transferred[name]
+        print(
+            f"{name:<22} {len(values):>7} {sum(values) / len(values):>9.1f} "
+            f"{percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f} "
+            f"{percentile(values, 99):>9.1f} {share:>6} "
+            f"{sent / 1024:>9.1f} {received / 1024:>9.1f}"
+        )
+    print(f"Время в миллисекундах; доля — от суммарного времени '{total_span}'.")
+
+
+def main():
+    """
+    Точка входа командной строки.
+    """
+    parser = argparse.ArgumentParser(description="Сводка задержек по этапам")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subparsers.add_parser("summary", help="разбивка задержек по этапам")
+    summary_parser.add_argument(
+        "path",
+        nargs="?",
+        default=os.path.join(TRACE_EXPORT_DIR, TRACES_FILE),
+        help="файл спанов JSON Lines",
+    )
+    summary_parser.add_argument(
+        "--total", default="turn.process", help="спан, принимаемый за 100%%"
+    )
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        if not os.path.exists(args.path):
+            print(f"Файл спанов не найден: {args.path}")
+            return
+        print_summary(load_events(args.path), args.total)
+
+
+if __name__ == "__main__":
+    main()